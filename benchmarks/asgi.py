@@ -0,0 +1,146 @@
+"""
+Compare concurrent-request throughput of the WSGI and ASGI deployments.
+
+    python benchmarks/asgi.py [--rows 10000] [--workers 2] [--concurrency 16] [--seconds 10]
+
+One synthetic account is seeded in a throwaway SQLite database, then the
+same read-heavy pages are hammered by ``--concurrency`` client threads, first
+through gunicorn's sync workers (config.wsgi) and then through uvicorn
+workers (config.asgi with config/gunicorn_asgi.py).
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+os.environ.setdefault("REQUEST_LOG_LEVEL", "WARNING")
+os.environ["DATABASE_URL"] = "sqlite:///%s" % (Path(tempfile.mkdtemp(prefix="oea-asgi-")) / "db.sqlite3")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+from core.synthetic import DatasetSpec, generate_user  # noqa: E402
+
+PAGES = ["dashboard", "problem_list", "mistake_analytics", "review_queue", "export_data"]
+SERVERS = {
+    "wsgi": ["config.wsgi:application", "--config", "config/gunicorn.py"],
+    "asgi": ["config.asgi:application", "--config", "config/gunicorn_asgi.py"],
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(server: str, workers: int) -> tuple[subprocess.Popen, int]:
+    port = _free_port()
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(prefix="oea-prom-"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *SERVERS[server], "--bind", f"127.0.0.1:{port}", "--workers", str(workers)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{server} server did not start within 30 seconds")
+
+
+def _hammer(port: int, cookie: str, paths: list[str], concurrency: int, seconds: float) -> dict:
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(offset: int):
+        nonlocal errors
+        i = offset
+        while time.monotonic() < deadline:
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{port}{paths[i % len(paths)]}", headers={"Cookie": cookie}
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            ms = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(ms)
+                else:
+                    errors += 1
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000, help="Rows in the synthetic account.")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers for both servers.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Parallel client connections.")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    call_command("migrate", verbosity=0)
+    user, result = generate_user("asgi-bench", DatasetSpec.for_rows(args.rows))
+    client = Client(SERVER_NAME="localhost")
+    client.force_login(user)
+    cookie = f"sessionid={client.cookies['sessionid'].value}"
+    paths = [reverse(name) for name in PAGES]
+
+    print(f"{result.total} rows, {args.workers} workers, {args.concurrency} connections, {args.seconds:g}s per server")
+    print(f"{'server':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>6}")
+    for server in SERVERS:
+        process, port = _start(server, args.workers)
+        try:
+            _hammer(port, cookie, paths, concurrency=2, seconds=1)  # warm caches
+            row = _hammer(port, cookie, paths, args.concurrency, args.seconds)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        print(
+            f"{server:<6} {row['requests_per_second']:>8.1f} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['errors']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare the JSON export with the compressed columnar export on a synthetic account.
+
+    python benchmarks/export_formats.py [--rows 100000] [--seed 0]
+
+The account is generated in a throwaway SQLite database (``core.synthetic``).
+For each format the export is encoded from the database into memory, then
+decoded back into ``(section, row)`` events the way the import job reads
+it: ``core.jsonstream`` for JSON, ``core.columnar`` for the compressed
+formats (zstd only when the zstandard package is installed). Sizes are
+reported against the plain JSON file; "json+gzip" is the same JSON
+gzipped, for reference.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+os.environ.setdefault("REQUEST_LOG_LEVEL", "WARNING")
+os.environ["DATABASE_URL"] = "sqlite:///%s" % (Path(tempfile.mkdtemp(prefix="oea-export-")) / "db.sqlite3")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+
+from core.columnar import available_compressions, iter_columnar_rows, iter_export_columnar  # noqa: E402
+from core.exporting import iter_export_json  # noqa: E402
+from core.jsonstream import iter_section_rows  # noqa: E402
+from core.synthetic import DatasetSpec, generate_user  # noqa: E402
+
+
+def gzip_json(user):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in iter_export_json(user):
+        yield compressor.compress(chunk.encode())
+    yield compressor.flush()
+
+
+def gunzip_json(fp):
+    return iter_section_rows(io.BytesIO(zlib.decompress(fp.read(), 31)))
+
+
+def measure(label: str, encode, decode, baseline: int | None) -> int:
+    started = time.perf_counter()
+    body = b"".join(encode())
+    encoded = time.perf_counter() - started
+    started = time.perf_counter()
+    rows = sum(1 for _ in decode(io.BytesIO(body)))
+    decoded = time.perf_counter() - started
+    ratio = f"{baseline / len(body):>6.1f}x" if baseline else "       "
+    print(
+        f"{label:<14} {len(body) / 1024:>10,.0f} KiB {ratio}  encode {encoded:>6.2f}s"
+        f"  decode {decoded:>6.2f}s  ({rows:,} rows)"
+    )
+    return len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000, help="Approximate rows in the account.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    call_command("migrate", verbosity=0)
+    user, result = generate_user("export-bench", DatasetSpec.for_rows(args.rows), seed=args.seed)
+    print(f"{result.total:,} rows generated")
+
+    baseline = measure(
+        "json",
+        lambda: (chunk.encode() for chunk in iter_export_json(user)),
+        iter_section_rows,
+        None,
+    )
+    measure("json+gzip", lambda: gzip_json(user), gunzip_json, baseline)
+    for compression in available_compressions():
+        measure(
+            f"columnar+{compression}",
+            lambda: iter_export_columnar(user, compression),
+            iter_columnar_rows,
+            baseline,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark the Monte Carlo review-load forecast.
+
+    python benchmarks/forecast.py [--cards 10000] [--runs 100] [--days 30]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+import django  # noqa: E402
+
+django.setup()
+
+from core.forecast import FORECAST_DAYS, FORECAST_RUNS, PERCENTILES, simulate_load  # noqa: E402
+from core.scheduler import np  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=FORECAST_RUNS)
+    parser.add_argument("--days", type=int, default=FORECAST_DAYS)
+    args = parser.parse_args()
+    if np is None:
+        print("numpy is not installed; the forecast is unavailable")
+        return
+
+    rng = random.Random(7)
+    eases = [round(rng.uniform(1.3, 3.0), 2) for _ in range(args.cards)]
+    intervals = [rng.choice([0, 1, rng.randint(2, 120)]) for _ in range(args.cards)]
+    offsets = [rng.randint(-10, 90) for _ in range(args.cards)]
+
+    simulate_load(eases, intervals, offsets, days=args.days, runs=args.runs, seed=1)
+    started = time.perf_counter()
+    loads = simulate_load(eases, intervals, offsets, days=args.days, runs=args.runs, seed=1)
+    elapsed = time.perf_counter() - started
+    bands = np.percentile(loads, PERCENTILES, axis=0)
+    print(f"{args.cards} cards x {args.runs} runs x {args.days} days: {elapsed * 1000:.1f} ms")
+    for p, band in zip(PERCENTILES, bands):
+        print(f"p{p:<3} first week: {' '.join(f'{v:5.0f}' for v in band[:7])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Load-test the main pages against synthetic accounts of increasing size.
+
+    python benchmarks/load.py [--sizes 1000,10000,100000] [--requests 20] [--server client|gunicorn]
+                              [--output load-report.json] [--baseline previous-report.json]
+
+Every size gets its own synthetic user (``core.synthetic``) in a throwaway
+SQLite database; set LOAD_DATABASE_URL to benchmark another database. With
+``--server client`` requests go through Django's test client in this
+process; with ``--server gunicorn`` a local gunicorn is started per size and
+driven over HTTP, and peak RSS is the worker's own high-water mark. Query
+counts are read from the Prometheus histograms on /metrics in both modes.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+os.environ.setdefault("REQUEST_LOG_LEVEL", "WARNING")
+# Never point the harness at the development database: it creates users and 100k-row accounts.
+os.environ["DATABASE_URL"] = os.environ.get("LOAD_DATABASE_URL") or "sqlite:///%s" % (
+    Path(tempfile.mkdtemp(prefix="oea-load-")) / "db.sqlite3"
+)
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.urls import reverse  # noqa: E402
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+from core.models import Problem  # noqa: E402
+from core.synthetic import DatasetSpec, generate_user  # noqa: E402
+
+# (url name, path builder) for the pages a signed-in user actually hits.
+TARGETS = [
+    ("dashboard", lambda user: reverse("dashboard")),
+    ("problem_list", lambda user: reverse("problem_list")),
+    ("problem_list_filtered", lambda user: reverse("problem_list") + "?topic=NT&tags=invariant"),
+    ("problem_detail", lambda user: reverse("problem_detail", args=[_first_problem(user)])),
+    ("attempt_list", lambda user: reverse("attempt_list")),
+    ("mistake_analytics", lambda user: reverse("mistake_analytics")),
+    ("search", lambda user: reverse("search") + "?q=invariant"),
+    ("review_queue", lambda user: reverse("review_queue")),
+    ("review_forecast", lambda user: reverse("review_forecast")),
+    ("sync_reviews", lambda user: reverse("sync_reviews")),
+    ("export_data", lambda user: reverse("export_data")),
+]
+# A p95 this much slower than the baseline is reported as a regression.
+REGRESSION_RATIO = 1.2
+
+
+def _first_problem(user) -> int:
+    return Problem.objects.filter(created_by=user).order_by("pk").values_list("pk", flat=True).first()
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _query_totals(text: str) -> dict[str, tuple[float, float]]:
+    """``view -> (queries, requests)`` from the ``oea_http_request_queries`` histogram."""
+    totals: dict[str, list[float]] = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != "oea_http_request_queries":
+            continue
+        for sample in family.samples:
+            entry = totals.setdefault(sample.labels["view"], [0.0, 0.0])
+            if sample.name.endswith("_sum"):
+                entry[0] = sample.value
+            elif sample.name.endswith("_count"):
+                entry[1] = sample.value
+    return {view: (queries, count) for view, (queries, count) in totals.items()}
+
+
+class ClientDriver:
+    def __init__(self, user):
+        self.client = Client(SERVER_NAME="localhost")
+        self.client.force_login(user)
+
+    def get(self, path: str, headers=None) -> tuple[int, bytes]:
+        response = self.client.get(path, headers=headers)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, body
+
+    def peak_rss_kb(self) -> int:
+        # Process-wide high-water mark, so it includes generating the data set.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def close(self) -> None:
+        pass
+
+
+class GunicornDriver:
+    def __init__(self, user, workers: int = 1):
+        client = Client()
+        client.force_login(user)
+        self.cookie = f"sessionid={client.cookies['sessionid'].value}"
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=tempfile.mkdtemp(prefix="oea-prom-"))
+        self.process = subprocess.Popen(
+            [
+                sys.executable, "-m", "gunicorn", "config.wsgi:application",
+                "--config", "config/gunicorn.py",
+                "--bind", f"127.0.0.1:{self.port}",
+                "--workers", str(workers),
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        self.close()
+        raise RuntimeError("gunicorn did not start within 30 seconds")
+
+    def get(self, path: str, headers=None) -> tuple[int, bytes]:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{self.port}{path}", headers={"Cookie": self.cookie, **(headers or {})}
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def peak_rss_kb(self) -> int | None:
+        try:
+            children = Path(f"/proc/{self.process.pid}/task/{self.process.pid}/children").read_text().split()
+            peaks = []
+            for pid in children:
+                for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+                    if line.startswith("VmHWM:"):
+                        peaks.append(int(line.split()[1]))
+        except OSError:
+            return None
+        return max(peaks, default=None)
+
+    def close(self) -> None:
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+def run_size(rows: int, requests: int, server: str, seed: int) -> dict:
+    spec = DatasetSpec.for_rows(rows)
+    print(f"{rows} rows per user")
+    user, result = generate_user(f"load-{rows}", spec, seed=seed)
+    driver = GunicornDriver(user) if server == "gunicorn" else ClientDriver(user)
+    token = os.environ.get("METRICS_TOKEN")
+    metrics_headers = {"Authorization": f"Bearer {token}"} if token else None
+    try:
+        urls = []
+        for name, build in TARGETS:
+            path = build(user)
+            status, _ = driver.get(path)  # warm caches and connections
+            before = _query_totals(driver.get(reverse("metrics"), metrics_headers)[1].decode())
+            timings, size = [], 0
+            for _ in range(requests):
+                started = time.perf_counter()
+                status, body = driver.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+                size = len(body)
+            after = _query_totals(driver.get(reverse("metrics"), metrics_headers)[1].decode())
+            view = name.removesuffix("_filtered")
+            queries = after.get(view, (0, 0))[0] - before.get(view, (0, 0))[0]
+            timings.sort()
+            row = {
+                "name": name,
+                "path": path,
+                "status": status,
+                "p50_ms": round(_percentile(timings, 50), 2),
+                "p95_ms": round(_percentile(timings, 95), 2),
+                "p99_ms": round(_percentile(timings, 99), 2),
+                "mean_ms": round(sum(timings) / len(timings), 2),
+                "queries": round(queries / requests, 1),
+                "bytes": size,
+            }
+            urls.append(row)
+            print(
+                f"  {name:<22} {status} p50 {row['p50_ms']:8.1f} ms  p95 {row['p95_ms']:8.1f} ms  "
+                f"p99 {row['p99_ms']:8.1f} ms  {row['queries']:5.1f} queries"
+            )
+        peak = driver.peak_rss_kb()
+    finally:
+        driver.close()
+    print(f"  peak RSS {peak} KiB" if peak else "  peak RSS unavailable")
+    return {"rows_per_user": result.total, "seed_seconds": round(result.elapsed, 2), "peak_rss_kb": peak, "urls": urls}
+
+
+def compare(report: dict, baseline: dict) -> list[str]:
+    """Lines for every URL whose p95 grew by ``REGRESSION_RATIO`` or more against ``baseline``."""
+    old = {
+        (size["rows_per_user"], url["name"]): url
+        for size in baseline.get("results", [])
+        for url in size["urls"]
+    }
+    regressions = []
+    for size in report["results"]:
+        for url in size["urls"]:
+            previous = old.get((size["rows_per_user"], url["name"]))
+            if previous and previous["p95_ms"] and url["p95_ms"] / previous["p95_ms"] >= REGRESSION_RATIO:
+                regressions.append(
+                    f"{url['name']} at {size['rows_per_user']} rows: p95 {previous['p95_ms']} -> {url['p95_ms']} ms"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated rows per user.")
+    parser.add_argument("--requests", type=int, default=20, help="Timed requests per URL and size.")
+    parser.add_argument("--server", choices=["client", "gunicorn"], default="client")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="load-report.json")
+    parser.add_argument("--baseline", help="A previous report to compare p95 latencies against.")
+    args = parser.parse_args()
+
+    call_command("migrate", verbosity=0)
+    report = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "server": args.server,
+        "requests_per_url": args.requests,
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "results": [run_size(int(size), args.requests, args.server, args.seed) for size in args.sizes.split(",")],
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"Wrote {args.output}")
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()))
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
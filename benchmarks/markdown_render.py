@@ -0,0 +1,88 @@
+"""
+Micro-benchmark for the ``markdownify`` template filter.
+
+Renders a corpus of long problem statements and reports renders/second for
+the original implementation (regexes compiled and a converter built on every
+call), the precompiled renderer, and the cached filter.
+
+    python benchmarks/markdown_render.py [--docs 200] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+
+import django  # noqa: E402
+
+django.setup()
+
+import markdown2  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+
+from core.templatetags import markdown_extras  # noqa: E402
+
+
+def legacy_markdownify(text):
+    def replace_env(env, marker, value):
+        pattern = re.compile(rf"\\begin{{{env}}}(.*?)\\end{{{env}}}", re.S)
+
+        def _replace(match):
+            items = [c.strip() for c in re.split(r"\\item", match.group(1) or "") if c.strip()]
+            return "\n".join(f"{marker} {item}" for item in items) if items else ""
+
+        return pattern.sub(_replace, value)
+
+    normalized = replace_env("enumerate", "1.", replace_env("itemize", "-", text))
+    return markdown2.markdown(normalized, extras=markdown_extras.MARKDOWN_EXTRAS)
+
+
+def make_statement(rng: random.Random) -> str:
+    words = "let triangle circle prove integer prime polynomial bound show that for all real".split()
+    paragraphs = []
+    for _ in range(rng.randint(6, 12)):
+        sentence = " ".join(rng.choices(words, k=rng.randint(40, 80)))
+        paragraphs.append(f"{sentence} $a_{{{rng.randint(1, 9)}}}^2 + b^2 \\ge 2ab$ **note** `code`.")
+    items = "".join(f"\\item case {i}: {' '.join(rng.choices(words, k=12))}\n" for i in range(6))
+    paragraphs.append(f"\\begin{{enumerate}}\n{items}\\end{{enumerate}}")
+    paragraphs.append(f"\\begin{{itemize}}\n{items}\\end{{itemize}}")
+    return "\n\n".join(paragraphs)
+
+
+def measure(label: str, render, corpus: list[str], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            render(text)
+    elapsed = time.perf_counter() - started
+    rate = rounds * len(corpus) / elapsed
+    print(f"{label:<26} {rate:>12,.0f} renders/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus = [make_statement(rng) for _ in range(args.docs)]
+    assert all(legacy_markdownify(t) == markdown_extras.render_markdown(t) for t in corpus[:20])
+
+    cache.clear()
+    markdown_extras._local_cache.clear()
+    before = measure("legacy (per-call compile)", legacy_markdownify, corpus, args.rounds)
+    measure("precompiled, uncached", markdown_extras.render_markdown, corpus, args.rounds)
+    measure("markdownify, cold cache", markdown_extras.markdownify, corpus, 1)
+    after = measure("markdownify, warm cache", markdown_extras.markdownify, corpus, args.rounds)
+    print(f"speed-up: {after / before:,.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Benchmark the batch SM-2 scheduler against the per-card loop.
+
+    python benchmarks/scheduler_batch.py [--cards 100000]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.scheduler import grade_batch, np  # noqa: E402
+
+
+def timed(label: str, func) -> float:
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cards", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    eases = [round(rng.uniform(1.3, 3.0), 2) for _ in range(args.cards)]
+    intervals = [rng.choice([0, 1, rng.randint(2, 200)]) for _ in range(args.cards)]
+    ratings = [rng.randint(0, 3) for _ in range(args.cards)]
+    today = date.today()
+
+    python = timed("pure Python", lambda: grade_batch(eases, intervals, ratings, today, use_numpy=False))
+    if np is None:
+        print("numpy is not installed; skipping the vectorised path")
+        return
+    vectorised = timed("NumPy", lambda: grade_batch(eases, intervals, ratings, today, use_numpy=True))
+    assert python == vectorised, "batch paths disagree"
+
+
+if __name__ == "__main__":
+    main()
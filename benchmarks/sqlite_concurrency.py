@@ -0,0 +1,157 @@
+"""
+Compare SQLite throughput under parallel writers with default and tuned pragmas.
+
+    python benchmarks/sqlite_concurrency.py [--workers 4] [--seconds 10] [--cards 2000] [--reads-per-write 3]
+
+Each profile gets a fresh database file. Every worker process owns one user
+and loops: ``--reads-per-write`` due-queue reads, then one grade through
+``core.sqlite.run_with_retry`` (the same path the write views use).
+"default" is SQLite's rollback journal with full sync; "tuned" applies
+settings.SQLITE_PRAGMAS (WAL, synchronous=NORMAL, busy timeout, mmap, cache).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.dev")
+os.environ.setdefault("REQUEST_LOG_LEVEL", "WARNING")
+
+PROFILES = ("default", "tuned")
+
+
+def _grade(pk: int, rating: int) -> None:
+    from core.models import ReviewItem
+
+    ReviewItem.objects.get(pk=pk).grade(rating)
+
+
+def _worker(user_id: int, pks: list[int], seconds: float, reads_per_write: int, results) -> None:
+    from django.db import OperationalError, connection
+    from prometheus_client import REGISTRY
+
+    from core.models import ReviewItem
+    from core.sqlite import run_with_retry
+
+    rng = random.Random(user_id)
+    reads = writes = failed = 0
+    write_ms = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for _ in range(reads_per_write):
+            due = ReviewItem.objects.filter(user_id=user_id, due_date__lte=date.today())
+            due.count()
+            list(due.order_by("due_date", "pk").values_list("pk", "prompt")[:20])
+            reads += 1
+        started = time.perf_counter()
+        try:
+            run_with_retry(_grade, rng.choice(pks), rng.choice((1, 2, 2, 3)))
+            writes += 1
+            write_ms.append((time.perf_counter() - started) * 1000)
+        except OperationalError:
+            failed += 1
+    connection.close()
+    retries = REGISTRY.get_sample_value("oea_db_lock_retries_total") or 0
+    results.put({"reads": reads, "writes": writes, "failed": failed, "retries": retries, "write_ms": write_ms})
+
+
+def run_profile(args) -> dict:
+    """Runs in a child process whose DATABASE_URL and SQLITE_TUNING pick the profile."""
+    import django
+
+    django.setup()
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from django.db import connection, connections
+
+    from core.models import ReviewItem
+
+    call_command("migrate", verbosity=0)
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA journal_mode")
+        journal_mode = cursor.fetchone()[0]
+    owners = []
+    for i in range(args.workers):
+        user = get_user_model().objects.create_user(username=f"writer-{i}")
+        items = ReviewItem.objects.bulk_create(
+            ReviewItem(user=user, prompt=f"Card {n}", answer_key="a") for n in range(args.cards)
+        )
+        owners.append((user.pk, [item.pk for item in items]))
+    # Forked workers must open their own connections.
+    connections.close_all()
+
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_worker, args=(user_id, pks, args.seconds, args.reads_per_write, results))
+        for user_id, pks in owners
+    ]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    write_ms = sorted(ms for result in collected for ms in result["write_ms"])
+    return {
+        "journal_mode": journal_mode,
+        "reads_per_second": sum(r["reads"] for r in collected) / args.seconds,
+        "writes_per_second": sum(r["writes"] for r in collected) / args.seconds,
+        "write_p50_ms": write_ms[len(write_ms) // 2] if write_ms else None,
+        "write_p95_ms": write_ms[int(len(write_ms) * 0.95)] if write_ms else None,
+        "retries": sum(r["retries"] for r in collected),
+        "failed": sum(r["failed"] for r in collected),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--cards", type=int, default=2000, help="Review cards per worker.")
+    parser.add_argument("--reads-per-write", type=int, default=3)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(run_profile(args)))
+        return
+
+    print(f"{args.workers} workers x {args.seconds:g}s, {args.reads_per_write} reads per write")
+    print(
+        f"{'profile':<8} {'journal':>7} {'reads/s':>9} {'writes/s':>9} "
+        f"{'p50 ms':>7} {'p95 ms':>7} {'retries':>7} {'failed':>6}"
+    )
+    for profile in PROFILES:
+        database = Path(tempfile.mkdtemp(prefix="oea-sqlite-")) / "db.sqlite3"
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{database}",
+            SQLITE_TUNING="true" if profile == "tuned" else "false",
+        )
+        out = subprocess.run(
+            [sys.executable, __file__, "--profile", profile] + sys.argv[1:],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{profile:<8} {row['journal_mode']:>7} {row['reads_per_second']:>9.0f} "
+            f"{row['writes_per_second']:>9.0f} {row['write_p50_ms'] or 0:>7.1f} {row['write_p95_ms'] or 0:>7.1f} "
+            f"{row['retries']:>7.0f} {row['failed']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
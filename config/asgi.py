@@ -1,7 +1,16 @@
 import os
 
+import django
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.prod")
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+from core.asgi import WHITENOISE_MIDDLEWARE, StaticFiles  # noqa: E402
+
+# Static files are served in front of Django instead (core.asgi.StaticFiles); the sync-only
+# middleware would otherwise run every request, async views included, in a thread.
+settings.MIDDLEWARE = [name for name in settings.MIDDLEWARE if name != WHITENOISE_MIDDLEWARE]
+
+application = StaticFiles(get_asgi_application())
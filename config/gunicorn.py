@@ -0,0 +1,10 @@
+import os
+
+from prometheus_client import multiprocess
+
+
+def child_exit(server, worker):
+    # PROMETHEUS_MULTIPROC_DIR is created and cleared by config/start.sh, before the
+    # job workers start, so gunicorn must not wipe it: their samples live there too.
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,6 @@
+# ASGI profile: gunicorn manages uvicorn workers serving config.asgi:application.
+# The WSGI profile (config/gunicorn.py) is the default; compare with benchmarks/asgi.py.
+#   gunicorn config.asgi:application --config config/gunicorn_asgi.py
+from config.gunicorn import child_exit  # noqa: F401
+
+worker_class = "uvicorn.workers.UvicornWorker"
@@ -32,6 +32,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    # Outside sessions/auth so their queries count; after WhiteNoise so static files don't.
+    "core.instrumentation.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -67,6 +69,25 @@ DATABASES = {
     )
 }
 
+# Run on every new SQLite connection by core.sqlite.configure_sqlite. WAL lets readers
+# carry on while a gunicorn worker writes; NORMAL only fsyncs at checkpoints in WAL mode.
+# SQLITE_TUNING=false keeps SQLite's defaults (rollback journal, full sync).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 128 * 1024 * 1024,
+    "cache_size": -20000,  # KiB when negative, so about 20 MB per connection
+    "temp_store": "MEMORY",
+} if ENV.get("SQLITE_TUNING", "true").lower() == "true" else {}
+
+CACHES = {
+    "default": {
+        "BACKEND": ENV.get("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": ENV.get("CACHE_LOCATION", "olympiad-error-atlas"),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -85,6 +106,14 @@ STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 STATICFILES_DIRS = [p for p in [BASE_DIR / "static"] if p.exists()]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Background job uploads and results (core.jobs); never served directly, only through job_download.
+# By default they sit next to a SQLite database file, so the disk that keeps the
+# database across deploys (e.g. /var/data on Render) keeps them too.
+_SQLITE_FILE = DATABASES["default"]["NAME"] if DATABASES["default"]["ENGINE"].endswith("sqlite3") else ""
+MEDIA_ROOT = Path(
+    ENV.get("MEDIA_ROOT")
+    or (Path(_SQLITE_FILE).parent / "media" if _SQLITE_FILE and _SQLITE_FILE != ":memory:" else BASE_DIR / "media")
+)
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -102,10 +131,19 @@ X_FRAME_OPTIONS = "DENY"
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
+    "formatters": {
+        "json_line": {
+            "format": "%(message)s",
+        },
+    },
     "handlers": {
         "console": {
             "class": "logging.StreamHandler",
         },
+        "request_metrics": {
+            "class": "logging.StreamHandler",
+            "formatter": "json_line",
+        },
     },
     "root": {
         "handlers": ["console"],
@@ -117,5 +155,16 @@ LOGGING = {
             "level": "ERROR",
             "propagate": False,
         },
+        # One JSON object per request from core.instrumentation.RequestMetricsMiddleware.
+        "core.requests": {
+            "handlers": ["request_metrics"],
+            "level": ENV.get("REQUEST_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
     },
 }
+
+# Bearer token for Prometheus scrapes of /metrics. Staff sessions may always read it; without a
+# token nobody else may, unless METRICS_PUBLIC is set (the dev settings do).
+METRICS_TOKEN = ENV.get("METRICS_TOKEN", "")
+METRICS_PUBLIC = False
@@ -5,3 +5,6 @@ DEBUG = True
 SECRET_KEY = SECRET_KEY or "dev-secret-key"
 
 ALLOWED_HOSTS = ALLOWED_HOSTS or ["localhost", "127.0.0.1"]
+
+# Local Prometheus can scrape /metrics without a token.
+METRICS_PUBLIC = True
@@ -0,0 +1,29 @@
+#!/bin/sh
+# Start the job workers and the web server in one container. Imports, exports and
+# rebuilds only run while run_workers is up, and with SQLite on a single disk both
+# processes must live next to the database file.
+#   JOB_WORKERS      worker processes (default 1; 0 starts the web server only)
+#   GUNICORN_APP     config.wsgi:application, or config.asgi:application for uvicorn workers
+#   GUNICORN_CONFIG  config/gunicorn.py, or config/gunicorn_asgi.py with the ASGI app
+set -e
+
+# Metric samples from a previous run would be merged into this one. Clear them once,
+# before the workers or gunicorn import anything that writes there.
+if [ -n "${PROMETHEUS_MULTIPROC_DIR:-}" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
+if [ "${JOB_WORKERS:-1}" -gt 0 ]; then
+    # Restart the workers if they exit; queued and stale jobs are picked up again.
+    (
+        while true; do
+            python manage.py run_workers --processes "${JOB_WORKERS:-1}" || true
+            sleep 5
+        done
+    ) &
+fi
+
+exec gunicorn "${GUNICORN_APP:-config.wsgi:application}" \
+    --config "${GUNICORN_CONFIG:-config/gunicorn.py}" \
+    --bind "0.0.0.0:${PORT:-8000}"
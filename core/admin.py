@@ -1,6 +1,19 @@
 from django.contrib import admin
 
-from .models import Attempt, Mistake, MistakeType, Problem, ReviewItem
+from .models import (
+    Attempt,
+    DeletionLog,
+    Job,
+    Mistake,
+    MistakeRollup,
+    MistakeType,
+    Problem,
+    ReviewItem,
+    ReviewLog,
+    SchedulerProfile,
+    Tag,
+    Upload,
+)
 
 
 @admin.register(Problem)
@@ -35,3 +48,68 @@ class ReviewItemAdmin(admin.ModelAdmin):
     list_display = ("prompt", "user", "due_date", "interval_days", "ease_factor")
     list_filter = ("due_date", "user")
     search_fields = ("prompt",)
+
+
+@admin.register(ReviewLog)
+class ReviewLogAdmin(admin.ModelAdmin):
+    list_display = (
+        "review_item",
+        "user",
+        "rating",
+        "previous_interval",
+        "interval_days",
+        "elapsed_days",
+        "reviewed_at",
+    )
+    list_filter = ("rating", "user")
+    date_hierarchy = "reviewed_at"
+
+    # The log is append-only; grading is the only writer.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SchedulerProfile)
+class SchedulerProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "user",
+        "first_good_interval",
+        "first_easy_interval",
+        "second_interval",
+        "interval_modifier",
+        "target_retention",
+        "fitted_at",
+    )
+
+
+@admin.register(MistakeRollup)
+class MistakeRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "topic", "mistake_type", "month", "total", "severity_sum")
+    list_filter = ("topic", "mistake_type", "user")
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ("name",)
+    search_fields = ("name",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "user", "kind", "status", "progress_done", "progress_total", "attempts", "created_at")
+    list_filter = ("kind", "status")
+    readonly_fields = ("started_at", "heartbeat_at", "finished_at", "worker", "error")
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ("filename", "user", "size", "received", "job", "updated_at")
+
+
+@admin.register(DeletionLog)
+class DeletionLogAdmin(admin.ModelAdmin):
+    list_display = ("kind", "object_id", "user", "deleted_at")
+    list_filter = ("kind",)
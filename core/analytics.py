@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .caching import bump_dashboard_version
+from .models import Attempt, Mistake, MistakeRollup
+
+
+def _mistake_month():
+    return TruncMonth("attempt__started_at", output_field=DateField())
+
+
+def mistake_bucket(mistake_id: int) -> tuple | None:
+    """Return ``(user_id, topic, mistake_type_id, month)`` for a stored mistake."""
+    return (
+        Mistake.objects.filter(pk=mistake_id)
+        .annotate(month=_mistake_month())
+        .values_list("attempt__user_id", "attempt__problem__topic", "mistake_type_id", "month")
+        .first()
+    )
+
+
+def attempt_bucket(attempt_id: int) -> tuple | None:
+    """Return ``(user_id, topic, month)`` for a stored attempt."""
+    return (
+        Attempt.objects.filter(pk=attempt_id)
+        .annotate(month=TruncMonth("started_at", output_field=DateField()))
+        .values_list("user_id", "problem__topic", "month")
+        .first()
+    )
+
+
+def refresh_rollups(user_id: int, topics=None, mistake_type_ids=None, months=None) -> int:
+    """
+    Recompute the rollup rows for ``user_id`` inside the given scope.
+
+    Each filter narrows the buckets that are rebuilt; leaving them all out
+    rebuilds every bucket for the user. Returns the number of rows written.
+    Single writes go through ``adjust_rollup`` instead; this is for
+    ``rebuild_analytics`` and the bulk imports, which skip the signals.
+    """
+    rollups = MistakeRollup.objects.filter(user_id=user_id)
+    mistakes = Mistake.objects.filter(attempt__user_id=user_id).annotate(month=_mistake_month())
+    if topics is not None:
+        rollups = rollups.filter(topic__in=topics)
+        mistakes = mistakes.filter(attempt__problem__topic__in=topics)
+    if mistake_type_ids is not None:
+        rollups = rollups.filter(mistake_type_id__in=mistake_type_ids)
+        mistakes = mistakes.filter(mistake_type_id__in=mistake_type_ids)
+    if months is not None:
+        rollups = rollups.filter(month__in=months)
+        mistakes = mistakes.filter(month__in=months)
+
+    rows = (
+        mistakes.values("attempt__problem__topic", "mistake_type_id", "month")
+        .annotate(total=Count("id"), severity_sum=Sum("severity"))
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = MistakeRollup.objects.bulk_create(
+            [
+                MistakeRollup(
+                    user_id=user_id,
+                    topic=row["attempt__problem__topic"],
+                    mistake_type_id=row["mistake_type_id"],
+                    month=row["month"],
+                    total=row["total"],
+                    severity_sum=row["severity_sum"] or 0,
+                )
+                for row in rows
+            ]
+        )
+    # Every mistake write ends up here, so this also covers the dashboard's mistake panels.
+    transaction.on_commit(partial(bump_dashboard_version, user_id))
+    return len(created)
+
+
+def adjust_rollup(bucket: tuple | None, total: int, severity: int) -> None:
+    """
+    Add ``total`` mistakes and ``severity`` to a ``(user_id, topic, mistake_type_id, month)`` bucket.
+
+    Negative amounts take mistakes out; a bucket left empty is deleted, as
+    a rebuild would not write it.
+    """
+    if not bucket or not (total or severity):
+        return
+    user_id, topic, mistake_type_id, month = bucket
+    rows = MistakeRollup.objects.filter(user_id=user_id, topic=topic, mistake_type_id=mistake_type_id, month=month)
+    change = {"total": F("total") + total, "severity_sum": F("severity_sum") + severity}
+    with transaction.atomic():
+        if not rows.update(**change) and total > 0:
+            try:
+                with transaction.atomic():
+                    MistakeRollup.objects.create(
+                        user_id=user_id,
+                        topic=topic,
+                        mistake_type_id=mistake_type_id,
+                        month=month,
+                        total=total,
+                        severity_sum=severity,
+                    )
+            except IntegrityError:
+                # Another writer created the bucket since the update missed it.
+                rows.update(**change)
+        rows.filter(total=0).delete()
+    # Every mistake write ends up here, so this also covers the dashboard's mistake panels.
+    transaction.on_commit(partial(bump_dashboard_version, user_id))
+
+
+def mistake_counts(mistakes):
+    """Yield ``(bucket, total, severity_sum)`` for ``mistakes`` grouped by their current bucket."""
+    rows = (
+        mistakes.annotate(month=_mistake_month())
+        .values_list("attempt__user_id", "attempt__problem__topic", "mistake_type_id", "month")
+        .annotate(total=Count("id"), severity_sum=Sum("severity"))
+        .order_by()
+    )
+    for user_id, topic, mistake_type_id, month, total, severity_sum in rows:
+        yield (user_id, topic, mistake_type_id, month), total, severity_sum or 0
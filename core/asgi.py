@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+WHITENOISE_MIDDLEWARE = "whitenoise.middleware.WhiteNoiseMiddleware"
+_READ_SIZE = 64 * 1024
+
+
+def _request_headers(scope) -> dict:
+    """The ``HTTP_*`` keys WhiteNoise reads from a WSGI environ, built from ASGI headers."""
+    return {
+        "HTTP_" + name.decode("latin-1").upper().replace("-", "_"): value.decode("latin-1")
+        for name, value in scope["headers"]
+    }
+
+
+class StaticFiles:
+    """
+    Serve ``STATIC_URL`` in front of the Django ASGI application.
+
+    ``WhiteNoiseMiddleware`` is sync-only: left in ``MIDDLEWARE`` under ASGI,
+    Django adapts the chain around it and every request, static or not,
+    holds a thread for its whole duration. This app reuses WhiteNoise's file
+    index and headers (hashed names cached forever, pre-compressed variants,
+    conditional and range requests) and passes everything else straight to
+    ``app``; only the file reads leave the event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.whitenoise = WhiteNoiseMiddleware()
+
+    def find(self, path: str):
+        if not path.startswith(self.whitenoise.static_prefix):
+            return None
+        if self.whitenoise.autorefresh:
+            return self.whitenoise.find_file(path)
+        return self.whitenoise.files.get(path)
+
+    async def __call__(self, scope, receive, send):
+        static_file = self.find(scope["path"]) if scope["type"] == "http" else None
+        if static_file is None:
+            return await self.app(scope, receive, send)
+        response = await asyncio.to_thread(static_file.get_response, scope["method"], _request_headers(scope))
+        headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response.headers]
+        await send({"type": "http.response.start", "status": int(response.status), "headers": headers})
+        if response.file is None:
+            await send({"type": "http.response.body"})
+            return
+        try:
+            while chunk := await asyncio.to_thread(response.file.read, _READ_SIZE):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body"})
+        finally:
+            response.file.close()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import time as clock
+from datetime import date, datetime, time, timedelta
+
+from django.core.cache import cache
+
+from . import metrics
+
+DUE_COUNT_KEY = "core:due-count:{user_id}:{day}"
+DASHBOARD_VERSION_KEY = "core:dashboard-version:{user_id}"
+DASHBOARD_FRAGMENT_TIMEOUT = 60 * 60 * 24
+
+
+def _seconds_until_tomorrow() -> int:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def due_count_key(user_id: int, day: date | None = None) -> str:
+    # The date is part of the key, so counts roll over at midnight on their own.
+    return DUE_COUNT_KEY.format(user_id=user_id, day=(day or date.today()).isoformat())
+
+
+def due_review_count(user) -> int:
+    """Number of reviews due today for ``user``, served from the cache when possible."""
+    key = due_count_key(user.pk)
+    count = cache.get(key)
+    metrics.cache_result("due_count", count is not None)
+    if count is None:
+        from .models import ReviewItem
+
+        count = ReviewItem.objects.filter(user=user, due_date__lte=date.today()).count()
+        cache.set(key, count, _seconds_until_tomorrow())
+    return count
+
+
+def invalidate_due_count(user_id: int) -> None:
+    cache.delete(due_count_key(user_id))
+
+
+def _fresh_version() -> int:
+    # Seeded from the clock so a version lost to eviction never reuses an old number.
+    return clock.time_ns() // 1000
+
+
+def dashboard_version(user_id: int) -> int:
+    """Version stamp in ``user_id``'s dashboard fragment cache keys."""
+    key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_dashboard_version(user_id: int) -> None:
+    """Retire every cached dashboard fragment of ``user_id``."""
+    key = DASHBOARD_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
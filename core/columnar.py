@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+import zlib
+from datetime import date, datetime, timezone
+from itertools import accumulate, islice
+from typing import IO, Iterator
+
+from django.conf import settings
+
+from . import metrics
+from .exporting import EXPORT_CHUNK_SIZE, export_sections
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only where zstandard is missing
+    zstandard = None
+
+COLUMNAR_FORMAT = "oea-columnar"
+COLUMNAR_VERSION = 1
+# Rows per block; one block's columns are held in memory while it is encoded or decoded.
+COLUMNAR_BLOCK_ROWS = getattr(settings, "COLUMNAR_BLOCK_ROWS", 5000)
+# "zstd" needs the optional zstandard package.
+EXPORT_COMPRESSION = getattr(settings, "EXPORT_COMPRESSION", "zstd" if zstandard else "gzip")
+# compression -> (content type, file extension)
+COMPRESSIONS = {"gzip": ("application/gzip", "gz"), "zstd": ("application/zstd", "zst")}
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Repeated strings, stored once per block plus an index per row.
+DICTIONARY_COLUMNS = {"source", "topic", "tags", "outcome", "mistake_type", "related_mistake", "related_problem"}
+# Integer columns that mostly increase, stored as the difference from the previous row.
+DELTA_COLUMNS = {"id", "problem", "attempt"}
+# Datetimes become Unix seconds and dates days since 1970-01-01.
+DATETIME_COLUMNS = {"created_at", "started_at", "ended_at"}
+DATE_COLUMNS = {"next_review_date", "due_date"}
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+COLUMNAR_READ_SIZE = 64 * 1024
+
+
+class ColumnarError(ValueError):
+    """A compressed export that cannot be read."""
+
+
+def available_compressions() -> list[str]:
+    return [name for name in COMPRESSIONS if name != "zstd" or zstandard is not None]
+
+
+def _compressor(compression: str):
+    if compression == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    if compression == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise ColumnarError(f"Unsupported compression {compression!r}; use one of {available_compressions()}.")
+
+
+def _encode_column(name: str, values: list) -> dict:
+    column = {}
+    if name in DATETIME_COLUMNS:
+        column["type"] = "datetime"
+        values = [None if value is None else math.floor(datetime.fromisoformat(value).timestamp()) for value in values]
+    elif name in DATE_COLUMNS:
+        column["type"] = "date"
+        values = [None if value is None else date.fromisoformat(value).toordinal() - _EPOCH_DAY for value in values]
+    if name in DICTIONARY_COLUMNS:
+        index = {}
+        column["codes"] = [index.setdefault(value, len(index)) for value in values]
+        column["dict"] = list(index)
+    elif (name in DELTA_COLUMNS or name in DATETIME_COLUMNS) and None not in values:
+        column["delta"] = [value - previous for previous, value in zip([0] + values, values)]
+    else:
+        column["values"] = values
+    return column
+
+
+def _decode_column(column: dict) -> list:
+    if "dict" in column:
+        dictionary = column["dict"]
+        values = [dictionary[code] for code in column["codes"]]
+    elif "delta" in column:
+        values = list(accumulate(column["delta"]))
+    else:
+        values = column["values"]
+    if column.get("type") == "datetime":
+        values = [
+            None if value is None else datetime.fromtimestamp(value, timezone.utc).isoformat() for value in values
+        ]
+    elif column.get("type") == "date":
+        values = [None if value is None else date.fromordinal(value + _EPOCH_DAY).isoformat() for value in values]
+    return values
+
+
+def _line(value: dict) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode() + b"\n"
+
+
+def iter_export_columnar(
+    user,
+    compression: str | None = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+    block_rows: int | None = None,
+    progress=None,
+) -> Iterator[bytes]:
+    """
+    Stream the export as compressed, column-oriented blocks.
+
+    The decompressed stream is NDJSON: a header line, then blocks of up to
+    ``block_rows`` rows of one section, each holding one array per field
+    (see ``_encode_column``). Rows decode to the same dicts as the JSON
+    export, except that datetimes keep whole seconds only. ``progress(rows)``
+    is called after every block.
+    """
+    compressor = _compressor(compression or EXPORT_COMPRESSION)
+    block_rows = block_rows or COLUMNAR_BLOCK_ROWS
+    started = time.perf_counter()
+    counts = {}
+    yield compressor.compress(_line({"format": COLUMNAR_FORMAT, "version": COLUMNAR_VERSION}))
+    for name, rows in export_sections(user, chunk_size=chunk_size):
+        counts[name] = 0
+        while block := list(islice(rows, block_rows)):
+            columns = {field: _encode_column(field, [row[field] for row in block]) for field in block[0]}
+            data = compressor.compress(_line({"table": name, "rows": len(block), "columns": columns}))
+            counts[name] += len(block)
+            if progress:
+                progress(sum(counts.values()))
+            if data:
+                yield data
+    yield compressor.flush()
+    metrics.observe_transfer("export", counts, time.perf_counter() - started)
+
+
+def is_columnar(fp: IO[bytes]) -> bool:
+    """Whether a seekable file starts with a gzip or zstd header; the position is restored."""
+    start = fp.tell()
+    magic = fp.read(len(ZSTD_MAGIC))
+    fp.seek(start)
+    return magic.startswith(GZIP_MAGIC) or magic == ZSTD_MAGIC
+
+
+def _decompressor(magic: bytes):
+    if magic.startswith(GZIP_MAGIC):
+        return zlib.decompressobj(31)
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise ColumnarError("Reading zstd exports needs the zstandard package.")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ColumnarError("Not a compressed export.")
+
+
+def _decompressed_chunks(fp: IO[bytes], read_size: int = COLUMNAR_READ_SIZE) -> Iterator[bytes]:
+    magic = fp.read(len(ZSTD_MAGIC))
+    decompressor = _decompressor(magic)
+    data = magic
+    while data:
+        yield decompressor.decompress(data)
+        data = fp.read(read_size)
+    # Both decoders just stop at the end of a cut-off file; a short import must not look complete.
+    if not decompressor.eof:
+        raise ColumnarError("The compressed export is truncated.")
+
+
+def check_columnar(fp: IO[bytes]) -> None:
+    """
+    Decompress a seekable file to its end marker, discarding the output; the position is restored.
+
+    ``iter_columnar_rows`` only notices a truncated file after yielding
+    every row before the cut, and ``import_rows`` commits as it goes, so
+    the import job calls this first.
+    """
+    start = fp.tell()
+    errors = (zlib.error,) if zstandard is None else (zlib.error, zstandard.ZstdError)
+    try:
+        for _ in _decompressed_chunks(fp):
+            pass
+    except errors as exc:
+        raise ColumnarError(f"Invalid compressed export: {exc}") from exc
+    finally:
+        fp.seek(start)
+
+
+def _decompressed_lines(fp: IO[bytes]) -> Iterator[bytes]:
+    pending = []
+    for chunk in _decompressed_chunks(fp):
+        if b"\n" in chunk:
+            lines = chunk.split(b"\n")
+            lines[0] = b"".join(pending) + lines[0]
+            pending = [lines.pop()]
+            yield from lines
+        elif chunk:
+            pending.append(chunk)
+    if any(pending):
+        yield b"".join(pending)
+
+
+def iter_columnar_rows(fp: IO[bytes]) -> Iterator[tuple[str, dict]]:
+    """
+    Decode a compressed export incrementally, yielding ``(section, row)`` events.
+
+    The events match ``core.jsonstream.iter_section_rows`` on a JSON export,
+    so both feed ``import_rows``. Only one block is decoded at a time.
+    Damaged or foreign input raises ``ColumnarError``, a truncated file only
+    once the rows before the cut have been yielded (see ``check_columnar``).
+    """
+    errors = (zlib.error, KeyError, IndexError, TypeError, ValueError)
+    if zstandard is not None:
+        errors += (zstandard.ZstdError,)
+    try:
+        lines = _decompressed_lines(fp)
+        header = json.loads(next(lines, b"null"))
+        if not isinstance(header, dict) or header.get("format") != COLUMNAR_FORMAT:
+            raise ColumnarError("Not a compressed Olympiad Error Atlas export.")
+        if header.get("version") != COLUMNAR_VERSION:
+            raise ColumnarError(f"Unsupported export version {header.get('version')!r}.")
+        for number, line in enumerate(lines, 2):
+            if not line.strip():
+                continue
+            block = json.loads(line)
+            names = list(block["columns"])
+            columns = [_decode_column(block["columns"][name]) for name in names]
+            if any(len(values) != block["rows"] for values in columns):
+                raise ColumnarError(f"Block on line {number} has columns of different lengths.")
+            for values in zip(*columns):
+                yield block["table"], dict(zip(names, values))
+    except ColumnarError:
+        raise
+    except errors as exc:
+        raise ColumnarError(f"Invalid compressed export: {exc}") from exc
@@ -1,10 +1,7 @@
-from datetime import date
-
-from .models import ReviewItem
+from .caching import due_review_count
 
 
 def analytics_counts(request):
     if not request.user.is_authenticated:
         return {}
-    due_reviews = ReviewItem.objects.filter(user=request.user, due_date__lte=date.today()).count()
-    return {"nav_due_reviews": due_reviews}
+    return {"nav_due_reviews": due_review_count(request.user)}
@@ -0,0 +1,411 @@
+from __future__ import annotations
+
+import base64
+import json
+import time
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import IO, Iterable, Iterator
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .analytics import refresh_rollups
+from .caching import bump_dashboard_version, invalidate_due_count
+from .exporting import EXPORT_CHUNK_SIZE
+from .importing import ImportResult, _parse_date, _parse_datetime
+from .models import Attempt, DeletionLog, Mistake, MistakeType, Problem, ReviewItem, SyncKey
+from .search import index_objects
+from .sqlite import run_with_retry
+from .tagging import sync_problem_tags
+
+DELTA_FORMAT = "oea-delta"
+DELTA_VERSION = 1
+# The next cursor starts this far before the export, so rows written by transactions
+# that were still open while it ran are sent again next time instead of being missed.
+DELTA_OVERLAP_SECONDS = getattr(settings, "DELTA_OVERLAP_SECONDS", 60)
+# Deletion log rows are kept this long; older cursors need a fresh full delta.
+DELETION_LOG_DAYS = getattr(settings, "DELETION_LOG_DAYS", 90)
+DELTA_BATCH_SIZE = getattr(settings, "DELTA_BATCH_SIZE", 500)
+
+# (kind, model, owner lookup, exported columns, renamed columns), parents before children.
+_KINDS = [
+    (
+        DeletionLog.KIND_PROBLEM,
+        Problem,
+        "created_by",
+        ["id", "title", "source", "topic", "difficulty", "tags", "statement", "updated_at"],
+        {},
+    ),
+    (
+        DeletionLog.KIND_ATTEMPT,
+        Attempt,
+        "user",
+        [
+            "id",
+            "problem_id",
+            "started_at",
+            "ended_at",
+            "outcome",
+            "final_answer",
+            "solution_notes",
+            "confidence",
+            "updated_at",
+        ],
+        {"problem_id": "problem"},
+    ),
+    (
+        DeletionLog.KIND_MISTAKE,
+        Mistake,
+        "attempt__user",
+        [
+            "id",
+            "attempt_id",
+            "mistake_type__name",
+            "severity",
+            "short_label",
+            "detailed_postmortem",
+            "conceptual_gap",
+            "execution_error",
+            "strategy_error",
+            "fix_plan",
+            "next_review_date",
+            "updated_at",
+        ],
+        {"attempt_id": "attempt", "mistake_type__name": "mistake_type"},
+    ),
+    (
+        DeletionLog.KIND_REVIEW,
+        ReviewItem,
+        "user",
+        [
+            "id",
+            "related_mistake_id",
+            "related_problem_id",
+            "prompt",
+            "answer_key",
+            "ease_factor",
+            "interval_days",
+            "due_date",
+            "updated_at",
+        ],
+        {"related_mistake_id": "related_mistake", "related_problem_id": "related_problem"},
+    ),
+]
+_MODELS = {kind: (model, owner) for kind, model, owner, _, _ in _KINDS}
+
+
+class DeltaError(ValueError):
+    """A cursor or delta document that cannot be used."""
+
+
+def encode_cursor(moment: datetime) -> str:
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> datetime | None:
+    """An empty cursor means "from the beginning"; an unreadable one raises ``DeltaError``."""
+    if not cursor:
+        return None
+    try:
+        moment = parse_datetime(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode())
+    except (ValueError, UnicodeDecodeError):
+        moment = None
+    if moment is None or timezone.is_naive(moment):
+        raise DeltaError("Invalid cursor.")
+    return moment
+
+
+def _line(value: dict) -> str:
+    return json.dumps(value, separators=(",", ":")) + "\n"
+
+
+def _row(values: dict, renames: dict) -> dict:
+    return {
+        renames.get(name, name): value.isoformat() if isinstance(value, (date, datetime)) else value
+        for name, value in values.items()
+    }
+
+
+def delta_export(user, cursor: str | None = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> tuple[str, Iterator[str]]:
+    """
+    Return the next cursor and the NDJSON lines of everything that changed since ``cursor``.
+
+    The first line is a header naming the format and both cursors. Then
+    every problem, attempt, mistake and review card updated since the
+    cursor follows as an ``upsert`` (parents first), and everything deleted
+    since then as a ``delete``. Without a cursor all rows are sent, which is
+    how a backup chain starts. Rows near the cursor may be sent twice;
+    ``apply_delta`` is idempotent, so that is harmless.
+    """
+    since = decode_cursor(cursor)
+    now = timezone.now()
+    if since is not None and since < now - timedelta(days=DELETION_LOG_DAYS):
+        raise DeltaError(f"The cursor is older than the {DELETION_LOG_DAYS}-day deletion log; start from scratch.")
+    following = now - timedelta(seconds=DELTA_OVERLAP_SECONDS)
+    if since is not None:
+        following = max(following, since)
+    next_cursor = encode_cursor(following)
+    return next_cursor, _delta_lines(user, since, next_cursor, chunk_size)
+
+
+def _delta_lines(user, since: datetime | None, next_cursor: str, chunk_size: int) -> Iterator[str]:
+    started = time.perf_counter()
+    counts = {}
+    yield _line(
+        {
+            "format": DELTA_FORMAT,
+            "version": DELTA_VERSION,
+            "since": since.isoformat() if since else None,
+            "cursor": next_cursor,
+        }
+    )
+    for kind, model, owner, columns, renames in _KINDS:
+        rows = model.objects.filter(**{owner: user})
+        if since is not None:
+            rows = rows.filter(updated_at__gte=since)
+        counts[kind] = 0
+        for values in rows.order_by("pk").values(*columns).iterator(chunk_size=chunk_size):
+            yield _line({"kind": kind, "op": "upsert", "row": _row(values, renames)})
+            counts[kind] += 1
+    if since is not None:
+        counts["deletes"] = 0
+        deletions = DeletionLog.objects.filter(user=user, deleted_at__gte=since).order_by("deleted_at", "pk")
+        for kind, object_id in deletions.values_list("kind", "object_id").iterator(chunk_size=chunk_size):
+            yield _line({"kind": kind, "op": "delete", "id": object_id})
+            counts["deletes"] += 1
+    metrics.observe_transfer("delta_export", counts, time.perf_counter() - started)
+
+
+def prune_deletion_log(days: int | None = None) -> int:
+    cutoff = timezone.now() - timedelta(days=DELETION_LOG_DAYS if days is None else days)
+    deleted, _ = DeletionLog.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
+
+
+def is_delta(fp: IO[bytes]) -> bool:
+    """Whether a seekable file starts with a delta header line; the position is restored."""
+    start = fp.tell()
+    try:
+        header = json.loads(fp.readline(4096))
+    except (ValueError, UnicodeDecodeError):
+        return False
+    finally:
+        fp.seek(start)
+    return isinstance(header, dict) and header.get("format") == DELTA_FORMAT
+
+
+def read_delta(fp: IO[bytes]) -> Iterator[dict]:
+    """Decode an NDJSON delta one line at a time."""
+    for number, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise DeltaError(f"Line {number} is not valid JSON: {exc}") from exc
+
+
+class _Applier:
+    """Applies batches of delta lines for one user through its ``SyncKey`` map."""
+
+    def __init__(self, user, batch_size: int):
+        self.user = user
+        self.batch_size = batch_size
+        self.mistake_types: dict[str, int] = {}
+        self.counts: dict[str, int] = {}
+
+    def keys(self, kind: str, source_ids) -> dict[int, int]:
+        ids = [source_id for source_id in source_ids if isinstance(source_id, int)]
+        if not ids:
+            return {}
+        rows = SyncKey.objects.filter(user=self.user, kind=kind, source_id__in=ids)
+        return dict(rows.values_list("source_id", "object_id"))
+
+    def apply(self, kind: str, op: str, lines: list[dict]) -> None:
+        if op == "delete":
+            self.delete(kind, [line.get("id") for line in lines])
+        else:
+            self.upsert(kind, [line["row"] for line in lines if isinstance(line.get("row"), dict)])
+
+    def delete(self, kind: str, source_ids: list) -> None:
+        model, owner = _MODELS[kind]
+        mapped = self.keys(kind, source_ids)
+        # Deleting through the ORM keeps rollups, search and the local deletion log current.
+        model.objects.filter(**{owner: self.user}, pk__in=list(mapped.values())).delete()
+        SyncKey.objects.filter(user=self.user, kind=kind, source_id__in=list(mapped)).delete()
+        self.counts[f"{kind}_deleted"] = self.counts.get(f"{kind}_deleted", 0) + len(mapped)
+
+    def upsert(self, kind: str, rows: list[dict]) -> None:
+        model, owner = _MODELS[kind]
+        rows = [row for row in rows if isinstance(row.get("id"), int)]
+        mapped = self.keys(kind, [row["id"] for row in rows])
+        existing = set(
+            model.objects.filter(**{owner: self.user}, pk__in=list(mapped.values())).values_list("pk", flat=True)
+        )
+        build = getattr(self, f"_{kind}_fields")
+        fields_by_row = build(rows)
+        now = timezone.now()
+        updates, creates = [], []
+        for row in rows:
+            fields = fields_by_row.get(row["id"])
+            if fields is None:
+                continue  # Its parent was never applied here.
+            obj = model(**fields)
+            if mapped.get(row["id"]) in existing:
+                obj.pk = mapped[row["id"]]
+                obj.updated_at = now
+                updates.append(obj)
+            else:
+                creates.append((row["id"], obj))
+        if kind == DeletionLog.KIND_ATTEMPT:
+            for obj in updates + [obj for _, obj in creates]:
+                obj.update_time_spent()
+        if updates:
+            names = [name for name in fields_by_row[next(iter(fields_by_row))] if name not in ("user", "created_by")]
+            extra = ["time_spent_seconds"] if kind == DeletionLog.KIND_ATTEMPT else []
+            model.objects.bulk_update(updates, names + extra + ["updated_at"], batch_size=self.batch_size)
+        model.objects.bulk_create([obj for _, obj in creates], batch_size=self.batch_size)
+        stale = [source_id for source_id, _ in creates if source_id in mapped]
+        if stale:
+            SyncKey.objects.filter(user=self.user, kind=kind, source_id__in=stale).delete()
+        SyncKey.objects.bulk_create(
+            [SyncKey(user=self.user, kind=kind, source_id=source_id, object_id=obj.pk) for source_id, obj in creates],
+            batch_size=self.batch_size,
+        )
+        written = updates + [obj for _, obj in creates]
+        # bulk writes skip the model signals; keep tags and search current here.
+        if kind == DeletionLog.KIND_PROBLEM:
+            sync_problem_tags(written)
+        if kind != DeletionLog.KIND_REVIEW:
+            index_objects(kind, [obj.pk for obj in written])
+        self.counts[kind] = self.counts.get(kind, 0) + len(written)
+
+    def _problem_fields(self, rows: list[dict]) -> dict:
+        return {
+            row["id"]: {
+                "created_by": self.user,
+                "title": str(row.get("title") or "Untitled")[:200],
+                "source": row.get("source") or "",
+                "topic": row.get("topic") or "OTHER",
+                "difficulty": row.get("difficulty") or 5,
+                "tags": row.get("tags") or "",
+                "statement": row.get("statement") or "",
+            }
+            for row in rows
+        }
+
+    def _attempt_fields(self, rows: list[dict]) -> dict:
+        problems = self.keys(DeletionLog.KIND_PROBLEM, {row.get("problem") for row in rows})
+        return {
+            row["id"]: {
+                "user": self.user,
+                "problem_id": problems[row.get("problem")],
+                "started_at": _parse_datetime(row.get("started_at")) or timezone.now(),
+                "ended_at": _parse_datetime(row.get("ended_at")),
+                "outcome": row.get("outcome") or "stuck",
+                "final_answer": row.get("final_answer") or "",
+                "solution_notes": row.get("solution_notes") or "",
+                "confidence": row.get("confidence") or 3,
+            }
+            for row in rows
+            if row.get("problem") in problems
+        }
+
+    def _mistake_type_ids(self, names: set) -> dict[str, int]:
+        names = {name for name in names if isinstance(name, str) and name}
+        missing = names - set(self.mistake_types)
+        if missing:
+            MistakeType.objects.bulk_create([MistakeType(name=name) for name in missing], ignore_conflicts=True)
+            self.mistake_types.update(MistakeType.objects.filter(name__in=missing).values_list("name", "pk"))
+        return self.mistake_types
+
+    def _mistake_fields(self, rows: list[dict]) -> dict:
+        attempts = self.keys(DeletionLog.KIND_ATTEMPT, {row.get("attempt") for row in rows})
+        types = self._mistake_type_ids({row.get("mistake_type") for row in rows})
+        return {
+            row["id"]: {
+                "attempt_id": attempts[row.get("attempt")],
+                "mistake_type_id": types[row.get("mistake_type")],
+                "severity": row.get("severity") or 3,
+                "short_label": str(row.get("short_label") or "Mistake")[:150],
+                "detailed_postmortem": row.get("detailed_postmortem") or "",
+                "conceptual_gap": bool(row.get("conceptual_gap")),
+                "execution_error": bool(row.get("execution_error")),
+                "strategy_error": bool(row.get("strategy_error")),
+                "fix_plan": row.get("fix_plan") or "",
+                "next_review_date": _parse_date(row.get("next_review_date")),
+            }
+            for row in rows
+            if row.get("attempt") in attempts and row.get("mistake_type") in types
+        }
+
+    def _review_fields(self, rows: list[dict]) -> dict:
+        mistakes = self.keys(DeletionLog.KIND_MISTAKE, {row.get("related_mistake") for row in rows})
+        problems = self.keys(DeletionLog.KIND_PROBLEM, {row.get("related_problem") for row in rows})
+        return {
+            row["id"]: {
+                "user": self.user,
+                "related_mistake_id": mistakes.get(row.get("related_mistake")),
+                "related_problem_id": problems.get(row.get("related_problem")),
+                "prompt": row.get("prompt") or "",
+                "answer_key": row.get("answer_key") or "",
+                "ease_factor": row.get("ease_factor") or 2.5,
+                "interval_days": row.get("interval_days") or 0,
+                "due_date": _parse_date(row.get("due_date")) or date.today(),
+            }
+            for row in rows
+        }
+
+
+def apply_delta(user, lines: Iterable[dict], batch_size: int | None = None, progress=None) -> ImportResult:
+    """
+    Apply a delta produced by ``delta_export`` to ``user``'s account.
+
+    Rows are matched to earlier deltas through ``SyncKey``, so applying the
+    same delta twice, or overlapping deltas, leaves the same data. Lines are
+    applied in batches of consecutive rows of one kind and operation, each
+    batch in its own transaction, so an interrupted apply can simply be
+    repeated. Meant for a different account or instance than the source:
+    the source's own rows are not matched to themselves.
+    """
+    batch_size = batch_size or DELTA_BATCH_SIZE
+    started = time.perf_counter()
+    lines = iter(lines)
+    header = next(lines, None)
+    if not isinstance(header, dict) or header.get("format") != DELTA_FORMAT:
+        raise DeltaError("Not a delta export: the first line must be its header.")
+    if header.get("version") != DELTA_VERSION:
+        raise DeltaError(f"Unsupported delta version {header.get('version')!r}.")
+    applier = _Applier(user, batch_size)
+    done = 0
+
+    def flush(kind: str, op: str, batch: list) -> None:
+        nonlocal done
+        run_with_retry(applier.apply, kind, op, batch)
+        done += len(batch)
+        if progress:
+            progress(done)
+
+    current, batch = None, []
+    for number, line in enumerate(lines, 2):
+        if not isinstance(line, dict) or line.get("kind") not in _MODELS or line.get("op") not in ("upsert", "delete"):
+            raise DeltaError(f"Line {number} is not a delta row.")
+        key = (line["kind"], line["op"])
+        if batch and (key != current or len(batch) >= batch_size):
+            flush(*current, batch)
+            batch = []
+        current = key
+        batch.append(line)
+    if batch:
+        flush(*current, batch)
+
+    run_with_retry(refresh_rollups, user.pk)
+    transaction.on_commit(partial(invalidate_due_count, user.pk))
+    transaction.on_commit(partial(bump_dashboard_version, user.pk))
+    result = ImportResult(counts=applier.counts, elapsed=time.perf_counter() - started)
+    metrics.observe_transfer("delta_import", result.counts, result.elapsed)
+    return result
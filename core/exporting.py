@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Iterable, Iterator
+
+from django.conf import settings
+
+from . import metrics
+from .models import Attempt, Mistake, MistakeType, Problem, ReviewItem
+
+EXPORT_CHUNK_SIZE = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _problem_rows(user):
+    return Problem.objects.filter(created_by=user).values(
+        "id", "title", "source", "topic", "difficulty", "tags", "statement", "created_at"
+    )
+
+
+def _problem(row: dict) -> dict:
+    row["created_at"] = _iso(row["created_at"])
+    return row
+
+
+def _attempt_rows(user):
+    return Attempt.objects.filter(user=user).values(
+        "id",
+        "problem_id",
+        "started_at",
+        "ended_at",
+        "outcome",
+        "final_answer",
+        "solution_notes",
+        "confidence",
+    )
+
+
+def _attempt(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "problem": row["problem_id"],
+        "started_at": _iso(row["started_at"]),
+        "ended_at": _iso(row["ended_at"]),
+        "outcome": row["outcome"],
+        "final_answer": row["final_answer"],
+        "solution_notes": row["solution_notes"],
+        "confidence": row["confidence"],
+    }
+
+
+def _mistake_type_rows(user=None):
+    return MistakeType.objects.values("name", "description")
+
+
+def _mistake_rows(user):
+    return Mistake.objects.filter(attempt__user=user).values(
+        "attempt_id",
+        "mistake_type__name",
+        "severity",
+        "short_label",
+        "detailed_postmortem",
+        "conceptual_gap",
+        "execution_error",
+        "strategy_error",
+        "fix_plan",
+        "next_review_date",
+    )
+
+
+def _mistake(row: dict) -> dict:
+    return {
+        "attempt": row["attempt_id"],
+        "mistake_type": row["mistake_type__name"],
+        "severity": row["severity"],
+        "short_label": row["short_label"],
+        "detailed_postmortem": row["detailed_postmortem"],
+        "conceptual_gap": row["conceptual_gap"],
+        "execution_error": row["execution_error"],
+        "strategy_error": row["strategy_error"],
+        "fix_plan": row["fix_plan"],
+        "next_review_date": _iso(row["next_review_date"]),
+    }
+
+
+def _review_rows(user):
+    return ReviewItem.objects.filter(user=user).values(
+        "related_mistake__short_label",
+        "related_problem__title",
+        "prompt",
+        "answer_key",
+        "ease_factor",
+        "interval_days",
+        "due_date",
+    )
+
+
+def _review(row: dict) -> dict:
+    return {
+        "related_mistake": row["related_mistake__short_label"],
+        "related_problem": row["related_problem__title"],
+        "prompt": row["prompt"],
+        "answer_key": row["answer_key"],
+        "ease_factor": row["ease_factor"],
+        "interval_days": row["interval_days"],
+        "due_date": _iso(row["due_date"]),
+    }
+
+
+def _unchanged(row: dict) -> dict:
+    return row
+
+
+def iter_problems(user, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    return map(_problem, _problem_rows(user).iterator(chunk_size=chunk_size))
+
+
+def iter_attempts(user, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    return map(_attempt, _attempt_rows(user).iterator(chunk_size=chunk_size))
+
+
+def iter_mistake_types(user=None, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    return _mistake_type_rows(user).iterator(chunk_size=chunk_size)
+
+
+def iter_mistakes(user, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    return map(_mistake, _mistake_rows(user).iterator(chunk_size=chunk_size))
+
+
+def iter_reviews(user, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict]:
+    return map(_review, _review_rows(user).iterator(chunk_size=chunk_size))
+
+
+# Section order matches the historical export layout; one query per section.
+# Each entry is (name, values() queryset for a user, row -> exported dict).
+EXPORT_SECTIONS = [
+    ("problems", _problem_rows, _problem),
+    ("attempts", _attempt_rows, _attempt),
+    ("mistake_types", _mistake_type_rows, _unchanged),
+    ("mistakes", _mistake_rows, _mistake),
+    ("reviews", _review_rows, _review),
+]
+
+
+def export_sections(user, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[tuple[str, Iterable[dict]]]:
+    """Yield ``(section, rows)`` pairs; rows are produced lazily from the database."""
+    for name, rows, export_row in EXPORT_SECTIONS:
+        yield name, map(export_row, rows(user).iterator(chunk_size=chunk_size))
+
+
+def _section_header(index: int, name: str) -> str:
+    return "%s\n  %s: [" % ("," if index else "", json.dumps(name))
+
+
+def count_export_rows(user) -> int:
+    return sum(rows(user).count() for _, rows, _ in EXPORT_SECTIONS)
+
+
+def iter_export_json(user, chunk_size: int = EXPORT_CHUNK_SIZE, progress=None) -> Iterator[str]:
+    """
+    Stream the JSON export one row at a time.
+
+    The output is a single JSON document with the same schema as the old
+    in-memory export, so memory use stays flat regardless of account size.
+    Row counts and duration are recorded once the stream has been consumed.
+    ``progress(rows)`` is called every ``chunk_size`` rows and at the end.
+    """
+    started = time.perf_counter()
+    counts = {}
+    yield "{"
+    for index, (name, rows) in enumerate(export_sections(user, chunk_size=chunk_size)):
+        yield _section_header(index, name)
+        separator = "\n    "
+        counts[name] = 0
+        for row in rows:
+            yield separator + json.dumps(row)
+            separator = ",\n    "
+            counts[name] += 1
+            if progress and counts[name] % chunk_size == 0:
+                progress(sum(counts.values()))
+        yield "\n  ]"
+    yield "\n}\n"
+    if progress:
+        progress(sum(counts.values()))
+    metrics.observe_transfer("export", counts, time.perf_counter() - started)
+
@@ -1,15 +1,27 @@
 import django_filters
 
 from .models import Problem, TOPIC_CHOICES
+from .tagging import filter_by_tags
+
+TAG_MODE_CHOICES = [("any", "Any tag"), ("all", "All tags")]
 
 
 class ProblemFilter(django_filters.FilterSet):
     topic = django_filters.MultipleChoiceFilter(choices=TOPIC_CHOICES)
     difficulty_min = django_filters.NumberFilter(field_name="difficulty", lookup_expr="gte")
     difficulty_max = django_filters.NumberFilter(field_name="difficulty", lookup_expr="lte")
-    tags = django_filters.CharFilter(field_name="tags", lookup_expr="icontains")
+    tags = django_filters.CharFilter(method="filter_tags")
+    tag_mode = django_filters.ChoiceFilter(choices=TAG_MODE_CHOICES, method="filter_tag_mode")
     source = django_filters.CharFilter(field_name="source", lookup_expr="icontains")
 
     class Meta:
         model = Problem
         fields = ["topic", "difficulty", "tags", "source"]
+
+    def filter_tags(self, queryset, name, value):
+        match_all = self.form.cleaned_data.get("tag_mode") == "all"
+        return filter_by_tags(queryset, value, match_all=match_all)
+
+    def filter_tag_mode(self, queryset, name, value):
+        # Consumed by filter_tags.
+        return queryset
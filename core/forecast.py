@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from . import metrics
+from .caching import DASHBOARD_FRAGMENT_TIMEOUT, dashboard_version
+from .models import ReviewItem, ReviewLog, SchedulerProfile
+from .scheduler import DEFAULT_PARAMETERS, SchedulerParameters, next_states_numpy, np
+
+FORECAST_DAYS = 30
+FORECAST_RUNS = 100
+# Ratings are drawn through a lookup table of this many equally likely slots.
+SAMPLING_RESOLUTION = 1024
+PERCENTILES = (10, 50, 90)
+# Again/Hard/Good/Easy mix assumed before a user has graded any cards.
+DEFAULT_RATING_PROBS = (0.1, 0.15, 0.6, 0.15)
+# The default mix counts as this many grades, so a short history only nudges it.
+PRIOR_WEIGHT = 20
+RATING_HISTORY_DAYS = 180
+FORECAST_KEY = "core:forecast:{user_id}:{version}:{day}"
+
+
+@dataclass
+class Forecast:
+    dates: list[date]
+    mean: list[float]
+    bands: dict[int, list[float]] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            "dates": [d.isoformat() for d in self.dates],
+            "mean": self.mean,
+            "percentiles": {str(p): values for p, values in self.bands.items()},
+        }
+
+
+def rating_distribution(user) -> tuple[float, ...]:
+    """Probability of each rating (Again..Easy) for ``user``'s future grades, from recent review logs."""
+    since = timezone.now() - timedelta(days=RATING_HISTORY_DAYS)
+    counts = dict(
+        ReviewLog.objects.filter(user=user, reviewed_at__gte=since)
+        .order_by()
+        .values_list("rating")
+        .annotate(n=Count("pk"))
+    )
+    total = sum(counts.values()) + PRIOR_WEIGHT
+    return tuple((counts.get(r, 0) + PRIOR_WEIGHT * p) / total for r, p in enumerate(DEFAULT_RATING_PROBS))
+
+
+def simulate_load(
+    ease_factors,
+    interval_days,
+    due_offsets,
+    rating_probs=DEFAULT_RATING_PROBS,
+    days: int = FORECAST_DAYS,
+    runs: int = FORECAST_RUNS,
+    seed: int | None = None,
+    params: SchedulerParameters = DEFAULT_PARAMETERS,
+):
+    """
+    Monte Carlo review load: an array of shape ``(runs, days)`` with cards due per day.
+
+    ``due_offsets`` are days from today (overdue cards count as today). Every
+    run replays the SM-2 rules with ratings drawn from ``rating_probs``. Each
+    step advances all cards still inside the horizon at once, so the cost
+    scales with reviews in the horizon rather than ``days * cards``.
+    """
+    if np is None:
+        raise RuntimeError("Review forecasting requires numpy.")
+    rng = np.random.default_rng(seed)
+    cumulative = np.cumsum(np.asarray(rating_probs, dtype=np.float64))
+    slots = (np.arange(SAMPLING_RESOLUTION) + 0.5) / SAMPLING_RESOLUTION
+    rating_table = np.minimum(np.searchsorted(cumulative / cumulative[-1], slots, side="right"), 3)
+    cards = len(ease_factors)
+    loads = np.zeros(runs * days, dtype=np.int64)
+    if cards == 0 or days <= 0:
+        return loads.reshape(runs, days)
+
+    due = np.maximum(np.asarray(due_offsets, dtype=np.int64), 0)
+    upcoming = due < days
+    ef = np.tile(np.asarray(ease_factors, dtype=np.float64)[upcoming], runs)
+    iv = np.tile(np.asarray(interval_days, dtype=np.int64)[upcoming], runs)
+    due = np.tile(due[upcoming], runs)
+    slot = np.repeat(np.arange(runs, dtype=np.int64) * days, int(upcoming.sum()))
+
+    while due.size:
+        loads += np.bincount(slot + due, minlength=runs * days)
+        ratings = rating_table[rng.integers(0, SAMPLING_RESOLUTION, size=due.size)]
+        ef, iv = next_states_numpy(ef, iv, ratings, params)
+        due = due + iv
+        keep = np.flatnonzero(due < days)
+        ef, iv, due, slot = ef[keep], iv[keep], due[keep], slot[keep]
+    return loads.reshape(runs, days)
+
+
+def forecast_reviews(
+    user,
+    days: int = FORECAST_DAYS,
+    runs: int = FORECAST_RUNS,
+    today: date | None = None,
+    seed: int | None = None,
+) -> Forecast:
+    """Percentile bands of ``user``'s daily review load for the next ``days`` days."""
+    today = today or date.today()
+    horizon = today + timedelta(days=days)
+    rows = list(
+        ReviewItem.objects.filter(user=user, due_date__lt=horizon).values_list(
+            "ease_factor", "interval_days", "due_date"
+        )
+    )
+    eases = [r[0] for r in rows]
+    intervals = [r[1] for r in rows]
+    offsets = [(r[2] - today).days for r in rows]
+    loads = simulate_load(
+        eases,
+        intervals,
+        offsets,
+        rating_distribution(user),
+        days=days,
+        runs=runs,
+        seed=seed,
+        params=SchedulerProfile.parameters_for(user.pk),
+    )
+    bands = np.percentile(loads, PERCENTILES, axis=0)
+    return Forecast(
+        dates=[today + timedelta(days=i) for i in range(days)],
+        mean=np.round(loads.mean(axis=0), 2).tolist(),
+        bands={p: np.round(band, 1).tolist() for p, band in zip(PERCENTILES, bands)},
+    )
+
+
+def dashboard_forecast(user) -> dict:
+    """
+    ``forecast_reviews(user).as_dict()``, cached until the user's next grade.
+
+    The key carries the dashboard version, which every grade and card change
+    bumps, and today's date, since the forecast starts today.
+    """
+    today = date.today()
+    key = FORECAST_KEY.format(user_id=user.pk, version=dashboard_version(user.pk), day=today.isoformat())
+    forecast = cache.get(key)
+    metrics.cache_result("forecast", forecast is not None)
+    if forecast is None:
+        forecast = forecast_reviews(user, today=today).as_dict()
+        cache.set(key, forecast, DASHBOARD_FRAGMENT_TIMEOUT)
+    return forecast
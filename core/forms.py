@@ -78,3 +78,24 @@ class ReviewGradeForm(forms.Form):
 
 class ImportForm(forms.Form):
     file = forms.FileField()
+
+
+class RescheduleForm(forms.Form):
+    MODE_CHOICES = [("spread", "Spread overdue cards"), ("regrade", "Grade every due card")]
+
+    mode = forms.ChoiceField(choices=MODE_CHOICES, widget=forms.Select(attrs={"class": "form-select"}))
+    days = forms.IntegerField(
+        min_value=1, max_value=365, initial=7, widget=forms.NumberInput(attrs={"class": "form-control"})
+    )
+    rating = forms.TypedChoiceField(
+        choices=ReviewItem.RATING_CHOICES,
+        coerce=int,
+        initial=ReviewItem.RATING_GOOD,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
+    def params(self) -> dict:
+        data = self.cleaned_data
+        if data["mode"] == "spread":
+            return {"mode": "spread", "days": data["days"]}
+        return {"mode": "regrade", "rating": data["rating"]}
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from functools import partial
+from typing import Iterable, Iterator
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .analytics import refresh_rollups
+from .caching import bump_dashboard_version, invalidate_due_count
+from .models import Attempt, ImportKey, Mistake, MistakeType, Problem, ReviewItem, SearchDocument
+from .search import index_objects
+from .sqlite import run_with_retry
+from .tagging import sync_problem_tags
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = getattr(settings, "IMPORT_BATCH_SIZE", 1000)
+IMPORT_SECTIONS = ("mistake_types", "problems", "attempts", "mistakes", "reviews")
+
+
+# The sections whose rows each section refers to; those rows must already be imported.
+IMPORT_DEPENDENCIES = {
+    "attempts": ("problems",),
+    "mistakes": ("attempts", "mistake_types"),
+    "reviews": ("problems", "mistakes"),
+}
+
+
+class ImportOrderError(ValueError):
+    """A section arrived after one that refers to it, so those references could not be matched up."""
+
+
+def _in_order(rows: Iterable[tuple[str, object]]) -> Iterator[tuple[str, object]]:
+    seen, current = set(), None
+    for section, row in rows:
+        if section != current:
+            for later in seen:
+                if section in IMPORT_DEPENDENCIES.get(later, ()):
+                    raise ImportOrderError(
+                        f"The {section!r} section comes after {later!r}, which refers to it; "
+                        "sections must be in export order."
+                    )
+            seen.add(section)
+            current = section
+        yield section, row
+
+
+def check_section_order(rows: Iterable[tuple[str, object]]) -> None:
+    """
+    Raise ``ImportOrderError`` unless the ``(section, row)`` events are in export order.
+
+    ``import_rows`` commits as it goes and only notices a misplaced section
+    once the rows before it are written, so the import job checks first.
+    """
+    for _ in _in_order(rows):
+        pass
+
+
+def _parse_datetime(value: str | None):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _parse_date(value: str | None):
+    dt = _parse_datetime(value)
+    if dt:
+        return dt.date()
+    return None
+
+
+@dataclass
+class ImportResult:
+    counts: dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed > 0 else float(self.total)
+
+    def summary(self) -> str:
+        return f"Imported {self.total} rows in {self.elapsed:.2f}s ({self.rows_per_second:.0f} rows/s)."
+
+
+def _chunks(values: list, size: int):
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _first_pk_by(queryset, field_name: str, values: set, batch_size: int) -> dict:
+    """Map ``field_name`` value -> pk, keeping the first row in queryset order (like ``.first()``)."""
+    mapping: dict = {}
+    for chunk in _chunks(sorted(values), batch_size):
+        for pk, value in queryset.filter(**{f"{field_name}__in": chunk}).values_list("pk", field_name):
+            mapping.setdefault(value, pk)
+    return mapping
+
+
+class KeyMap:
+    """Export id -> pk of the row created for it, for the sections other rows refer to by id."""
+
+    def __init__(self):
+        self._maps: dict[str, dict] = {}
+
+    def add(self, section: str, pairs: list[tuple]) -> None:
+        self._maps.setdefault(section, {}).update(pairs)
+
+    def lookup(self, section: str, source_ids: set) -> dict:
+        known = self._maps.get(section, {})
+        return {source_id: known[source_id] for source_id in source_ids if source_id in known}
+
+
+class JobKeyMap(KeyMap):
+    """
+    A ``KeyMap`` stored in ``ImportKey`` rows of one job.
+
+    The keys are written in the same transaction as the rows they point
+    to, so they survive an interrupted import, and only the current
+    batch's keys are ever held in memory.
+    """
+
+    def __init__(self, job):
+        self.job = job
+
+    def add(self, section: str, pairs: list[tuple]) -> None:
+        ImportKey.objects.bulk_create(
+            [ImportKey(job=self.job, section=section, source_id=str(s), object_id=pk) for s, pk in pairs],
+            ignore_conflicts=True,
+        )
+
+    def lookup(self, section: str, source_ids: set) -> dict:
+        by_key = {str(source_id): source_id for source_id in source_ids if source_id is not None}
+        rows = ImportKey.objects.filter(job=self.job, section=section, source_id__in=list(by_key))
+        return {by_key[key]: pk for key, pk in rows.values_list("source_id", "object_id")}
+
+
+class _Importer:
+    """Writes one batch of one section at a time; see ``import_rows``."""
+
+    def __init__(self, user, batch_size: int, keys: KeyMap):
+        self.user = user
+        self.batch_size = batch_size
+        self.keys = keys
+        self.mistake_types: dict[str, int] = {}
+        self.counts = dict.fromkeys(IMPORT_SECTIONS, 0)
+
+    def write(self, section: str, rows: list) -> None:
+        handler = getattr(self, f"_{section}", None)
+        if handler is not None:
+            handler([row for row in rows if isinstance(row, dict)])
+
+    def _mistake_type_ids(self, names: set) -> dict[str, int]:
+        missing = [name for name in names if name not in self.mistake_types]
+        if missing:
+            self.mistake_types.update(MistakeType.objects.filter(name__in=missing).values_list("name", "pk"))
+        return self.mistake_types
+
+    def _mistake_types(self, rows: list) -> None:
+        wanted = {}
+        for mt in rows:
+            if mt.get("name"):
+                wanted.setdefault(mt["name"], mt.get("description", ""))
+        existing = self._mistake_type_ids(set(wanted))
+        missing = [MistakeType(name=name, description=desc) for name, desc in wanted.items() if name not in existing]
+        if missing:
+            MistakeType.objects.bulk_create(missing, ignore_conflicts=True)
+            self.mistake_types.update(
+                MistakeType.objects.filter(name__in=[m.name for m in missing]).values_list("name", "pk")
+            )
+        self.counts["mistake_types"] += sum(1 for name in wanted if name in self.mistake_types)
+
+    def _problems(self, rows: list) -> None:
+        problems = [
+            Problem(
+                title=p.get("title", "Untitled"),
+                source=p.get("source", ""),
+                topic=p.get("topic", "OTHER"),
+                difficulty=p.get("difficulty", 5),
+                tags=p.get("tags", ""),
+                statement=p.get("statement", ""),
+                created_by=self.user,
+            )
+            for p in rows
+        ]
+        Problem.objects.bulk_create(problems, batch_size=self.batch_size)
+        sync_problem_tags(problems)
+        self.keys.add("problems", [(p.get("id"), obj.pk) for p, obj in zip(rows, problems) if p.get("id") is not None])
+        index_objects(SearchDocument.KIND_PROBLEM, [p.pk for p in problems])
+        self.counts["problems"] += len(problems)
+
+    def _attempts(self, rows: list) -> None:
+        problem_ids = self.keys.lookup("problems", {a.get("problem") for a in rows})
+        attempt_rows, attempts = [], []
+        for a in rows:
+            problem_id = problem_ids.get(a.get("problem"))
+            if not problem_id:
+                continue
+            attempt = Attempt(
+                problem_id=problem_id,
+                user=self.user,
+                started_at=_parse_datetime(a.get("started_at")) or timezone.now(),
+                ended_at=_parse_datetime(a.get("ended_at")),
+                outcome=a.get("outcome", "stuck"),
+                final_answer=a.get("final_answer", ""),
+                solution_notes=a.get("solution_notes", ""),
+                confidence=a.get("confidence", 3),
+            )
+            attempt.update_time_spent()
+            attempt_rows.append(a)
+            attempts.append(attempt)
+        Attempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+        self.keys.add(
+            "attempts", [(a.get("id"), obj.pk) for a, obj in zip(attempt_rows, attempts) if a.get("id") is not None]
+        )
+        index_objects(SearchDocument.KIND_ATTEMPT, [a.pk for a in attempts])
+        self.counts["attempts"] += len(attempts)
+
+    def _mistakes(self, rows: list) -> None:
+        attempt_ids = self.keys.lookup("attempts", {m.get("attempt") for m in rows})
+        type_ids = self._mistake_type_ids({m.get("mistake_type") for m in rows})
+        mistakes = []
+        for m in rows:
+            attempt_id = attempt_ids.get(m.get("attempt"))
+            type_id = type_ids.get(m.get("mistake_type"))
+            if not attempt_id or not type_id:
+                continue
+            mistakes.append(
+                Mistake(
+                    attempt_id=attempt_id,
+                    mistake_type_id=type_id,
+                    severity=m.get("severity", 3),
+                    short_label=m.get("short_label", "Mistake"),
+                    detailed_postmortem=m.get("detailed_postmortem", ""),
+                    conceptual_gap=m.get("conceptual_gap", False),
+                    execution_error=m.get("execution_error", False),
+                    strategy_error=m.get("strategy_error", False),
+                    fix_plan=m.get("fix_plan", ""),
+                    next_review_date=_parse_date(m.get("next_review_date")),
+                )
+            )
+        Mistake.objects.bulk_create(mistakes, batch_size=self.batch_size)
+        index_objects(SearchDocument.KIND_MISTAKE, [m.pk for m in mistakes])
+        self.counts["mistakes"] += len(mistakes)
+
+    def _reviews(self, rows: list) -> None:
+        mistake_labels = {r["related_mistake"] for r in rows if r.get("related_mistake")}
+        problem_titles = {r["related_problem"] for r in rows if r.get("related_problem")}
+        mistake_by_label = _first_pk_by(
+            Mistake.objects.filter(attempt__user=self.user).order_by("-severity", "pk"),
+            "short_label",
+            mistake_labels,
+            self.batch_size,
+        )
+        problem_by_title = _first_pk_by(
+            Problem.objects.filter(created_by=self.user).order_by("-created_at", "pk"),
+            "title",
+            problem_titles,
+            self.batch_size,
+        )
+        reviews = [
+            ReviewItem(
+                user=self.user,
+                related_mistake_id=mistake_by_label.get(r.get("related_mistake")),
+                related_problem_id=problem_by_title.get(r.get("related_problem")),
+                prompt=r.get("prompt", ""),
+                answer_key=r.get("answer_key", ""),
+                ease_factor=r.get("ease_factor", 2.5),
+                interval_days=r.get("interval_days", 0),
+                due_date=_parse_date(r.get("due_date")) or date.today(),
+            )
+            for r in rows
+        ]
+        ReviewItem.objects.bulk_create(reviews, batch_size=self.batch_size)
+        self.counts["reviews"] += len(reviews)
+
+
+def _payload_rows(payload: dict) -> Iterator[tuple[str, object]]:
+    for section in IMPORT_SECTIONS:
+        for row in payload.get(section) or []:
+            yield section, row
+
+
+def import_payload(user, payload: dict, batch_size: int | None = None, progress=None) -> ImportResult:
+    """
+    Import an already parsed export payload for ``user`` in one transaction.
+
+    ``progress(done, total)`` is called after each batch with payload rows.
+    """
+    total = sum(len(payload.get(section) or []) for section in IMPORT_SECTIONS)
+    with transaction.atomic():
+        return import_rows(
+            user,
+            _payload_rows(payload),
+            batch_size=batch_size,
+            progress=(lambda done: progress(done, total)) if progress else None,
+        )
+
+
+def import_rows(
+    user,
+    rows: Iterable[tuple[str, object]],
+    batch_size: int | None = None,
+    progress=None,
+    keys: KeyMap | None = None,
+    resume: dict | None = None,
+    checkpoint=None,
+) -> ImportResult:
+    """
+    Import ``(section, row)`` pairs for ``user`` as they arrive, a batch at a time.
+
+    Sections must be in export order (problems before the attempts that
+    reference them, attempts before mistakes), which is how
+    ``core.exporting`` writes them and how ``core.jsonstream`` reads them
+    back; a section after one that refers to it raises ``ImportOrderError``.
+    Each batch of ``batch_size`` rows is written with ``bulk_create`` in
+    its own transaction, so only one batch plus the id ``keys`` is in
+    memory. ``checkpoint(state)`` is called inside that transaction; pass
+    the last ``state`` back as ``resume`` to skip rows that were already
+    imported. ``progress(rows)`` is called after each batch.
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    started = time.perf_counter()
+    importer = _Importer(user, batch_size, keys if keys is not None else KeyMap())
+    resume = resume or {}
+    consumed = skip = resume.get("rows", 0)
+    for section, count in resume.get("counts", {}).items():
+        importer.counts[section] = count
+
+    def flush(section: str, batch: list) -> None:
+        nonlocal consumed
+
+        def write():
+            importer.write(section, batch)
+            if checkpoint:
+                checkpoint({"rows": consumed + len(batch), "counts": importer.counts})
+
+        counts = dict(importer.counts)
+        try:
+            run_with_retry(write)
+        except Exception:
+            # The batch was rolled back, so its rows must not stay counted.
+            importer.counts = counts
+            raise
+        consumed += len(batch)
+        if progress:
+            progress(consumed)
+
+    current, batch = None, []
+    for index, (section, row) in enumerate(_in_order(rows)):
+        if index < skip:
+            continue
+        if batch and (section != current or len(batch) >= batch_size):
+            flush(current, batch)
+            batch = []
+        current = section
+        batch.append(row)
+    if batch:
+        flush(current, batch)
+
+    # bulk_create bypasses the model signals; rebuild the derived analytics once.
+    run_with_retry(refresh_rollups, user.pk)
+    result = ImportResult(counts=dict(importer.counts))
+    # bulk_create skips post_save, so drop the cached nav counter explicitly once the rows are committed.
+    transaction.on_commit(partial(invalidate_due_count, user.pk))
+    transaction.on_commit(partial(bump_dashboard_version, user.pk))
+    result.elapsed = time.perf_counter() - started
+    metrics.observe_transfer("import", result.counts, result.elapsed)
+    logger.info("import user=%s %s", user.pk, result.summary())
+    return result
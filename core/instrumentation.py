@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger("core.requests")
+
+# A SQL template repeated this many times in one request is reported as a likely N+1.
+N_PLUS_ONE_THRESHOLD = getattr(settings, "N_PLUS_ONE_THRESHOLD", 5)
+# Latency bucket upper bounds in milliseconds: 0.5 ms growing by 25% up to about a minute.
+LATENCY_BUCKETS_MS = tuple(0.5 * 1.25**i for i in range(53))
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def sql_template(sql: str) -> str:
+    """Collapse a statement to its shape so repeated lookups compare equal."""
+    return _LITERALS.sub("?", _IN_LIST.sub("IN (...)", sql))
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` that counts queries, DB time and SQL shapes."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.templates: Counter[str] = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.templates[sql_template(sql)] += 1
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> list[dict]:
+        return [
+            {"sql": template[:300], "count": count}
+            for template, count in self.templates.most_common()
+            if count >= threshold
+        ]
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; percentiles are interpolated inside a bucket."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+
+    def percentile(self, p: float) -> float | None:
+        if not self.total:
+            return None
+        rank = p / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                low = self.bounds[i - 1] if i else 0.0
+                high = self.bounds[i] if i < len(self.bounds) else self.bounds[-1]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.queries = 0
+        self.max_queries = 0
+        self.db_ms = 0.0
+        self.bytes = 0
+        self.n_plus_one = 0
+
+    @property
+    def requests(self) -> int:
+        return self.latency.total
+
+    def as_row(self, view: str) -> dict:
+        n = max(self.requests, 1)
+        return {
+            "view": view,
+            "requests": self.requests,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95),
+            "p99": self.latency.percentile(99),
+            "avg_queries": self.queries / n,
+            "max_queries": self.max_queries,
+            "avg_db_ms": self.db_ms / n,
+            "avg_bytes": self.bytes / n,
+            "n_plus_one": self.n_plus_one,
+        }
+
+
+class StatsRegistry:
+    """Per-process request stats keyed by view name."""
+
+    def __init__(self):
+        self._views: dict[str, ViewStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, view: str, ms: float, queries: int, db_ms: float, size: int | None, flagged: bool) -> None:
+        with self._lock:
+            stats = self._views.setdefault(view, ViewStats())
+            stats.latency.observe(ms)
+            stats.queries += queries
+            stats.max_queries = max(stats.max_queries, queries)
+            stats.db_ms += db_ms
+            stats.bytes += size or 0
+            stats.n_plus_one += flagged
+
+    def rows(self) -> list[dict]:
+        with self._lock:
+            rows = [stats.as_row(view) for view, stats in self._views.items()]
+        return sorted(rows, key=lambda row: row["p95"] or 0, reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+registry = StatsRegistry()
+
+
+def _view_name(request) -> str:
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "<unresolved>"
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    """
+    Record view name, wall time, query count, DB time and response size per request.
+
+    Every request is logged as one JSON line on the ``core.requests`` logger
+    (a warning when a SQL shape repeats enough to suggest an N+1) and added
+    to the in-process histograms behind the staff-only request metrics page.
+    Queries issued while a streaming response is consumed are not counted.
+    Works in both WSGI and ASGI stacks without an adapter of its own, so it
+    adds no thread hop under ``config.asgi``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with self._recording(recorder):
+            response = self.get_response(request)
+        self._report(request, response, recorder, started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        # Connections are per thread, and the async ORM runs this request's queries
+        # in one worker thread, so the wrappers are installed and removed there.
+        stack = await sync_to_async(self._recording)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self._report(request, response, recorder, started)
+        return response
+
+    def _recording(self, recorder: QueryRecorder) -> ExitStack:
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(recorder))
+        return stack
+
+    def _report(self, request, response, recorder: QueryRecorder, started: float) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        size = None if response.streaming else len(response.content)
+        repeated = recorder.repeated()
+        view = _view_name(request)
+        registry.record(view, ms, recorder.count, recorder.seconds * 1000, size, bool(repeated))
+        metrics.observe_request(view, request.method, response.status_code, ms / 1000, recorder.count)
+        line = {
+            "event": "request",
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "ms": round(ms, 2),
+            "queries": recorder.count,
+            "db_ms": round(recorder.seconds * 1000, 2),
+            "bytes": size,
+        }
+        if repeated:
+            line["n_plus_one"] = repeated
+            logger.warning(json.dumps(line))
+        else:
+            logger.info(json.dumps(line))
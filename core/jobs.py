@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import json
+import logging
+import tempfile
+import threading
+import time
+import traceback
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, OperationalError, connection
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .analytics import refresh_rollups
+from .columnar import (
+    COMPRESSIONS,
+    EXPORT_COMPRESSION,
+    check_columnar,
+    is_columnar,
+    iter_columnar_rows,
+    iter_export_columnar,
+)
+from .delta import apply_delta, is_delta, read_delta
+from .exporting import count_export_rows, iter_export_json
+from .importing import JobKeyMap, check_section_order, import_rows
+from .jsonstream import iter_section_rows
+from .models import Job, ReviewItem
+from .rescheduling import regrade_reviews, spread_overdue
+from .search import rebuild_index
+from .sqlite import run_with_retry
+
+logger = logging.getLogger(__name__)
+
+# Seconds an idle worker sleeps before looking for queued jobs again.
+JOB_POLL_SECONDS = getattr(settings, "JOB_POLL_SECONDS", 1.0)
+# How often a running job writes its progress and heartbeat.
+JOB_PROGRESS_SECONDS = getattr(settings, "JOB_PROGRESS_SECONDS", 1.0)
+# A running job without a heartbeat for this long belonged to a worker that died.
+JOB_STALE_SECONDS = getattr(settings, "JOB_STALE_SECONDS", 300)
+JOB_MAX_ATTEMPTS = getattr(settings, "JOB_MAX_ATTEMPTS", 3)
+
+HANDLERS = {}
+
+
+def handler(kind: str):
+    """Register ``func(job, progress) -> dict`` as the handler for ``kind`` jobs."""
+
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+
+    return register
+
+
+class Progress:
+    """
+    Progress of a running job, called by handlers as ``progress(done, total=None, message=None)``.
+
+    Handlers call it between writes, never inside a transaction. The values
+    are written at most every ``JOB_PROGRESS_SECONDS``, so handlers can report
+    per row; a heartbeat thread writes them when a single step runs longer.
+    """
+
+    def __init__(self, job: Job):
+        self.job = job
+        self.done = job.progress_done
+        self.total = job.progress_total
+        self.message = job.message
+        self.flushed_at = time.monotonic()
+
+    def __call__(self, done: int, total: int | None = None, message: str | None = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:255]
+        if self.due():
+            self.flush()
+
+    def due(self) -> bool:
+        return time.monotonic() - self.flushed_at >= JOB_PROGRESS_SECONDS
+
+    def flush(self) -> None:
+        self.flushed_at = time.monotonic()
+        try:
+            Job.objects.filter(pk=self.job.pk, status=Job.STATUS_RUNNING).update(
+                progress_done=self.done,
+                progress_total=max(self.total, self.done),
+                message=self.message,
+                heartbeat_at=timezone.now(),
+            )
+        except OperationalError:
+            # SQLite: another writer holds the lock; the next flush catches up.
+            logger.debug("could not record progress of job %s", self.job.pk, exc_info=True)
+
+
+def _heartbeat(progress: Progress, stop: threading.Event) -> None:
+    try:
+        while not stop.wait(JOB_PROGRESS_SECONDS):
+            if progress.due():
+                progress.flush()
+    finally:
+        connection.close()
+
+
+def submit(user, kind: str, params: dict | None = None, upload=None) -> Job:
+    """
+    Queue a job for ``user``; ``upload`` is stored as the job's input file.
+
+    The file is copied to storage once, before the row is written, so a
+    retry after a lock error does not re-read an upload that is at its end.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}.")
+    job = Job(user=user, kind=kind, params=params or {})
+    if upload is not None:
+        job.input_file.save(upload.name, upload, save=False)
+    run_with_retry(job.save)
+    return job
+
+
+def claim(worker: str) -> Job | None:
+    """
+    Take the oldest queued job, or return ``None`` when there is none.
+
+    The status flip is a conditional UPDATE, so when several workers race
+    for the same row exactly one of them gets it and the others move on.
+    """
+    while True:
+        pk = (
+            Job.objects.filter(status=Job.STATUS_QUEUED)
+            .order_by("created_at", "pk")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=pk, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            worker=worker[:100],
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+            error="",
+        )
+        if claimed:
+            return Job.objects.select_related("user").get(pk=pk)
+
+
+def requeue_stale(now=None) -> int:
+    """Put jobs of dead workers back in the queue, or fail them after ``JOB_MAX_ATTEMPTS`` tries."""
+    now = now or timezone.now()
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING, heartbeat_at__lt=now - timedelta(seconds=JOB_STALE_SECONDS))
+    failed = stale.filter(attempts__gte=JOB_MAX_ATTEMPTS).update(
+        status=Job.STATUS_FAILED, error="The worker running this job stopped responding.", finished_at=now
+    )
+    requeued = stale.update(status=Job.STATUS_QUEUED, worker="")
+    if failed or requeued:
+        logger.warning("requeued %d and failed %d stale jobs", requeued, failed)
+    return requeued
+
+
+def retry(job: Job) -> bool:
+    """Queue a failed import again; it resumes from its checkpoint."""
+    return bool(
+        Job.objects.filter(pk=job.pk, kind=Job.KIND_IMPORT, status=Job.STATUS_FAILED)
+        .exclude(input_file="")
+        .update(status=Job.STATUS_QUEUED, attempts=0, worker="", finished_at=None)
+    )
+
+
+def run(job: Job) -> Job:
+    """Run a claimed job to completion and record its outcome; handler errors fail the job."""
+    progress = Progress(job)
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(progress, stop), name=f"job-{job.pk}-heartbeat", daemon=True)
+    beat.start()
+    started = time.perf_counter()
+    try:
+        job.result = HANDLERS[job.kind](job, progress) or {}
+        job.status = Job.STATUS_SUCCEEDED
+    except Exception as exc:
+        logger.exception("job %s (%s) failed", job.pk, job.kind)
+        job.status = Job.STATUS_FAILED
+        job.error = traceback.format_exc()
+        progress.message = str(exc)[:255] or type(exc).__name__
+    finally:
+        stop.set()
+        beat.join()
+    job.progress_done = progress.done
+    job.progress_total = max(progress.total, progress.done)
+    job.message = progress.message
+    job.finished_at = job.heartbeat_at = timezone.now()
+    try:
+        run_with_retry(
+            job.save,
+            update_fields=[
+                "status",
+                "result",
+                "error",
+                "message",
+                "progress_done",
+                "progress_total",
+                "input_file",
+                "output_file",
+                "heartbeat_at",
+                "finished_at",
+            ],
+        )
+    except DatabaseError:
+        # The row stays running without heartbeats, so requeue_stale runs the job again later.
+        logger.exception("could not record the outcome of job %s", job.pk)
+    metrics.observe_job(job.kind, job.status, time.perf_counter() - started)
+    return job
+
+
+def work(worker: str, once: bool = False, stop: threading.Event | None = None, poll: float | None = None) -> int:
+    """
+    Claim and run jobs until ``stop`` is set; returns how many jobs ran.
+
+    With ``once`` the loop ends as soon as the queue is empty instead of
+    polling for new jobs every ``poll`` seconds.
+    """
+    stop = stop or threading.Event()
+    poll = JOB_POLL_SECONDS if poll is None else poll
+    ran = failures = 0
+    while not stop.is_set():
+        try:
+            run_with_retry(requeue_stale)
+            job = run_with_retry(claim, worker)
+        except DatabaseError:
+            # Lock contention outlasting the retries, or the database going away for a moment:
+            # back off and try again instead of letting the worker process die.
+            failures += 1
+            logger.exception("worker %s could not read the job queue (%d in a row)", worker, failures)
+            connection.close_if_unusable_or_obsolete()
+            stop.wait(min(max(poll, 0.1) * 2**failures, JOB_STALE_SECONDS / 10))
+            continue
+        failures = 0
+        if job is None:
+            if once:
+                break
+            stop.wait(poll)
+            continue
+        run(job)
+        ran += 1
+    return ran
+
+
+@handler(Job.KIND_EXPORT)
+def export_job(job: Job, progress: Progress) -> dict:
+    """``params`` may be ``{"format": "columnar"}`` for the compressed export."""
+    progress(0, count_export_rows(job.user), "Exporting")
+    if job.params.get("format") == "columnar":
+        chunks = iter_export_columnar(job.user, progress=progress)
+        name = f"export-{job.user_id}-{job.pk}.oea.{COMPRESSIONS[EXPORT_COMPRESSION][1]}"
+    else:
+        chunks = (chunk.encode() for chunk in iter_export_json(job.user, progress=progress))
+        name = f"export-{job.user_id}-{job.pk}.json"
+    with tempfile.TemporaryFile() as out:
+        for chunk in chunks:
+            out.write(chunk)
+        size = out.tell()
+        out.seek(0)
+        job.output_file.save(name, File(out), save=False)
+    progress.message = "Export ready"
+    return {"rows": progress.done, "bytes": size}
+
+
+@handler(Job.KIND_IMPORT)
+def import_job(job: Job, progress: Progress) -> dict:
+    """
+    Stream the uploaded file through ``import_rows``, committing a batch at a time.
+
+    JSON and compressed columnar exports are told apart by their first bytes;
+    a columnar file is checked for truncation, and a fresh import for its
+    section order, before anything is imported.
+    An NDJSON delta (``core.delta``) is applied with ``apply_delta`` instead;
+    that is idempotent, so a retried delta simply starts over.
+
+    Each batch records ``job.checkpoint``; when a worker dies or the job is
+    retried after a failure, the rows before the checkpoint are parsed but
+    not imported again.
+    """
+    size = job.input_file.size
+    with job.input_file.open("rb") as upload:
+        if is_delta(upload):
+            progress(0, size, "Applying delta")
+            result = apply_delta(job.user, read_delta(upload), progress=lambda rows: progress(upload.tell(), size))
+            job.input_file.delete(save=False)
+            progress(size, size, result.summary())
+            return {"counts": result.counts, "elapsed": result.elapsed, "delta": True}
+    resume = job.checkpoint or None
+    progress(0, size, "Resuming import" if resume else "Importing")
+
+    def save_checkpoint(state: dict) -> None:
+        Job.objects.filter(pk=job.pk).update(checkpoint=state)
+
+    with job.input_file.open("rb") as upload:
+        try:
+            columnar = is_columnar(upload)
+            if columnar:
+                check_columnar(upload)
+            read_rows = iter_columnar_rows if columnar else iter_section_rows
+            if not resume:
+                check_section_order(read_rows(upload))
+                upload.seek(0)
+            events = read_rows(upload)
+            result = import_rows(
+                job.user,
+                events,
+                progress=lambda rows: progress(upload.tell(), size, f"{rows} rows read"),
+                keys=JobKeyMap(job),
+                resume=resume,
+                checkpoint=save_checkpoint,
+            )
+        except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+            raise ValueError(f"Invalid JSON file: {exc}") from exc
+    job.input_file.delete(save=False)
+    run_with_retry(job.import_keys.all().delete)
+    save_checkpoint({})
+    progress(size, size, result.summary())
+    return {"counts": result.counts, "elapsed": result.elapsed, "resumed": bool(resume)}
+
+
+@handler(Job.KIND_REBUILD_ANALYTICS)
+def rebuild_analytics_job(job: Job, progress: Progress) -> dict:
+    progress(0, 1, "Rebuilding mistake rollups")
+    rows = refresh_rollups(job.user_id)
+    progress(1, 1, f"Rebuilt {rows} rollup rows.")
+    return {"rows": rows}
+
+
+@handler(Job.KIND_REBUILD_SEARCH)
+def rebuild_search_job(job: Job, progress: Progress) -> dict:
+    progress(0, 1, "Rebuilding search index")
+    documents = rebuild_index(user_id=job.user_id)
+    progress(1, 1, f"Indexed {documents} documents.")
+    return {"documents": documents}
+
+
+@handler(Job.KIND_RESCHEDULE)
+def reschedule_job(job: Job, progress: Progress) -> dict:
+    """``params`` is ``{"mode": "spread", "days": N}`` or ``{"mode": "regrade", "rating": R}``."""
+    mode = job.params.get("mode")
+    progress(0, 1, "Rescheduling")
+    if mode == "spread":
+        cards = run_with_retry(spread_overdue, job.user, int(job.params["days"]))
+    elif mode == "regrade":
+        due = ReviewItem.objects.filter(user=job.user, due_date__lte=date.today())
+        cards = run_with_retry(regrade_reviews, due, int(job.params["rating"]))
+    else:
+        raise ValueError(f"Unknown reschedule mode {mode!r}.")
+    progress(1, 1, f"Rescheduled {cards} cards.")
+    return {"cards": cards}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import codecs
+import json
+from typing import IO, Iterator
+
+from django.conf import settings
+
+JSON_READ_SIZE = 64 * 1024
+# Characters one row may span; malformed input is rejected here instead of being buffered to the end of the file.
+JSON_MAX_VALUE_SIZE = getattr(settings, "JSON_MAX_VALUE_SIZE", 16 * 1024 * 1024)
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """A text buffer over a binary file that holds only the current value plus one read."""
+
+    def __init__(self, fp: IO[bytes], read_size: int, max_value_size: int):
+        self.fp = fp
+        self.read_size = read_size
+        self.max_value_size = max_value_size
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.decode = json.JSONDecoder().raw_decode
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.fp.read(self.read_size)
+        self.eof = not data
+        self.buf = self.buf[self.pos :] + self.decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character without consuming it; ``""`` at the end of the file."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos : self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise self.error(f"Expecting {char!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, reading further until it is no longer cut off."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.fill_value():
+                    continue
+                raise
+            # A number at the very end of the buffer may continue in the next read.
+            if end == len(self.buf) and self.fill_value():
+                continue
+            self.pos = end
+            return value
+
+    def fill_value(self) -> bool:
+        if len(self.buf) - self.pos > self.max_value_size:
+            raise self.error(f"No value ends within {self.max_value_size} characters")
+        return self.fill()
+
+    def error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+
+def iter_section_rows(
+    fp: IO[bytes], read_size: int = JSON_READ_SIZE, max_value_size: int | None = None
+) -> Iterator[tuple[str, object]]:
+    """
+    Parse an export document incrementally, yielding ``(section, row)`` events.
+
+    The document is a JSON object whose values are arrays, as written by
+    ``core.exporting``. Only one row is decoded at a time, so memory stays
+    bounded by the largest row rather than the file size. Top-level values
+    that are not arrays are decoded and skipped. Malformed input raises
+    ``json.JSONDecodeError`` once the parser reaches it, or once more than
+    ``max_value_size`` characters have been read without completing a value.
+    """
+    reader = _Reader(fp, read_size, max_value_size or JSON_MAX_VALUE_SIZE)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        section = reader.value()
+        if not isinstance(section, str):
+            raise reader.error("Expecting property name")
+        reader.expect(":")
+        if reader.peek() == "[":
+            reader.pos += 1
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield section, reader.value()
+                    if reader.peek() == "]":
+                        reader.pos += 1
+                        break
+                    reader.expect(",")
+        else:
+            reader.value()
+        if reader.peek() == "}":
+            reader.pos += 1
+            break
+        reader.expect(",")
+    if reader.peek():
+        raise reader.error("Extra data")
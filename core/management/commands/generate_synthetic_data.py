@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.synthetic import DatasetSpec, generate_user
+
+
+class Command(BaseCommand):
+    help = "Create synthetic users with problems, attempts, mistakes and reviews for load testing."
+
+    def add_arguments(self, parser):
+        defaults = DatasetSpec()
+        parser.add_argument("--users", type=int, default=1, help="Number of users to create.")
+        parser.add_argument("--prefix", default="synth", help="Usernames are <prefix>-0001, <prefix>-0002, ...")
+        parser.add_argument("--rows", type=int, help="Approximate rows per user; overrides --problems.")
+        parser.add_argument("--problems", type=int, default=defaults.problems)
+        parser.add_argument("--attempts-per-problem", type=int, default=defaults.attempts_per_problem)
+        parser.add_argument("--mistakes-per-attempt", type=int, default=defaults.mistakes_per_attempt)
+        parser.add_argument("--reviews-per-mistake", type=int, default=defaults.reviews_per_mistake)
+        parser.add_argument("--seed", type=int, default=0, help="Same seed and usernames give the same data.")
+        parser.add_argument("--password", help="Password for every user; without it they cannot log in.")
+
+    def handle(self, *args, **options):
+        shape = {
+            "attempts_per_problem": options["attempts_per_problem"],
+            "mistakes_per_attempt": options["mistakes_per_attempt"],
+            "reviews_per_mistake": options["reviews_per_mistake"],
+        }
+        if options["rows"]:
+            spec = DatasetSpec.for_rows(options["rows"], **shape)
+        else:
+            spec = DatasetSpec(problems=options["problems"], **shape)
+        usernames = [f"{options['prefix']}-{i:04d}" for i in range(1, options["users"] + 1)]
+        taken = list(get_user_model().objects.filter(username__in=usernames).values_list("username", flat=True))
+        if taken:
+            raise CommandError(f"Users already exist: {', '.join(sorted(taken))}.")
+
+        total = elapsed = 0
+        for username in usernames:
+            try:
+                _, result = generate_user(username, spec, seed=options["seed"], password=options["password"])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            total += result.total
+            elapsed += result.elapsed
+            self.stdout.write(f"{username}: {result.summary()}")
+        rate = total / elapsed if elapsed else total
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {len(usernames)} users with {total} rows ({rate:.0f} rows/s).")
+        )
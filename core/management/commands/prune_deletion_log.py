@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.delta import DELETION_LOG_DAYS, prune_deletion_log
+
+
+class Command(BaseCommand):
+    help = "Delete deletion log rows older than the delta export window."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=DELETION_LOG_DAYS, help="Keep this many days of deletions.")
+
+    def handle(self, *args, **options):
+        deleted = prune_deletion_log(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} deletion log rows."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.uploads import UPLOAD_EXPIRY_HOURS, prune_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads that were abandoned or have been imported, and their unused files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours", type=int, default=UPLOAD_EXPIRY_HOURS, help="Keep uploads active within this many hours."
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_uploads(options["hours"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} uploads."))
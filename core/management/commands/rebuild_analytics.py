@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import refresh_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the mistake analytics rollup table from raw mistakes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild rollups for this username.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("pk")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+            if not users.exists():
+                raise CommandError(f"No user named {options['user']!r}.")
+        total = 0
+        for user_id in users.values_list("pk", flat=True).iterator():
+            total += refresh_rollups(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} rollup rows."))
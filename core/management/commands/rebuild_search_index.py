@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search documents from problems, mistakes and attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild documents for this username.")
+
+    def handle(self, *args, **options):
+        user_id = None
+        if options["user"]:
+            user_id = get_user_model().objects.filter(username=options["user"]).values_list("pk", flat=True).first()
+            if user_id is None:
+                raise CommandError(f"No user named {options['user']!r}.")
+        total = rebuild_index(user_id=user_id)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents."))
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import ReviewItem
+from core.rescheduling import regrade_reviews, spread_overdue
+
+
+class Command(BaseCommand):
+    help = "Bulk-reschedule a user's review cards."
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            "--spread-overdue",
+            type=int,
+            metavar="DAYS",
+            help="Spread overdue cards evenly over the next DAYS days.",
+        )
+        group.add_argument(
+            "--regrade",
+            type=int,
+            choices=[r for r, _ in ReviewItem.RATING_CHOICES],
+            help="Grade every due card with this rating (0=Again .. 3=Easy).",
+        )
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options["username"]).first()
+        if user is None:
+            raise CommandError(f"No user named {options['username']!r}.")
+        if options["spread_overdue"] is not None:
+            count = spread_overdue(user, options["spread_overdue"])
+        else:
+            due = ReviewItem.objects.filter(user=user, due_date__lte=date.today())
+            count = regrade_reviews(due, options["regrade"])
+        self.stdout.write(self.style.SUCCESS(f"Rescheduled {count} cards."))
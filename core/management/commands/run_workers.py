@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import JOB_POLL_SECONDS, work
+from core.metrics import mark_process_dead
+
+
+def _child(index: int, once: bool, poll: float, stop) -> None:
+    # Ctrl-C reaches the whole process group; only the parent decides when to stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    work(f"{socket.gethostname()}:{os.getpid()}:{index}", once=once, stop=stop, poll=poll)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (imports, exports, rebuilds, reschedules) from the job queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=2, help="Worker processes; 1 runs jobs in this process.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+        parser.add_argument("--poll", type=float, default=JOB_POLL_SECONDS, help="Seconds between queue checks.")
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        if processes < 1:
+            raise CommandError("--processes must be at least 1.")
+        once, poll = options["once"], options["poll"]
+
+        if processes == 1:
+            stop = threading.Event()
+            previous = self._stop_on_signals(stop.set)
+            try:
+                ran = work(f"{socket.gethostname()}:{os.getpid()}", once=once, stop=stop, poll=poll)
+            finally:
+                for signum, handler in previous.items():
+                    signal.signal(signum, handler)
+                mark_process_dead(os.getpid())
+            self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs."))
+            return
+
+        # Forked children must open their own database connections.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        stop = context.Event()
+        children = [context.Process(target=_child, args=(i, once, poll, stop)) for i in range(processes)]
+        self._stop_on_signals(stop.set)
+        for child in children:
+            child.start()
+        self.stdout.write(f"Started {processes} workers; stop with Ctrl-C.")
+        for child in children:
+            child.join()
+            mark_process_dead(child.pid)
+        failed = [child.pid for child in children if child.exitcode]
+        if failed:
+            raise CommandError(f"Workers {failed} exited with an error.")
+        self.stdout.write(self.style.SUCCESS("Workers stopped."))
+
+    def _stop_on_signals(self, stop) -> dict:
+        def handler(signum, frame):
+            self.stdout.write("Finishing running jobs before exiting...")
+            stop()
+
+        return {signum: signal.signal(signum, handler) for signum in (signal.SIGINT, signal.SIGTERM)}
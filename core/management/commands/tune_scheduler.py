@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.tuning import TUNING_WINDOW_DAYS, fit_user, save_profile
+
+
+class Command(BaseCommand):
+    help = "Fit per-user scheduler intervals to the review log and report predicted vs actual recall."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only tune this username.")
+        parser.add_argument("--days", type=int, default=TUNING_WINDOW_DAYS, help="Use grades from the last N days.")
+        parser.add_argument("--dry-run", action="store_true", help="Report the fit without saving it.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.order_by("pk")
+        if options["user"]:
+            users = users.filter(username=options["user"])
+            if not users.exists():
+                raise CommandError(f"No user named {options['user']!r}.")
+        try:
+            tuned = 0
+            for user in users.iterator():
+                result = fit_user(user, days=options["days"])
+                if result is None:
+                    continue
+                self._report(user, result)
+                if not options["dry_run"]:
+                    save_profile(user, result)
+                tuned += 1
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+        verb = "Fitted" if options["dry_run"] else "Tuned"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {tuned} scheduler profiles."))
+
+    def _report(self, user, result):
+        params = result.parameters
+        self.stdout.write(f"{user.username}: {result.reviews} grades over {result.days} days")
+        self.stdout.write(f"  {'segment':<11} {'reviews':>7} {'predicted':>9} {'actual':>7} {'scale':>6}")
+        for fit in result.segments:
+            if not fit.reviews:
+                continue
+            self.stdout.write(
+                f"  {fit.name:<11} {fit.reviews:>7} {fit.predicted:>9.1%} {fit.actual:>7.1%} {fit.scale:>6.2f}"
+            )
+        self.stdout.write(
+            f"  retention {result.retention_before:.1%} -> {result.retention_after:.1%}, "
+            f"load {result.load_before:.1f} -> {result.load_after:.1f} reviews/day"
+        )
+        self.stdout.write(
+            f"  intervals: good {params.first_good_interval}d, easy {params.first_easy_interval}d, "
+            f"second {params.second_interval}d, modifier {params.interval_modifier:.2f}"
+        )
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import REGISTRY, multiprocess
+
+# Every process that imports this module writes its samples there, not just gunicorn's workers;
+# management commands must not crash because the web server has not created the directory yet.
+if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+REQUESTS = Counter("oea_http_requests_total", "HTTP requests by view.", ["view", "method", "status"])
+REQUEST_SECONDS = Histogram("oea_http_request_duration_seconds", "Request wall time by view.", ["view"])
+REQUEST_QUERIES = Histogram(
+    "oea_http_request_queries",
+    "Database queries per request by view.",
+    ["view"],
+    buckets=(1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+REVIEWS_GRADED = Counter(
+    "oea_reviews_graded_total", "Review grades applied, by source and rating.", ["source", "rating"]
+)
+GRADE_SECONDS = Histogram("oea_review_grade_duration_seconds", "Time to apply one batch of grades.", ["source"])
+TRANSFER_ROWS = Counter("oea_transfer_rows_total", "Rows imported or exported.", ["direction", "section"])
+TRANSFER_SECONDS = Histogram(
+    "oea_transfer_duration_seconds",
+    "Import and export duration.",
+    ["direction"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+CACHE_REQUESTS = Counter("oea_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
+DB_LOCK_RETRIES = Counter("oea_db_lock_retries_total", "Writes retried after SQLite reported the database locked.")
+JOBS = Counter("oea_jobs_total", "Background jobs finished, by kind and status.", ["kind", "status"])
+JOB_SECONDS = Histogram(
+    "oea_job_duration_seconds",
+    "Background job run time by kind.",
+    ["kind"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+
+RATING_LABELS = ("again", "hard", "good", "easy")
+
+
+def observe_request(view: str, method: str, status: int, seconds: float, queries: int) -> None:
+    REQUESTS.labels(view, method, str(status)).inc()
+    REQUEST_SECONDS.labels(view).observe(seconds)
+    REQUEST_QUERIES.labels(view).observe(queries)
+
+
+def observe_grades(source: str, ratings, seconds: float) -> None:
+    for rating in ratings:
+        REVIEWS_GRADED.labels(source, RATING_LABELS[rating]).inc()
+    GRADE_SECONDS.labels(source).observe(seconds)
+
+
+def observe_transfer(direction: str, counts: dict[str, int], seconds: float) -> None:
+    for section, rows in counts.items():
+        TRANSFER_ROWS.labels(direction, section).inc(rows)
+    TRANSFER_SECONDS.labels(direction).observe(seconds)
+
+
+def observe_job(kind: str, status: str, seconds: float) -> None:
+    JOBS.labels(kind, status).inc()
+    JOB_SECONDS.labels(kind).observe(seconds)
+
+
+def cache_result(cache_name: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live-gauge files of an exited process; its counters and histograms stay in the totals."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """
+    The exposition text for a scrape.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set (see ``config/start.sh``) each
+    gunicorn worker and job worker writes its samples to files in that
+    directory and they are merged here, so whichever worker answers the
+    scrape reports all of them.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0002_default_mistake_types"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="attempt",
+            index=models.Index(fields=["user", "-started_at"], name="core_attempt_user_started_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="problem",
+            index=models.Index(fields=["created_by", "-created_at"], name="core_problem_owner_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reviewitem",
+            index=models.Index(fields=["user", "due_date"], name="core_review_user_due_idx"),
+        ),
+    ]
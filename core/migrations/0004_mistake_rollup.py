@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Mistake = apps.get_model("core", "Mistake")
+    MistakeRollup = apps.get_model("core", "MistakeRollup")
+    rows = (
+        Mistake.objects.annotate(month=TruncMonth("attempt__started_at", output_field=DateField()))
+        .values("attempt__user_id", "attempt__problem__topic", "mistake_type_id", "month")
+        .annotate(total=Count("id"), severity_sum=Sum("severity"))
+        .order_by()
+    )
+    MistakeRollup.objects.bulk_create(
+        [
+            MistakeRollup(
+                user_id=row["attempt__user_id"],
+                topic=row["attempt__problem__topic"],
+                mistake_type_id=row["mistake_type_id"],
+                month=row["month"],
+                total=row["total"],
+                severity_sum=row["severity_sum"] or 0,
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_hot_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MistakeRollup",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("topic", models.CharField(choices=[("NT", "Number Theory"), ("ALG", "Algebra"), ("GEO", "Geometry"), ("COMB", "Combinatorics"), ("OTHER", "Other")], max_length=10)),
+                ("month", models.DateField()),
+                ("total", models.PositiveIntegerField(default=0)),
+                ("severity_sum", models.PositiveIntegerField(default=0)),
+                ("mistake_type", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to="core.mistaketype")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={"ordering": ["month"]},
+        ),
+        migrations.AddConstraint(
+            model_name="mistakerollup",
+            constraint=models.UniqueConstraint(fields=("user", "topic", "mistake_type", "month"), name="core_rollup_bucket_unique"),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
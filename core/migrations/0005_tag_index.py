@@ -0,0 +1,65 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_tag_strings(apps, schema_editor):
+    Problem = apps.get_model("core", "Problem")
+    Tag = apps.get_model("core", "Tag")
+    ProblemTag = apps.get_model("core", "ProblemTag")
+
+    names_by_problem = {}
+    for pk, tags in Problem.objects.exclude(tags="").values_list("pk", "tags").iterator():
+        names = {t.strip().lower() for t in tags.split(",") if t.strip()}
+        if names:
+            names_by_problem[pk] = names
+    all_names = set().union(*names_by_problem.values()) if names_by_problem else set()
+    Tag.objects.bulk_create([Tag(name=name) for name in sorted(all_names)], ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list("name", "pk"))
+    ProblemTag.objects.bulk_create(
+        [
+            ProblemTag(problem_id=pk, tag_id=tag_ids[name])
+            for pk, names in names_by_problem.items()
+            for name in names
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_mistake_rollup"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tag",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=100, unique=True)),
+            ],
+            options={"ordering": ["name"]},
+        ),
+        migrations.CreateModel(
+            name="ProblemTag",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("problem", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="tag_links", to="core.problem")),
+                ("tag", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="problem_links", to="core.tag")),
+            ],
+        ),
+        migrations.AddField(
+            model_name="problem",
+            name="tag_set",
+            field=models.ManyToManyField(blank=True, related_name="problems", through="core.ProblemTag", to="core.tag"),
+        ),
+        migrations.AddIndex(
+            model_name="problemtag",
+            index=models.Index(fields=["tag", "problem"], name="core_problemtag_tag_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="problemtag",
+            constraint=models.UniqueConstraint(fields=("problem", "tag"), name="core_problemtag_unique"),
+        ),
+        migrations.RunPython(split_tag_strings, migrations.RunPython.noop),
+    ]
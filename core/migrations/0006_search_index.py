@@ -0,0 +1,128 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE core_searchdocument_fts USING fts5(
+        title, body, content='core_searchdocument', content_rowid='id', tokenize='porter unicode61', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_fts_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO core_searchdocument_fts(core_searchdocument_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_au",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_ad",
+    "DROP TRIGGER IF EXISTS core_searchdocument_fts_ai",
+    "DROP TABLE IF EXISTS core_searchdocument_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX core_searchdocument_vector_idx ON core_searchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS core_searchdocument_vector_idx",
+    "ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model("core", "SearchDocument")
+    sources = [
+        ("problem", apps.get_model("core", "Problem").objects.all(), ("pk", "created_by_id", "title", "statement")),
+        (
+            "mistake",
+            apps.get_model("core", "Mistake").objects.all(),
+            ("pk", "attempt__user_id", "short_label", "detailed_postmortem", "fix_plan"),
+        ),
+        (
+            "attempt",
+            apps.get_model("core", "Attempt").objects.exclude(solution_notes=""),
+            ("pk", "user_id", "problem__title", "solution_notes"),
+        ),
+    ]
+    for kind, queryset, columns in sources:
+        docs = [
+            SearchDocument(
+                user_id=user_id,
+                kind=kind,
+                object_id=pk,
+                title=(title or "")[:200],
+                body="\n\n".join(part for part in body if part),
+            )
+            for pk, user_id, title, *body in queryset.values_list(*columns).iterator()
+        ]
+        SearchDocument.objects.bulk_create(docs, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0005_tag_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("problem", "Problem"), ("mistake", "Mistake"), ("attempt", "Attempt")], max_length=10)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("title", models.CharField(max_length=200)),
+                ("body", models.TextField(blank=True)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="searchdocument",
+            constraint=models.UniqueConstraint(fields=("kind", "object_id"), name="core_searchdoc_object_unique"),
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
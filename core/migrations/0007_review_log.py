@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0006_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SchedulerProfile",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("first_good_interval", models.PositiveIntegerField(default=1)),
+                ("first_easy_interval", models.PositiveIntegerField(default=3)),
+                ("second_interval", models.PositiveIntegerField(default=6)),
+                ("interval_modifier", models.FloatField(default=1.0)),
+                ("target_retention", models.FloatField(blank=True, null=True)),
+                ("reviews_fitted", models.PositiveIntegerField(default=0)),
+                ("fitted_at", models.DateTimeField(auto_now=True)),
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name="scheduler_profile", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ReviewLog",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("rating", models.PositiveSmallIntegerField(choices=[(0, "Again"), (1, "Hard"), (2, "Good"), (3, "Easy")])),
+                ("previous_ease", models.FloatField()),
+                ("previous_interval", models.PositiveIntegerField()),
+                ("ease_factor", models.FloatField()),
+                ("interval_days", models.PositiveIntegerField()),
+                ("elapsed_days", models.PositiveIntegerField(default=0)),
+                ("reviewed_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("review_item", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="logs", to="core.reviewitem")),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "ordering": ["reviewed_at"],
+                "indexes": [models.Index(fields=["user", "reviewed_at"], name="core_reviewlog_user_time_idx")],
+            },
+        ),
+    ]
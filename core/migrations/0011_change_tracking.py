@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+KIND_CHOICES = [("problem", "Problem"), ("attempt", "Attempt"), ("mistake", "Mistake"), ("review", "Review")]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_import_checkpoints"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Existing rows get the migration time as their first modification time.
+        migrations.AddField(
+            model_name="problem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="attempt",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name="mistake",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name="problem",
+            index=models.Index(fields=["created_by", "updated_at"], name="core_problem_owner_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="attempt",
+            index=models.Index(fields=["user", "updated_at"], name="core_attempt_user_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reviewitem",
+            index=models.Index(fields=["user", "updated_at"], name="core_review_user_updated_idx"),
+        ),
+        migrations.CreateModel(
+            name="DeletionLog",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=KIND_CHOICES, max_length=10)),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("deleted_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [models.Index(fields=["user", "deleted_at"], name="core_deletion_user_deleted_idx")],
+            },
+        ),
+        migrations.CreateModel(
+            name="SyncKey",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=KIND_CHOICES, max_length=10)),
+                ("source_id", models.PositiveBigIntegerField()),
+                ("object_id", models.PositiveBigIntegerField()),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("user", "kind", "source_id"), name="core_synckey_unique"),
+                ],
+            },
+        ),
+    ]
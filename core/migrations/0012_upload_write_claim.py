@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_change_tracking"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="upload",
+            name="writing_since",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
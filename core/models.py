@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-from datetime import date, datetime
+import time
+from datetime import date, datetime, timedelta
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils import timezone
+from django.utils.functional import cached_property
 
-from .scheduler import grade_review
+from . import metrics
+from .scheduler import DEFAULT_PARAMETERS, SchedulerParameters, grade_review
 
 User = get_user_model()
 
@@ -20,6 +23,7 @@ TOPIC_CHOICES = [
     ("COMB", "Combinatorics"),
     ("OTHER", "Other"),
 ]
+TOPIC_LABELS = dict(TOPIC_CHOICES)
 
 
 class Problem(models.Model):
@@ -30,20 +34,58 @@ class Problem(models.Model):
         default=5, validators=[MinValueValidator(1), MaxValueValidator(10)]
     )
     tags = models.CharField(max_length=200, blank=True)
+    tag_set = models.ManyToManyField("Tag", through="ProblemTag", related_name="problems", blank=True)
     statement = models.TextField()
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_by", "-created_at"], name="core_problem_owner_created_idx"),
+            models.Index(fields=["created_by", "updated_at"], name="core_problem_owner_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
-    @property
+    @cached_property
     def tag_list(self) -> list[str]:
         return [t.strip() for t in self.tags.split(",") if t.strip()]
 
+    def save(self, *args, **kwargs):
+        self.__dict__.pop("tag_list", None)
+        super().save(*args, **kwargs)
+
+
+class Tag(models.Model):
+    """Normalized (lower-cased) tag name; ``Problem.tags`` keeps the display string."""
+
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class ProblemTag(models.Model):
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name="tag_links")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="problem_links")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["problem", "tag"], name="core_problemtag_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["tag", "problem"], name="core_problemtag_tag_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.problem} #{self.tag}"
+
 
 class Attempt(models.Model):
     OUTCOME_CHOICES = [
@@ -64,21 +106,29 @@ class Attempt(models.Model):
     confidence = models.PositiveSmallIntegerField(
         default=3, validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-started_at"]
+        indexes = [
+            models.Index(fields=["user", "-started_at"], name="core_attempt_user_started_idx"),
+            models.Index(fields=["user", "updated_at"], name="core_attempt_user_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.problem.title} ({self.get_outcome_display()})"
 
     def save(self, *args, **kwargs):
+        self.update_time_spent()
+        super().save(*args, **kwargs)
+
+    def update_time_spent(self) -> None:
         if self.started_at and self.ended_at:
             start = self.started_at
             end = self.ended_at
             if isinstance(start, datetime) and isinstance(end, datetime):
                 delta = end - start
                 self.time_spent_seconds = max(0, int(delta.total_seconds()))
-        super().save(*args, **kwargs)
 
     @property
     def duration_display(self) -> str:
@@ -110,6 +160,7 @@ class Mistake(models.Model):
     strategy_error = models.BooleanField(default=False)
     fix_plan = models.TextField(blank=True)
     next_review_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ["-severity"]
@@ -148,6 +199,10 @@ class ReviewItem(models.Model):
 
     class Meta:
         ordering = ["due_date"]
+        indexes = [
+            models.Index(fields=["user", "due_date"], name="core_review_user_due_idx"),
+            models.Index(fields=["user", "updated_at"], name="core_review_user_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Review for {self.related_mistake or self.related_problem}"
@@ -155,6 +210,321 @@ class ReviewItem(models.Model):
     def is_due(self) -> bool:
         return self.due_date <= date.today()
 
-    def grade(self, rating: int) -> None:
-        grade_review(self, rating)
-        self.save()
+    def last_reviewed_on(self) -> date:
+        """Date of the previous grade, recovered from the current schedule."""
+        if self.interval_days > 0:
+            return self.due_date - timedelta(days=self.interval_days)
+        return timezone.localdate(self.created_at) if self.created_at else date.today()
+
+    def grade(self, rating: int) -> ReviewLog:
+        started = time.perf_counter()
+        previous_ease, previous_interval = self.ease_factor, self.interval_days
+        elapsed = max(0, (date.today() - self.last_reviewed_on()).days)
+        grade_review(self, rating, SchedulerProfile.parameters_for(self.user_id))
+        with transaction.atomic():
+            self.save()
+            log = ReviewLog.objects.create(
+                user_id=self.user_id,
+                review_item=self,
+                rating=rating,
+                previous_ease=previous_ease,
+                previous_interval=previous_interval,
+                ease_factor=self.ease_factor,
+                interval_days=self.interval_days,
+                elapsed_days=elapsed,
+            )
+        metrics.observe_grades("single", [rating], time.perf_counter() - started)
+        return log
+
+
+class ReviewLog(models.Model):
+    """
+    One grade of one card. Rows are only ever appended.
+
+    ``elapsed_days`` is the time since the card's previous grade (or since it
+    was created), i.e. how long the memory had to hold when it was rated.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    review_item = models.ForeignKey(
+        ReviewItem, on_delete=models.SET_NULL, null=True, blank=True, related_name="logs"
+    )
+    rating = models.PositiveSmallIntegerField(choices=ReviewItem.RATING_CHOICES)
+    previous_ease = models.FloatField()
+    previous_interval = models.PositiveIntegerField()
+    ease_factor = models.FloatField()
+    interval_days = models.PositiveIntegerField()
+    elapsed_days = models.PositiveIntegerField(default=0)
+    reviewed_at = models.DateTimeField(default=timezone.now)
+    # Idempotency key sent by offline clients (see core.sync); blank for server-side grades.
+    client_key = models.CharField(max_length=64, blank=True, default="")
+
+    class Meta:
+        ordering = ["reviewed_at"]
+        indexes = [
+            models.Index(fields=["user", "reviewed_at"], name="core_reviewlog_user_time_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "client_key"],
+                condition=~models.Q(client_key=""),
+                name="core_reviewlog_client_key_unique",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} rated {self.get_rating_display()} at {self.reviewed_at:%Y-%m-%d %H:%M}"
+
+
+class SchedulerProfile(models.Model):
+    """Per-user scheduler parameters fitted from the review log (``tune_scheduler``)."""
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="scheduler_profile")
+    first_good_interval = models.PositiveIntegerField(default=DEFAULT_PARAMETERS.first_good_interval)
+    first_easy_interval = models.PositiveIntegerField(default=DEFAULT_PARAMETERS.first_easy_interval)
+    second_interval = models.PositiveIntegerField(default=DEFAULT_PARAMETERS.second_interval)
+    interval_modifier = models.FloatField(default=DEFAULT_PARAMETERS.interval_modifier)
+    target_retention = models.FloatField(null=True, blank=True)
+    reviews_fitted = models.PositiveIntegerField(default=0)
+    fitted_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"Scheduler profile for {self.user}"
+
+    @property
+    def parameters(self) -> SchedulerParameters:
+        return SchedulerParameters(
+            first_good_interval=self.first_good_interval,
+            first_easy_interval=self.first_easy_interval,
+            second_interval=self.second_interval,
+            interval_modifier=self.interval_modifier,
+        )
+
+    @classmethod
+    def parameters_for(cls, user_id: int) -> SchedulerParameters:
+        profile = cls.objects.filter(user_id=user_id).first()
+        return profile.parameters if profile else DEFAULT_PARAMETERS
+
+
+class MistakeRollup(models.Model):
+    """Per-user mistake counts bucketed by topic, mistake type and month."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    topic = models.CharField(max_length=10, choices=TOPIC_CHOICES)
+    mistake_type = models.ForeignKey(MistakeType, on_delete=models.CASCADE)
+    month = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+    severity_sum = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["month"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "topic", "mistake_type", "month"], name="core_rollup_bucket_unique"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} {self.topic}/{self.mistake_type} {self.month:%Y-%m}: {self.total}"
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text for one problem, mistake or attempt.
+
+    The full-text index itself lives outside the ORM: an FTS5 table kept in
+    sync by triggers on SQLite, a generated ``tsvector`` column with a GIN
+    index on PostgreSQL (see ``core.search``).
+    """
+
+    KIND_PROBLEM = "problem"
+    KIND_MISTAKE = "mistake"
+    KIND_ATTEMPT = "attempt"
+
+    KIND_CHOICES = [
+        (KIND_PROBLEM, "Problem"),
+        (KIND_MISTAKE, "Mistake"),
+        (KIND_ATTEMPT, "Attempt"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="core_searchdoc_object_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.object_id} {self.title}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work picked up by ``manage.py run_workers`` (see ``core.jobs``).
+
+    Uploaded input and produced output live in ``MEDIA_ROOT/jobs/``; workers
+    report progress as ``progress_done`` of ``progress_total`` and refresh
+    ``heartbeat_at`` so jobs of a crashed worker can be requeued.
+    """
+
+    KIND_IMPORT = "import"
+    KIND_EXPORT = "export"
+    KIND_REBUILD_ANALYTICS = "rebuild_analytics"
+    KIND_REBUILD_SEARCH = "rebuild_search"
+    KIND_RESCHEDULE = "reschedule"
+
+    KIND_CHOICES = [
+        (KIND_IMPORT, "Import"),
+        (KIND_EXPORT, "Export"),
+        (KIND_REBUILD_ANALYTICS, "Rebuild analytics"),
+        (KIND_REBUILD_SEARCH, "Rebuild search index"),
+        (KIND_RESCHEDULE, "Reschedule reviews"),
+    ]
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="jobs")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    params = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to="jobs/input/", blank=True)
+    output_file = models.FileField(upload_to="jobs/output/", blank=True)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Where an interrupted import picks up again; written with each committed batch.
+    checkpoint = models.JSONField(default=dict, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="core_job_status_created_idx"),
+            models.Index(fields=["user", "-created_at"], name="core_job_user_created_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in (self.STATUS_QUEUED, self.STATUS_RUNNING)
+
+    @property
+    def percent(self) -> int:
+        if self.status == self.STATUS_SUCCEEDED:
+            return 100
+        if not self.progress_total:
+            return 0
+        return min(100, self.progress_done * 100 // self.progress_total)
+
+
+class ImportKey(models.Model):
+    """Export id -> id of the row created for it, kept per import job so the import can resume."""
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name="import_keys")
+    section = models.CharField(max_length=20)
+    source_id = models.CharField(max_length=64)
+    object_id = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["job", "section", "source_id"], name="core_importkey_unique"),
+        ]
+
+
+class Upload(models.Model):
+    """
+    A file received in checksummed chunks (see ``core.uploads``).
+
+    ``received`` bytes have been written and verified; a client that lost
+    its connection asks for it and continues from there. ``writing_since``
+    is set while one request holds the right to write the next chunk.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="uploads")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    received = models.PositiveBigIntegerField(default=0)
+    writing_since = models.DateTimeField(null=True, blank=True)
+    file = models.FileField(upload_to="uploads/")
+    job = models.ForeignKey(Job, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+    @property
+    def is_complete(self) -> bool:
+        return self.received >= self.size
+
+
+class DeletionLog(models.Model):
+    """A deleted problem, attempt, mistake or review card, so delta exports can send the delete."""
+
+    KIND_PROBLEM = "problem"
+    KIND_ATTEMPT = "attempt"
+    KIND_MISTAKE = "mistake"
+    KIND_REVIEW = "review"
+
+    KIND_CHOICES = [
+        (KIND_PROBLEM, "Problem"),
+        (KIND_ATTEMPT, "Attempt"),
+        (KIND_MISTAKE, "Mistake"),
+        (KIND_REVIEW, "Review"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="core_deletion_user_deleted_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind}:{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class SyncKey(models.Model):
+    """
+    Which local row a delta export's row id was applied to (see ``core.delta``).
+
+    Ids in a delta are the source account's primary keys; later deltas
+    update or delete through this map, which makes applying one idempotent.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    kind = models.CharField(max_length=10, choices=DeletionLog.KIND_CHOICES)
+    source_id = models.PositiveBigIntegerField()
+    object_id = models.PositiveBigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "kind", "source_id"], name="core_synckey_unique"),
+        ]
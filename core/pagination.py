@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 50
+
+
+@dataclass
+class KeysetPage:
+    rows: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, pk: int) -> str:
+    raw = json.dumps([value.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        parsed = parse_datetime(value)
+    except (ValueError, TypeError):
+        return None
+    if parsed is None or not isinstance(pk, int):
+        return None
+    return parsed, pk
+
+
+def keyset_page(queryset, field: str, cursor: str | None = None, page_size: int | None = None) -> KeysetPage:
+    """
+    Return the page of ``queryset`` after ``cursor``, newest ``field`` first.
+
+    Rows are ordered by ``(-field, -pk)`` and the cursor holds the last row's
+    values, so each page is a range seek rather than an OFFSET scan.
+    """
+    page_size = page_size or PAGE_SIZE
+    queryset = queryset.order_by(f"-{field}", "-pk")
+    position = decode_cursor(cursor)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f"{field}__lt": value}) | Q(**{field: value, "pk__lt": pk}))
+    rows = list(queryset[: page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return KeysetPage(rows=rows, next_cursor=next_cursor)
+
+
+def next_page_url(request, page: KeysetPage) -> str | None:
+    """Current URL with the filters kept and ``cursor`` pointing at the next page."""
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = page.next_cursor
+    return f"{request.path}?{params.urlencode()}"
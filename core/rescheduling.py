@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+from datetime import date, timedelta
+from functools import partial
+from itertools import groupby
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import metrics
+from .caching import bump_dashboard_version, invalidate_due_count
+from .models import ReviewItem, ReviewLog, SchedulerProfile
+from .scheduler import grade_batch, np
+
+RESCHEDULE_BATCH_SIZE = 500
+_STATE_FIELDS = ["ease_factor", "interval_days", "due_date", "updated_at"]
+
+
+def _write(items: list[ReviewItem], fields: list[str], user_ids, batch_size: int, logs=()) -> int:
+    with transaction.atomic():
+        ReviewItem.objects.bulk_update(items, fields, batch_size=batch_size)
+        ReviewLog.objects.bulk_create(logs, batch_size=batch_size)
+    # bulk_update skips post_save, so the nav counters and dashboard fragments are dropped here,
+    # once the caller's transaction (if any) has committed.
+    for user_id in user_ids:
+        transaction.on_commit(partial(invalidate_due_count, user_id))
+        transaction.on_commit(partial(bump_dashboard_version, user_id))
+    return len(items)
+
+
+# Columns apply_grades needs for each card, in order.
+CARD_STATE_COLUMNS = ("pk", "user_id", "ease_factor", "interval_days", "due_date", "created_at")
+
+
+def apply_grades(
+    rows,
+    ratings,
+    today: date | None = None,
+    batch_size: int = RESCHEDULE_BATCH_SIZE,
+    reviewed_at=None,
+    source: str = "bulk",
+) -> int:
+    """
+    Grade many cards at once and log every grade.
+
+    ``rows`` are ``CARD_STATE_COLUMNS`` tuples holding each card's state
+    before grading and ``ratings`` the matching grades. Cards are graded with
+    one vectorised pass per owner and written back with ``bulk_update``;
+    ``source`` labels the grades in the Prometheus metrics.
+    """
+    started = time.perf_counter()
+    today = today or date.today()
+    now = timezone.now()
+    if reviewed_at is None:
+        reviewed_at = [now] * len(rows)
+    graded = sorted(zip(rows, ratings, reviewed_at), key=lambda entry: entry[0][1])
+    items, logs = [], []
+    for user_id, owned in groupby(graded, key=lambda entry: entry[0][1]):
+        owned = list(owned)
+        state = grade_batch(
+            [row[2] for row, _, _ in owned],
+            [row[3] for row, _, _ in owned],
+            [rating for _, rating, _ in owned],
+            today,
+            params=SchedulerProfile.parameters_for(user_id),
+        )
+        for i, ((pk, _, ease, interval, due_date, created_at), rating, when) in enumerate(owned):
+            card = ReviewItem(interval_days=interval, due_date=due_date, created_at=created_at)
+            items.append(
+                ReviewItem(
+                    pk=pk,
+                    ease_factor=state.ease_factors[i],
+                    interval_days=state.interval_days[i],
+                    due_date=state.due_dates[i],
+                    updated_at=now,
+                )
+            )
+            logs.append(
+                ReviewLog(
+                    user_id=user_id,
+                    review_item_id=pk,
+                    rating=rating,
+                    previous_ease=ease,
+                    previous_interval=interval,
+                    ease_factor=state.ease_factors[i],
+                    interval_days=state.interval_days[i],
+                    elapsed_days=max(0, (today - card.last_reviewed_on()).days),
+                    reviewed_at=when,
+                )
+            )
+    written = _write(items, _STATE_FIELDS, {row[1] for row in rows}, batch_size, logs)
+    metrics.observe_grades(source, ratings, time.perf_counter() - started)
+    return written
+
+
+def regrade_reviews(queryset, quality: int, today: date | None = None, batch_size: int = RESCHEDULE_BATCH_SIZE) -> int:
+    """Apply the same rating to every card in ``queryset`` in one vectorised pass per owner."""
+    rows = list(queryset.order_by().values_list(*CARD_STATE_COLUMNS))
+    if not rows:
+        return 0
+    return apply_grades(rows, [quality] * len(rows), today, batch_size)
+
+
+def spread_overdue(user, days: int, today: date | None = None, batch_size: int = RESCHEDULE_BATCH_SIZE) -> int:
+    """
+    Spread ``user``'s overdue cards evenly over the next ``days`` days.
+
+    Meant for coming back from a break: the most overdue cards come first,
+    and no single day receives the whole backlog.
+    """
+    today = today or date.today()
+    days = max(1, int(days))
+    pks = list(
+        ReviewItem.objects.filter(user=user, due_date__lt=today)
+        .order_by("due_date", "pk")
+        .values_list("pk", flat=True)
+    )
+    if not pks:
+        return 0
+    count = len(pks)
+    if np is not None:
+        offsets = ((np.arange(count) * days) // count).tolist()
+    else:
+        offsets = [(i * days) // count for i in range(count)]
+    now = timezone.now()
+    items = [
+        ReviewItem(pk=pk, due_date=today + timedelta(days=offset), updated_at=now)
+        for pk, offset in zip(pks, offsets)
+    ]
+    return _write(items, ["due_date", "updated_at"], {user.pk}, batch_size)
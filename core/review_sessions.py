@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .caching import due_review_count
+from .models import ReviewItem
+from .rescheduling import CARD_STATE_COLUMNS, apply_grades
+from .sqlite import run_with_retry
+
+SESSION_KEY = "core:review-session"
+REVIEW_SESSION_SIZE = getattr(settings, "REVIEW_SESSION_SIZE", 50)
+REVIEW_FLUSH_SIZE = getattr(settings, "REVIEW_FLUSH_SIZE", 25)
+
+_CARD_COLUMNS = CARD_STATE_COLUMNS + ("prompt", "answer_key")
+
+
+def _card(row) -> dict:
+    card = dict(zip(_CARD_COLUMNS, row))
+    card["due_date"] = card["due_date"].isoformat()
+    card["created_at"] = card["created_at"].isoformat()
+    return card
+
+
+class ReviewSession:
+    """
+    A batch of due cards and the grades not yet written back.
+
+    Everything lives as plain JSON in ``request.session``, so serving and
+    grading a card issues no ``ReviewItem`` queries. Buffered grades are
+    written with one ``bulk_update`` every ``REVIEW_FLUSH_SIZE`` grades and
+    whenever the batch runs out.
+    """
+
+    def __init__(self, request):
+        self._session = request.session
+        self.user = request.user
+        data = self._session.get(SESSION_KEY) or {}
+        if data.get("user") != self.user.pk:
+            data = {}
+        self.queue: list[dict] = data.get("queue", [])
+        self.pending: list[list] = data.get("pending", [])
+        self.graded: int = data.get("graded", 0)
+        self.due: int = data.get("due", 0)
+
+    @property
+    def current(self) -> dict | None:
+        return self.queue[0] if self.queue else None
+
+    @property
+    def remaining(self) -> int:
+        return max(self.due - self.graded, len(self.queue))
+
+    def load(self, size: int | None = None) -> int:
+        """Flush outstanding grades, then queue the next ``size`` due cards."""
+        self.flush()
+        rows = (
+            ReviewItem.objects.filter(user=self.user, due_date__lte=date.today())
+            .order_by("due_date", "pk")
+            .values_list(*_CARD_COLUMNS)[: size or REVIEW_SESSION_SIZE]
+        )
+        self.queue = [_card(row) for row in rows]
+        self.due = self.graded + due_review_count(self.user)
+        return len(self.queue)
+
+    def grade(self, pk: int, rating: int) -> bool:
+        """Grade the card at the head of the queue; ``False`` if ``pk`` is not that card."""
+        if self.current is None or self.current["pk"] != pk:
+            return False
+        card = self.queue.pop(0)
+        self.pending.append([card, rating, timezone.now().isoformat()])
+        self.graded += 1
+        if len(self.pending) >= REVIEW_FLUSH_SIZE or not self.queue:
+            self.flush()
+        return True
+
+    def flush(self) -> int:
+        """
+        Write the buffered grades; they stay buffered if the write fails.
+
+        Each grade is applied to the card as it is stored now, not as it was
+        when the batch was loaded, so a grade made meanwhile from the review
+        queue or an offline sync is built on rather than overwritten.
+        Cards deleted since the batch was loaded are skipped.
+        """
+        if not self.pending:
+            return 0
+
+        def write() -> int:
+            live = {
+                row[0]: row
+                for row in ReviewItem.objects.filter(
+                    user=self.user, pk__in=[card["pk"] for card, _, _ in self.pending]
+                ).values_list(*CARD_STATE_COLUMNS)
+            }
+            pending = [entry for entry in self.pending if entry[0]["pk"] in live]
+            if not pending:
+                return 0
+            return apply_grades(
+                [live[card["pk"]] for card, _, _ in pending],
+                [rating for _, rating, _ in pending],
+                reviewed_at=[parse_datetime(when) for _, _, when in pending],
+                source="session",
+            )
+
+        written = run_with_retry(write)
+        self.pending = []
+        return written
+
+    def save(self) -> None:
+        self._session[SESSION_KEY] = {
+            "user": self.user.pk,
+            "queue": self.queue,
+            "pending": self.pending,
+            "graded": self.graded,
+            "due": self.due,
+        }
+
+    def end(self) -> int:
+        written = self.flush()
+        self._session.pop(SESSION_KEY, None)
+        return written
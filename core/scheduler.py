@@ -2,6 +2,15 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date, timedelta
+from typing import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only where numpy is missing
+    np = None
+
+MIN_EASE = 1.3
+DEFAULT_EASE = 2.5
 
 
 @dataclass
@@ -11,33 +20,140 @@ class ReviewState:
     due_date: date
 
 
-def grade_review(review_item, quality: int) -> ReviewState:
-    """
-    Apply a light SM-2 style update.
+@dataclass(frozen=True)
+class SchedulerParameters:
+    """Tunable parts of the SM-2 rules; the defaults are the classic values."""
 
-    quality: 0=Again, 1=Hard, 2=Good, 3=Easy
-    """
+    first_good_interval: int = 1
+    first_easy_interval: int = 3
+    second_interval: int = 6
+    interval_modifier: float = 1.0
+
+
+DEFAULT_PARAMETERS = SchedulerParameters()
+
+
+@dataclass
+class BatchReviewState:
+    ease_factors: list[float]
+    interval_days: list[int]
+    due_dates: list[date]
+
+
+def _ease_delta(quality: int) -> float:
+    # SM-2 ease factor adjustment
+    return 0.1 - (3 - quality) * (0.08 + (3 - quality) * 0.02)
+
+
+# Precomputed per rating so the batch path adds bit-identical deltas.
+EASE_DELTAS = tuple(_ease_delta(q) for q in range(4))
+_EASE_DELTA_ARRAY = np.asarray(EASE_DELTAS) if np is not None else None
+
+
+def next_state(
+    ease_factor: float,
+    interval_days: int,
+    quality: int,
+    params: SchedulerParameters = DEFAULT_PARAMETERS,
+) -> tuple[float, int]:
+    """Return the ``(ease_factor, interval_days)`` that follow a ``quality`` rating."""
     if quality not in (0, 1, 2, 3):
         raise ValueError("quality must be 0-3")
 
-    ef = review_item.ease_factor or 2.5
-    # SM-2 ease factor adjustment
-    ef = ef + (0.1 - (3 - quality) * (0.08 + (3 - quality) * 0.02))
-    ef = max(1.3, round(ef, 2))
+    ef = ease_factor or DEFAULT_EASE
+    ef = ef + EASE_DELTAS[quality]
+    ef = max(MIN_EASE, round(ef, 2))
 
     if quality < 2:
         interval = 1
     else:
-        if review_item.interval_days <= 0:
-            interval = 1 if quality == 2 else 3
-        elif review_item.interval_days == 1:
-            interval = 6
+        if interval_days <= 0:
+            interval = params.first_good_interval if quality == 2 else params.first_easy_interval
+        elif interval_days == 1:
+            interval = params.second_interval
         else:
-            interval = round(review_item.interval_days * ef)
+            interval = max(1, round(interval_days * ef * params.interval_modifier))
+    return ef, int(interval)
+
 
+def grade_review(review_item, quality: int, params: SchedulerParameters | None = None) -> ReviewState:
+    """
+    Apply a light SM-2 style update.
+
+    quality: 0=Again, 1=Hard, 2=Good, 3=Easy
+    """
+    ef, interval = next_state(review_item.ease_factor, review_item.interval_days, quality, params or DEFAULT_PARAMETERS)
     due = date.today() + timedelta(days=interval)
 
     review_item.ease_factor = ef
-    review_item.interval_days = int(interval)
+    review_item.interval_days = interval
     review_item.due_date = due
     return ReviewState(ease_factor=ef, interval_days=interval, due_date=due)
+
+
+def _next_states_python(ease_factors, interval_days, qualities, params=DEFAULT_PARAMETERS):
+    pairs = [next_state(ef, iv, int(q), params) for ef, iv, q in zip(ease_factors, interval_days, qualities)]
+    return [p[0] for p in pairs], [p[1] for p in pairs]
+
+
+def _round2(values):
+    """``round(x, 2)`` for an array, matching Python's correctly rounded result."""
+    scaled = values * 100.0
+    rounded = np.rint(scaled)
+    # np.rint(x * 100) can disagree with round(x, 2) only when x * 100 sits on
+    # a .5 tie after the multiplication; settle those few with Python's round.
+    ties = np.abs(np.abs(scaled - rounded) - 0.5) < 1e-6
+    rounded /= 100.0
+    if ties.any():
+        rounded[ties] = [round(float(v), 2) for v in values[ties]]
+    return rounded
+
+
+def next_states_numpy(ease_factors, interval_days, qualities, params: SchedulerParameters = DEFAULT_PARAMETERS):
+    """Vectorised :func:`next_state` over equally sized arrays; returns ``(ease, interval)`` arrays."""
+    ef = np.asarray(ease_factors, dtype=np.float64)
+    iv = np.asarray(interval_days, dtype=np.int64)
+    q = np.asarray(qualities, dtype=np.int64)
+    if q.size and (q.min() < 0 or q.max() > 3):
+        raise ValueError("quality must be 0-3")
+
+    unset = ef == 0
+    if unset.any():
+        ef = np.where(unset, DEFAULT_EASE, ef)
+    ef = np.maximum(MIN_EASE, _round2(ef + _EASE_DELTA_ARRAY[q]))
+
+    if params.interval_modifier == 1.0:
+        interval = np.rint(iv * ef).astype(np.int64)
+    else:
+        interval = np.maximum(np.rint(iv * ef * params.interval_modifier).astype(np.int64), 1)
+    interval[iv == 1] = params.second_interval
+    fresh = iv <= 0
+    interval[fresh] = np.where(q[fresh] == 2, params.first_good_interval, params.first_easy_interval)
+    interval[q < 2] = 1
+    return ef, interval
+
+
+def grade_batch(
+    ease_factors: Sequence[float],
+    interval_days: Sequence[int],
+    qualities: Sequence[int],
+    today: date | None = None,
+    use_numpy: bool | None = None,
+    params: SchedulerParameters = DEFAULT_PARAMETERS,
+) -> BatchReviewState:
+    """
+    Grade many cards at once with the same rules as :func:`grade_review`.
+
+    Uses NumPy when it is installed (or when ``use_numpy`` is true) and a
+    pure-Python loop otherwise; both produce identical results.
+    """
+    today = today or date.today()
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy:
+        ef, interval = next_states_numpy(ease_factors, interval_days, qualities, params)
+        due = (np.datetime64(today, "D") + interval.astype("timedelta64[D]")).tolist()
+        return BatchReviewState(ease_factors=ef.tolist(), interval_days=interval.tolist(), due_dates=due)
+    ef, interval = _next_states_python(ease_factors, interval_days, qualities, params)
+    due = [today + timedelta(days=i) for i in interval]
+    return BatchReviewState(ease_factors=ef, interval_days=interval, due_dates=due)
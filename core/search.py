@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Attempt, Mistake, Problem, SearchDocument
+
+FTS_TABLE = "core_searchdocument_fts"
+INDEX_BATCH_SIZE = 1000
+_MARK_START, _MARK_END = "\x02", "\x03"
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# kind -> (queryset, (pk, user_id, title, *body parts) columns)
+_SOURCES = {
+    SearchDocument.KIND_PROBLEM: (
+        lambda: Problem.objects.all(),
+        ("pk", "created_by_id", "title", "statement"),
+    ),
+    SearchDocument.KIND_MISTAKE: (
+        lambda: Mistake.objects.all(),
+        ("pk", "attempt__user_id", "short_label", "detailed_postmortem", "fix_plan"),
+    ),
+    SearchDocument.KIND_ATTEMPT: (
+        lambda: Attempt.objects.exclude(solution_notes=""),
+        ("pk", "user_id", "problem__title", "solution_notes"),
+    ),
+}
+
+
+@dataclass
+class SearchHit:
+    kind: str
+    object_id: int
+    title: str
+    snippet: str
+    score: float
+    url: str = ""
+
+
+def _documents(kind: str, queryset):
+    for pk, user_id, title, *body in queryset.values_list(*_SOURCES[kind][1]).iterator(chunk_size=INDEX_BATCH_SIZE):
+        yield SearchDocument(
+            user_id=user_id,
+            kind=kind,
+            object_id=pk,
+            title=(title or "")[:200],
+            body="\n\n".join(part for part in body if part),
+        )
+
+
+def index_objects(kind: str, pks=None, user_id: int | None = None) -> int:
+    """(Re)index objects of ``kind``, limited to ``pks`` and/or ``user_id`` when given."""
+    if pks is not None:
+        pks = list(pks)
+        return sum(
+            _index(kind, pks[start : start + INDEX_BATCH_SIZE], user_id)
+            for start in range(0, len(pks), INDEX_BATCH_SIZE)
+        )
+    return _index(kind, None, user_id)
+
+
+def _index(kind: str, pks, user_id) -> int:
+    queryset = _SOURCES[kind][0]()
+    stale = SearchDocument.objects.filter(kind=kind)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+        stale = stale.filter(object_id__in=pks)
+    if user_id is not None:
+        queryset = queryset.filter(**{_SOURCES[kind][1][1]: user_id})
+        stale = stale.filter(user_id=user_id)
+    written = 0
+    with transaction.atomic():
+        stale.delete()
+        batch = []
+        for doc in _documents(kind, queryset):
+            batch.append(doc)
+            if len(batch) >= INDEX_BATCH_SIZE:
+                written += len(SearchDocument.objects.bulk_create(batch))
+                batch = []
+        written += len(SearchDocument.objects.bulk_create(batch))
+    return written
+
+
+def remove_object(kind: str, object_id: int) -> None:
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def rebuild_index(user_id: int | None = None) -> int:
+    return sum(index_objects(kind, user_id=user_id) for kind in _SOURCES)
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every token so user input can never be parsed as FTS5 syntax; the
+    # last token is a prefix match to support search-as-you-type.
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ""
+    quoted = [f'"{t}"' for t in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _search_sqlite(user_id: int, query: str, limit: int):
+    match = _fts5_query(query)
+    if not match:
+        return []
+    # Rank and limit first, then build snippets for the top rows only.
+    sql = f"""
+        SELECT d.kind, d.object_id, d.title,
+               snippet({FTS_TABLE}, 1, %s, %s, '…', 16),
+               top.rank
+        FROM (
+            SELECT {FTS_TABLE}.rowid AS id, bm25({FTS_TABLE}, 4.0, 1.0) AS rank
+            FROM {FTS_TABLE}
+            JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s AND d.user_id = %s
+            ORDER BY rank
+            LIMIT %s
+        ) top
+        JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = top.id
+        JOIN core_searchdocument d ON d.id = top.id
+        WHERE {FTS_TABLE} MATCH %s
+        ORDER BY top.rank
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_MARK_START, _MARK_END, match, user_id, limit, match])
+        return [(kind, pk, title, snippet, -rank) for kind, pk, title, snippet, rank in cursor.fetchall()]
+
+
+def _search_postgresql(user_id: int, query: str, limit: int):
+    sql = """
+        SELECT d.kind, d.object_id, d.title,
+               ts_headline('english', d.body, q, %s),
+               ts_rank(d.search_vector, q) AS rank
+        FROM core_searchdocument d, websearch_to_tsquery('english', %s) q
+        WHERE d.user_id = %s AND d.search_vector @@ q
+        ORDER BY rank DESC
+        LIMIT %s
+    """
+    options = f"StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=30, MinWords=10"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [options, query, user_id, limit])
+        return cursor.fetchall()
+
+
+def _search_fallback(user_id: int, query: str, limit: int):
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return []
+    docs = SearchDocument.objects.filter(user_id=user_id)
+    for token in tokens:
+        docs = docs.filter(Q(title__icontains=token) | Q(body__icontains=token))
+    return [(d.kind, d.object_id, d.title, d.body[:200], 0.0) for d in docs[:limit]]
+
+
+def _render_snippet(raw: str) -> str:
+    html = escape(raw or "").replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+    return mark_safe(html)
+
+
+def _attach_urls(hits: list[SearchHit]) -> None:
+    mistake_ids = [h.object_id for h in hits if h.kind == SearchDocument.KIND_MISTAKE]
+    attempt_of = dict(Mistake.objects.filter(pk__in=mistake_ids).values_list("pk", "attempt_id")) if mistake_ids else {}
+    for hit in hits:
+        if hit.kind == SearchDocument.KIND_PROBLEM:
+            hit.url = reverse("problem_detail", args=[hit.object_id])
+        elif hit.kind == SearchDocument.KIND_ATTEMPT:
+            hit.url = reverse("finish_attempt", args=[hit.object_id])
+        elif hit.object_id in attempt_of:
+            hit.url = reverse("finish_attempt", args=[attempt_of[hit.object_id]])
+
+
+def search(user, query: str, limit: int = 20) -> list[SearchHit]:
+    """Ranked full-text search over ``user``'s problems, mistakes and attempt notes."""
+    query = (query or "").strip()
+    if not query:
+        return []
+    backend = {"sqlite": _search_sqlite, "postgresql": _search_postgresql}.get(connection.vendor, _search_fallback)
+    hits = [
+        SearchHit(kind=kind, object_id=pk, title=title, snippet=_render_snippet(snippet), score=float(score or 0))
+        for kind, pk, title, snippet, score in backend(user.pk, query, limit)
+    ]
+    _attach_urls(hits)
+    return hits
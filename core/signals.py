@@ -0,0 +1,155 @@
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .analytics import adjust_rollup, attempt_bucket, mistake_bucket, mistake_counts
+from .caching import bump_dashboard_version, invalidate_due_count
+from .models import Attempt, DeletionLog, Mistake, Problem, ReviewItem, SchedulerProfile, SearchDocument
+from .search import index_objects, remove_object
+from .tagging import sync_problem_tags
+
+
+@receiver(post_save, sender=ReviewItem)
+@receiver(post_delete, sender=ReviewItem)
+def review_item_changed(sender, instance, **kwargs):
+    # Covers creation, deletion and ReviewItem.grade(), which saves the item. The caches are
+    # dropped after commit: earlier, a concurrent read could refill them from the old rows.
+    transaction.on_commit(partial(invalidate_due_count, instance.user_id))
+    transaction.on_commit(partial(bump_dashboard_version, instance.user_id))
+
+
+@receiver(post_save, sender=Attempt)
+@receiver(post_delete, sender=Attempt)
+def attempt_changed(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_dashboard_version, instance.user_id))
+
+
+@receiver(post_save, sender=SchedulerProfile)
+def scheduler_profile_saved(sender, instance, **kwargs):
+    # The cached review forecast replays the user's interval rules.
+    transaction.on_commit(partial(bump_dashboard_version, instance.user_id))
+
+
+@receiver(pre_save, sender=Mistake)
+@receiver(pre_delete, sender=Mistake)
+def mistake_before_change(sender, instance, **kwargs):
+    instance._rollup_bucket = mistake_bucket(instance.pk) if instance.pk else None
+    if instance._rollup_bucket and kwargs["signal"] is pre_save:
+        # The instance already carries the new severity, so read the stored one.
+        instance._rollup_severity = Mistake.objects.filter(pk=instance.pk).values_list("severity", flat=True).first()
+    else:
+        instance._rollup_severity = instance.severity
+
+
+@receiver(post_save, sender=Mistake)
+def mistake_saved(sender, instance, **kwargs):
+    # Each write moves one mistake, so the rollups take it as a delta rather than a rescan.
+    old = getattr(instance, "_rollup_bucket", None)
+    new = mistake_bucket(instance.pk)
+    old_severity = getattr(instance, "_rollup_severity", 0) or 0
+    if old == new and old_severity == instance.severity:
+        return
+    adjust_rollup(old, -1, -old_severity)
+    adjust_rollup(new, 1, instance.severity)
+
+
+@receiver(post_delete, sender=Mistake)
+def mistake_deleted(sender, instance, **kwargs):
+    adjust_rollup(getattr(instance, "_rollup_bucket", None), -1, -instance.severity)
+
+
+@receiver(pre_save, sender=Attempt)
+def attempt_before_save(sender, instance, **kwargs):
+    instance._rollup_bucket = attempt_bucket(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Attempt)
+def attempt_saved(sender, instance, created, **kwargs):
+    # Mistakes are bucketed by their attempt's month and topic, so only a move
+    # between buckets needs a refresh. Deletes cascade through Mistake signals.
+    old = getattr(instance, "_rollup_bucket", None)
+    if created or not old or attempt_bucket(instance.pk) == old:
+        return
+    user_id, topic, month = old
+    for bucket, total, severity in mistake_counts(Mistake.objects.filter(attempt=instance)):
+        adjust_rollup((user_id, topic, bucket[2], month), -total, -severity)
+        adjust_rollup(bucket, total, severity)
+
+
+@receiver(pre_save, sender=Problem)
+def problem_before_save(sender, instance, **kwargs):
+    instance._rollup_topic = (
+        Problem.objects.filter(pk=instance.pk).values_list("topic", flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Problem)
+def problem_saved(sender, instance, created, **kwargs):
+    old_topic = getattr(instance, "_rollup_topic", None)
+    if created or old_topic is None or old_topic == instance.topic:
+        return
+    for bucket, total, severity in mistake_counts(Mistake.objects.filter(attempt__problem=instance)):
+        user_id, _, mistake_type_id, month = bucket
+        adjust_rollup((user_id, old_topic, mistake_type_id, month), -total, -severity)
+        adjust_rollup(bucket, total, severity)
+
+
+@receiver(post_save, sender=Problem)
+def problem_tags_saved(sender, instance, **kwargs):
+    sync_problem_tags([instance])
+
+
+@receiver(post_save, sender=Problem)
+def problem_search_saved(sender, instance, **kwargs):
+    index_objects(SearchDocument.KIND_PROBLEM, [instance.pk])
+    # Attempt documents are titled after their problem.
+    index_objects(SearchDocument.KIND_ATTEMPT, instance.attempts.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Mistake)
+def mistake_search_saved(sender, instance, **kwargs):
+    index_objects(SearchDocument.KIND_MISTAKE, [instance.pk])
+
+
+@receiver(post_save, sender=Attempt)
+def attempt_search_saved(sender, instance, **kwargs):
+    index_objects(SearchDocument.KIND_ATTEMPT, [instance.pk])
+
+
+@receiver(post_delete, sender=Problem)
+@receiver(post_delete, sender=Mistake)
+@receiver(post_delete, sender=Attempt)
+def search_object_deleted(sender, instance, **kwargs):
+    remove_object(sender.__name__.lower(), instance.pk)
+
+
+_DELETION_KINDS = {
+    Problem: DeletionLog.KIND_PROBLEM,
+    Attempt: DeletionLog.KIND_ATTEMPT,
+    Mistake: DeletionLog.KIND_MISTAKE,
+    ReviewItem: DeletionLog.KIND_REVIEW,
+}
+
+
+@receiver(post_delete, sender=Problem)
+@receiver(post_delete, sender=Attempt)
+@receiver(post_delete, sender=Mistake)
+@receiver(post_delete, sender=ReviewItem)
+def log_deletion(sender, instance, origin=None, **kwargs):
+    # Delta exports (core.delta) send these rows as deletes.
+    User = get_user_model()
+    if isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return  # The whole account is going away, log included.
+    if sender is Mistake:
+        # Set by mistake_before_change while the attempt row still existed.
+        bucket = getattr(instance, "_rollup_bucket", None)
+        user_id = bucket[0] if bucket else None
+    elif sender is Problem:
+        user_id = instance.created_by_id
+    else:
+        user_id = instance.user_id
+    if user_id:
+        DeletionLog.objects.create(user_id=user_id, kind=_DELETION_KINDS[sender], object_id=instance.pk)
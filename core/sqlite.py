@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+SQLITE_LOCK_RETRIES = getattr(settings, "SQLITE_LOCK_RETRIES", 5)
+# First back-off in seconds; doubled on every further attempt, with jitter so writers spread out.
+SQLITE_RETRY_DELAY = getattr(settings, "SQLITE_RETRY_DELAY", 0.05)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply ``settings.SQLITE_PRAGMAS`` to every new SQLite connection."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def is_locked_error(exc: BaseException) -> bool:
+    return isinstance(exc, OperationalError) and "database is locked" in str(exc)
+
+
+def run_with_retry(func, *args, attempts: int | None = None, **kwargs):
+    """
+    Call ``func`` in its own transaction, retrying when SQLite reports a lock.
+
+    ``busy_timeout`` already waits for the write lock, but a deferred
+    transaction that read before writing fails at once when another writer
+    got there first; rolling back and starting over is the only way out.
+    Inside an outer transaction the call is made once, since retrying would
+    replay only part of that transaction.
+    """
+    attempts = attempts or SQLITE_LOCK_RETRIES
+    if transaction.get_connection().in_atomic_block:
+        return func(*args, **kwargs)
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            if not is_locked_error(exc) or attempt == attempts - 1:
+                raise
+            metrics.DB_LOCK_RETRIES.inc()
+            logger.info("database is locked; retrying %s (attempt %d)", getattr(func, "__name__", func), attempt + 1)
+            time.sleep(SQLITE_RETRY_DELAY * 2**attempt * random.uniform(0.5, 1.5))
+
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import metrics
+from .caching import bump_dashboard_version, invalidate_due_count
+from .models import ReviewItem, ReviewLog, SchedulerProfile
+from .scheduler import DEFAULT_EASE, EASE_DELTAS, MIN_EASE, next_state
+from .templatetags.markdown_extras import cached_markdown
+
+SYNC_CARD_LIMIT = getattr(settings, "SYNC_CARD_LIMIT", 500)
+SYNC_MAX_GRADES = getattr(settings, "SYNC_MAX_GRADES", 1000)
+MAX_DAYS_AHEAD = 14
+
+APPLIED = "applied"
+DUPLICATE = "duplicate"
+CONFLICT = "conflict"
+MISSING = "missing"
+
+_STATE_FIELDS = ["ease_factor", "interval_days", "due_date", "updated_at"]
+
+
+class SyncError(ValueError):
+    """A pushed payload that cannot be applied at all."""
+
+
+def card_state(item: ReviewItem) -> dict:
+    return {
+        "id": item.pk,
+        "ease_factor": item.ease_factor,
+        "interval_days": item.interval_days,
+        "due_date": item.due_date.isoformat(),
+        "updated_at": item.updated_at.isoformat(),
+    }
+
+
+def pull(user, days_ahead: int = 0, limit: int | None = None) -> dict:
+    """
+    Everything an offline client needs to review: due cards with rendered text
+    and the scheduler rules to grade them locally.
+    """
+    days_ahead = max(0, min(int(days_ahead), MAX_DAYS_AHEAD))
+    until = date.today() + timedelta(days=days_ahead)
+    items = ReviewItem.objects.filter(user=user, due_date__lte=until).order_by("due_date", "pk")[
+        : limit or SYNC_CARD_LIMIT
+    ]
+    params = SchedulerProfile.parameters_for(user.pk)
+    cards = []
+    for item in items:
+        card = card_state(item)
+        card["prompt_html"] = cached_markdown(item.prompt)
+        card["answer_html"] = cached_markdown(item.answer_key)
+        cards.append(card)
+    return {
+        "server_time": timezone.now().isoformat(),
+        "scheduler": {
+            "min_ease": MIN_EASE,
+            "default_ease": DEFAULT_EASE,
+            "ease_deltas": list(EASE_DELTAS),
+            "first_good_interval": params.first_good_interval,
+            "first_easy_interval": params.first_easy_interval,
+            "second_interval": params.second_interval,
+            "interval_modifier": params.interval_modifier,
+        },
+        "cards": cards,
+    }
+
+
+def _aware(value, field: str) -> datetime:
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise SyncError(f"{field} must be an ISO 8601 timestamp.")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_grade(raw) -> dict:
+    if not isinstance(raw, dict):
+        raise SyncError("Each grade must be an object.")
+    key = raw.get("key")
+    if not isinstance(key, str) or not 0 < len(key) <= 64:
+        raise SyncError("Each grade needs a key of 1-64 characters.")
+    try:
+        card = int(raw["card"])
+        rating = int(raw["rating"])
+    except (KeyError, TypeError, ValueError):
+        raise SyncError(f"Grade {key} needs an integer card and rating.")
+    if rating not in (0, 1, 2, 3):
+        raise SyncError(f"Grade {key} has a rating outside 0-3.")
+    reviewed_at = min(_aware(raw.get("reviewed_at"), "reviewed_at"), timezone.now())
+    return {
+        "key": key,
+        "card": card,
+        "rating": rating,
+        "reviewed_at": reviewed_at,
+        "base_updated_at": _aware(raw.get("base_updated_at"), "base_updated_at"),
+    }
+
+
+def _seen_keys(user, keys: list[str]) -> set[str]:
+    return set(ReviewLog.objects.filter(user=user, client_key__in=keys).values_list("client_key", flat=True))
+
+
+def _apply(user, parsed: list[dict], params) -> tuple[list[dict], list[ReviewLog], dict, dict]:
+    results, logs, changed = [], [], {}
+    cards = ReviewItem.objects.select_for_update().filter(user=user).in_bulk({g["card"] for g in parsed})
+    # Read after the cards are locked, so a push that held them first has committed its keys.
+    seen = _seen_keys(user, [g["key"] for g in parsed])
+    now = timezone.now()
+    for grade in parsed:
+        key, card = grade["key"], cards.get(grade["card"])
+        if key in seen:
+            status = DUPLICATE
+        elif card is None:
+            status = MISSING
+        elif (
+            card.pk not in changed
+            and card.updated_at > grade["base_updated_at"]
+            and card.updated_at > grade["reviewed_at"]
+        ):
+            status = CONFLICT
+        else:
+            status = APPLIED
+            reviewed_on = timezone.localdate(grade["reviewed_at"])
+            previous_ease, previous_interval = card.ease_factor, card.interval_days
+            elapsed = max(0, (reviewed_on - card.last_reviewed_on()).days)
+            card.ease_factor, card.interval_days = next_state(
+                card.ease_factor, card.interval_days, grade["rating"], params
+            )
+            card.due_date = reviewed_on + timedelta(days=card.interval_days)
+            card.updated_at = now
+            changed[card.pk] = card
+            logs.append(
+                ReviewLog(
+                    user=user,
+                    review_item=card,
+                    rating=grade["rating"],
+                    previous_ease=previous_ease,
+                    previous_interval=previous_interval,
+                    ease_factor=card.ease_factor,
+                    interval_days=card.interval_days,
+                    elapsed_days=elapsed,
+                    reviewed_at=grade["reviewed_at"],
+                    client_key=key,
+                )
+            )
+        seen.add(key)
+        results.append({"key": key, "card": grade["card"], "status": status})
+    ReviewItem.objects.bulk_update(list(changed.values()), _STATE_FIELDS)
+    ReviewLog.objects.bulk_create(logs)
+    return results, logs, changed, cards
+
+
+def push(user, grades) -> tuple[list[dict], list[dict]]:
+    """
+    Apply a batch of offline grades in one transaction.
+
+    Grades are replayed in ``reviewed_at`` order with the server's own rules
+    and the user's current card state, so the client's local result is only a
+    preview. A grade whose key was already applied is reported as a
+    duplicate, also when a concurrent push of the same key commits first. If
+    a card changed on the server after the client downloaded it
+    (``updated_at`` newer than ``base_updated_at``), the later event wins:
+    a grade made after that change is applied on top of it, an older one is
+    reported as a conflict and dropped.
+
+    Returns ``(results, cards)``: one status per grade and the new state of
+    every card the batch mentioned.
+    """
+    if not isinstance(grades, list):
+        raise SyncError("grades must be a list.")
+    if len(grades) > SYNC_MAX_GRADES:
+        raise SyncError(f"At most {SYNC_MAX_GRADES} grades per push.")
+    started = time.perf_counter()
+    parsed = sorted((_parse_grade(raw) for raw in grades), key=lambda g: g["reviewed_at"])
+    params = SchedulerProfile.parameters_for(user.pk)
+    try:
+        with transaction.atomic():
+            results, logs, changed, cards = _apply(user, parsed, params)
+    except IntegrityError:
+        # Another push committed one of these keys after they were read. Its savepoint is
+        # rolled back, so replay the batch: the key now reads as a duplicate.
+        with transaction.atomic():
+            results, logs, changed, cards = _apply(user, parsed, params)
+    if changed:
+        # The view retries push in its own transaction; the caches go once that commits.
+        transaction.on_commit(partial(invalidate_due_count, user.pk))
+        transaction.on_commit(partial(bump_dashboard_version, user.pk))
+    metrics.observe_grades("sync", [log.rating for log in logs], time.perf_counter() - started)
+    return results, [card_state(card) for card in cards.values()]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from .importing import ImportResult, import_payload
+from .models import Attempt, MistakeType, TOPIC_CHOICES
+
+_TOPICS = [code for code, _ in TOPIC_CHOICES]
+_OUTCOMES = [code for code, _ in Attempt.OUTCOME_CHOICES]
+_OUTCOME_WEIGHTS = [4, 2, 3, 1]
+_TAGS = [
+    "induction", "invariant", "parity", "pigeonhole", "inequality", "am-gm", "cauchy", "vieta",
+    "modular", "lte", "orders", "similar-triangles", "power-of-point", "inversion", "bijection",
+    "double-counting", "extremal", "functional-equation", "polynomials", "graph-theory",
+]
+_SOURCES = ["IMO", "ISL", "USAMO", "BMO", "APMO", "EGMO", "Putnam", "RMM"]
+_STATEMENT = (
+    "Let $n \\ge {k}$ be an integer. Prove that\n\n"
+    "$$\\sum_{{i=1}}^{{n}} \\frac{{a_i^2}}{{b_i}} \\ge \\frac{{(a_1 + \\dots + a_n)^2}}{{b_1 + \\dots + b_n}}$$\n\n"
+    "for all positive reals $a_i, b_i$, and determine when equality holds."
+)
+_POSTMORTEM = (
+    "Tried to **{verb}** too early and lost track of the case $x = {k}$.\n\n"
+    "- Re-check the boundary cases before generalising.\n- Write down the invariant explicitly."
+)
+_VERBS = ["normalise", "homogenise", "substitute", "induct", "bash coordinates", "telescope"]
+
+
+@dataclass
+class DatasetSpec:
+    """How many rows of each kind every synthetic user gets."""
+
+    problems: int = 100
+    attempts_per_problem: int = 2
+    mistakes_per_attempt: int = 1
+    reviews_per_mistake: int = 1
+
+    @property
+    def rows_per_problem(self) -> int:
+        attempts = self.attempts_per_problem
+        mistakes = attempts * self.mistakes_per_attempt
+        return 1 + attempts + mistakes + mistakes * self.reviews_per_mistake
+
+    @property
+    def rows(self) -> int:
+        return self.problems * self.rows_per_problem
+
+    @classmethod
+    def for_rows(cls, rows: int, **shape) -> DatasetSpec:
+        """A spec with the default shape scaled to roughly ``rows`` rows per user."""
+        spec = cls(**shape)
+        spec.problems = max(1, rows // spec.rows_per_problem)
+        return spec
+
+
+def synthetic_payload(spec: DatasetSpec, rng: random.Random, mistake_types: list[str]) -> dict:
+    """Build an export-format payload, so the rows go through the regular import path."""
+    today = date.today()
+    now = timezone.now()
+    problems, attempts, mistakes, reviews = [], [], [], []
+    for p in range(spec.problems):
+        topic = rng.choice(_TOPICS)
+        title = f"{topic} {p + 1:06d}: {rng.choice(_SOURCES)} {rng.randint(1995, 2025)} P{rng.randint(1, 6)}"
+        problems.append(
+            {
+                "id": p,
+                "title": title,
+                "source": rng.choice(_SOURCES),
+                "topic": topic,
+                "difficulty": rng.randint(1, 10),
+                "tags": ", ".join(rng.sample(_TAGS, rng.randint(1, 4))),
+                "statement": _STATEMENT.format(k=rng.randint(2, 9)),
+            }
+        )
+        for a in range(spec.attempts_per_problem):
+            attempt_id = p * spec.attempts_per_problem + a
+            started = now - timedelta(days=rng.uniform(0, 365), minutes=rng.randint(0, 1440))
+            attempts.append(
+                {
+                    "id": attempt_id,
+                    "problem": p,
+                    "started_at": started.isoformat(),
+                    "ended_at": (started + timedelta(minutes=rng.randint(5, 180))).isoformat(),
+                    "outcome": rng.choices(_OUTCOMES, _OUTCOME_WEIGHTS)[0],
+                    "final_answer": str(rng.randint(0, 2025)),
+                    "solution_notes": "Key step: consider $f(x) - x$ and compare degrees.",
+                    "confidence": rng.randint(1, 5),
+                }
+            )
+            for m in range(spec.mistakes_per_attempt):
+                label = f"M{attempt_id}-{m}: {rng.choice(_VERBS)}"
+                mistakes.append(
+                    {
+                        "attempt": attempt_id,
+                        "mistake_type": rng.choice(mistake_types),
+                        "severity": rng.randint(1, 5),
+                        "short_label": label,
+                        "detailed_postmortem": _POSTMORTEM.format(verb=rng.choice(_VERBS), k=rng.randint(0, 9)),
+                        "conceptual_gap": rng.random() < 0.3,
+                        "execution_error": rng.random() < 0.5,
+                        "strategy_error": rng.random() < 0.2,
+                        "fix_plan": "Redo with a cleaner setup.",
+                        "next_review_date": (today + timedelta(days=rng.randint(-30, 60))).isoformat(),
+                    }
+                )
+                for _ in range(spec.reviews_per_mistake):
+                    interval = rng.choice([0, 1, rng.randint(2, 120)])
+                    reviews.append(
+                        {
+                            "related_mistake": label,
+                            "related_problem": title,
+                            "prompt": f"What went wrong in **{title}**?",
+                            "answer_key": "Check the case $n = 1$ separately.",
+                            "ease_factor": round(rng.uniform(1.3, 3.0), 2),
+                            "interval_days": interval,
+                            # Most cards are scheduled ahead; a backlog of overdue ones is typical.
+                            "due_date": (today + timedelta(days=rng.randint(-10, max(interval, 1)))).isoformat(),
+                        }
+                    )
+    return {
+        "problems": problems,
+        "attempts": attempts,
+        "mistake_types": [{"name": name} for name in mistake_types],
+        "mistakes": mistakes,
+        "reviews": reviews,
+    }
+
+
+def generate_user(
+    username: str, spec: DatasetSpec, seed: int = 0, password: str | None = None
+) -> tuple[object, ImportResult]:
+    """Create ``username`` and fill the account through ``import_payload`` (bulk inserts)."""
+    user = get_user_model().objects.create_user(username=username, password=password)
+    mistake_types = list(MistakeType.objects.values_list("name", flat=True))
+    if not mistake_types:
+        raise ValueError("No mistake types exist; run the migrations first.")
+    payload = synthetic_payload(spec, random.Random(f"{seed}:{username}"), mistake_types)
+    return user, import_payload(user, payload)
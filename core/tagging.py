@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from django.db.models import Q
+
+from .models import ProblemTag, Tag
+
+TAG_NAME_MAX = Tag._meta.get_field("name").max_length
+
+
+def normalize_tag(name: str) -> str:
+    return name.strip().lower()[:TAG_NAME_MAX]
+
+
+def parse_tags(value: str) -> set[str]:
+    """Split a comma-separated tag string into normalized tag names."""
+    return {normalize_tag(t) for t in (value or "").split(",") if t.strip()}
+
+
+def ensure_tags(names) -> dict[str, int]:
+    """Return ``name -> pk`` for ``names``, creating missing tags in one insert."""
+    names = set(names)
+    if not names:
+        return {}
+    Tag.objects.bulk_create([Tag(name=name) for name in sorted(names)], ignore_conflicts=True)
+    return dict(Tag.objects.filter(name__in=names).values_list("name", "pk"))
+
+
+def sync_problem_tags(problems) -> None:
+    """Make each problem's tag links match its ``tags`` string."""
+    problems = [p for p in problems if p.pk]
+    if not problems:
+        return
+    wanted = {p.pk: parse_tags(p.tags) for p in problems}
+    tag_ids = ensure_tags(set().union(*wanted.values()))
+    wanted_links = {(pk, tag_ids[name]) for pk, names in wanted.items() for name in names}
+    current = set(ProblemTag.objects.filter(problem_id__in=wanted).values_list("problem_id", "tag_id"))
+
+    stale = current - wanted_links
+    if stale:
+        stale_q = Q()
+        for problem_id, tag_id in stale:
+            stale_q |= Q(problem_id=problem_id, tag_id=tag_id)
+        ProblemTag.objects.filter(stale_q).delete()
+    ProblemTag.objects.bulk_create(
+        [ProblemTag(problem_id=pk, tag_id=tag_id) for pk, tag_id in wanted_links - current],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def _term_tags(term: str):
+    """Tags matched by one search term; a trailing ``*`` makes it a prefix match."""
+    if term.endswith("*"):
+        prefix = normalize_tag(term[:-1])
+        # A range on the unique index instead of LIKE, which SQLite cannot index here.
+        return Q(tag__name__gte=prefix, tag__name__lt=prefix + "\uffff")
+    return Q(tag__name=normalize_tag(term))
+
+
+def filter_by_tags(queryset, value: str, match_all: bool = False):
+    """
+    Filter problems by a comma-separated list of tag terms.
+
+    ``"inversion, nt*"`` matches the exact tag ``inversion`` or any tag
+    starting with ``nt``; ``match_all`` requires every term to match.
+    """
+    terms = [t.strip() for t in (value or "").split(",") if t.strip() and t.strip() != "*"]
+    if not terms:
+        return queryset
+    if match_all:
+        for term in terms:
+            queryset = queryset.filter(pk__in=ProblemTag.objects.filter(_term_tags(term)).values("problem_id"))
+        return queryset
+    any_q = Q()
+    for term in terms:
+        any_q |= _term_tags(term)
+    return queryset.filter(pk__in=ProblemTag.objects.filter(any_q).values("problem_id"))
@@ -1,47 +1,123 @@
+import hashlib
 import re
+import threading
+from collections import OrderedDict
 
 import markdown2
 from django import template
+from django.core.cache import cache
 from django.utils.safestring import mark_safe
 
+from .. import metrics
+
 register = template.Library()
 
+MARKDOWN_EXTRAS = {
+    "fenced-code-blocks": True,
+    "strike": True,
+    "break-on-newline": True,
+}
+# Bump when the rendering pipeline changes so stale HTML is not served from the shared cache.
+RENDER_VERSION = 1
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+LOCAL_CACHE_SIZE = 512
+
+_LIST_ENV_PATTERNS = [
+    (re.compile(rf"\\begin{{{env}}}(.*?)\\end{{{env}}}", re.S), marker)
+    for env, marker in (("itemize", "-"), ("enumerate", "1."))
+]
+_ITEM_SPLIT = re.compile(r"\\item")
+
+# markdown2.Markdown keeps per-conversion state, so each thread gets its own converter.
+_converters = threading.local()
+
 
 def _convert_latex_lists(text: str) -> str:
     """Convert basic LaTeX list environments into markdown lists so they render."""
 
-    def replace_env(env: str, marker: str, value: str) -> str:
-        pattern = re.compile(rf"\\begin{{{env}}}(.*?)\\end{{{env}}}", re.S)
-
+    def replace_env(pattern: re.Pattern, marker: str, value: str) -> str:
         def _replace(match: re.Match) -> str:
             body = match.group(1) or ""
-            items = [chunk.strip() for chunk in re.split(r"\\item", body) if chunk.strip()]
+            items = [chunk.strip() for chunk in _ITEM_SPLIT.split(body) if chunk.strip()]
             if not items:
                 return ""
             return "\n".join(f"{marker} {item}" for item in items)
 
         return pattern.sub(_replace, value)
 
-    converted = replace_env("itemize", "-", text)
-    converted = replace_env("enumerate", "1.", converted)
+    converted = text
+    for pattern, marker in _LIST_ENV_PATTERNS:
+        converted = replace_env(pattern, marker, converted)
     return converted
 
 
+def _converter() -> markdown2.Markdown:
+    converter = getattr(_converters, "markdown", None)
+    if converter is None:
+        converter = _converters.markdown = markdown2.Markdown(extras=dict(MARKDOWN_EXTRAS))
+    return converter
+
+
+def render_markdown(text: str) -> str:
+    """Render ``text`` to HTML without consulting any cache."""
+    return _converter().convert(_convert_latex_lists(text))
+
+
+class _LocalLRU:
+    """Small thread-safe LRU kept in front of the shared cache backend."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local_cache = _LocalLRU(LOCAL_CACHE_SIZE)
+
+
+def _cache_key(text: str) -> str:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    return f"core:md:{RENDER_VERSION}:{digest}"
+
+
+def cached_markdown(text: str) -> str:
+    """Render ``text``, reusing HTML keyed by a hash of the content."""
+    key = _cache_key(text)
+    html = _local_cache.get(key)
+    metrics.cache_result("markdown_local", html is not None)
+    if html is None:
+        html = cache.get(key)
+        metrics.cache_result("markdown_shared", html is not None)
+        if html is None:
+            html = render_markdown(text)
+            cache.set(key, html, CACHE_TIMEOUT)
+        _local_cache.set(key, html)
+    return html
+
+
 @register.filter
 def markdownify(text):
     if not text:
         return ""
-    normalized = _convert_latex_lists(text)
-    return mark_safe(
-        markdown2.markdown(
-            normalized,
-            extras={
-                "fenced-code-blocks": True,
-                "strike": True,
-                "break-on-newline": True,
-            },
-        )
-    )
+    return mark_safe(cached_markdown(text))
 
 
 @register.filter
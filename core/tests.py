@@ -1,9 +1,81 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
 from datetime import date, timedelta
+from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Attempt, Problem, ReviewItem
+from . import (
+    columnar,
+    delta,
+    importing,
+    instrumentation,
+    jobs,
+    review_sessions,
+    scheduler,
+    sqlite,
+    sync,
+    uploads,
+    views,
+)
+from .asgi import WHITENOISE_MIDDLEWARE, StaticFiles
+from .caching import due_count_key, due_review_count
+from .exporting import (
+    iter_attempts,
+    iter_export_json,
+    iter_mistake_types,
+    iter_mistakes,
+    iter_problems,
+    iter_reviews,
+)
+from .filters import ProblemFilter
+from .forecast import forecast_reviews, simulate_load
+from .importing import import_payload
+from .jsonstream import iter_section_rows
+from .models import (
+    Attempt,
+    Job,
+    Mistake,
+    MistakeRollup,
+    MistakeType,
+    Problem,
+    ReviewItem,
+    ReviewLog,
+    SchedulerProfile,
+    SearchDocument,
+    Upload,
+)
+from .rescheduling import regrade_reviews, spread_overdue
+from .review_sessions import ReviewSession
+from .search import search
+from .templatetags import markdown_extras
+from .tuning import fit_user
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
 
 
 @pytest.fixture
@@ -59,3 +131,996 @@ def test_dashboard_smoke(client, user):
     resp = client.get(reverse("dashboard"))
     assert resp.status_code == 200
     assert b"Dashboard" in resp.content
+
+
+def _seed_account(user, problems=3, attempts_per_problem=2):
+    mtype = MistakeType.objects.first()
+    for i in range(problems):
+        problem = Problem.objects.create(
+            title=f"P{i}", topic="NT", statement="S", tags="a, b", created_by=user
+        )
+        for j in range(attempts_per_problem):
+            attempt = Attempt.objects.create(problem=problem, user=user)
+            mistake = Mistake.objects.create(
+                attempt=attempt, mistake_type=mtype, short_label=f"M{i}-{j}", detailed_postmortem="D"
+            )
+            ReviewItem.objects.create(
+                user=user, related_mistake=mistake, related_problem=problem, prompt="p", answer_key="a"
+            )
+
+
+def test_dashboard_query_count_and_fragment_invalidation(
+    client, user, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    _seed_account(user)
+    client.login(username="alice", password="pass1234")
+    client.get(reverse("dashboard"))
+    # Warm: session, user, one conditional aggregate and the recent attempts;
+    # the due count and the chart/mistake/review panels come from the cache.
+    with django_assert_num_queries(4):
+        resp = client.get(reverse("dashboard"))
+    assert resp.status_code == 200
+    assert b'"Number Theory"' in resp.content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        problem = Problem.objects.create(title="G", topic="GEO", statement="S", created_by=user)
+        Attempt.objects.create(problem=problem, user=user)
+    resp = client.get(reverse("dashboard"))
+    assert b'"Geometry"' in resp.content
+    assert resp.context["attempts_last7"] == 7
+
+
+def test_export_streams_full_schema(client, user, django_assert_num_queries):
+    _seed_account(user)
+    client.login(username="alice", password="pass1234")
+    resp = client.get(reverse("export_data"))
+    assert resp.streaming
+    # Session + user lookups happen in the view; the body itself is one query per section.
+    with django_assert_num_queries(5):
+        payload = json.loads(b"".join(resp.streaming_content))
+    assert list(payload) == ["problems", "attempts", "mistake_types", "mistakes", "reviews"]
+    assert len(payload["problems"]) == 3
+    assert len(payload["attempts"]) == 6
+    assert {a["problem"] for a in payload["attempts"]} == {p["id"] for p in payload["problems"]}
+    assert payload["mistakes"][0]["mistake_type"] == MistakeType.objects.first().name
+    assert payload["reviews"][0]["related_problem"].startswith("P")
+
+
+def test_import_round_trip_uses_batched_inserts(user, other_user, django_assert_max_num_queries):
+    _seed_account(user, problems=4)
+    payload = {
+        "problems": list(iter_problems(user)),
+        "attempts": list(iter_attempts(user)),
+        "mistake_types": list(iter_mistake_types()),
+        "mistakes": list(iter_mistakes(user)),
+        "reviews": list(iter_reviews(user)),
+    }
+    with django_assert_max_num_queries(32):
+        result = import_payload(other_user, payload, batch_size=100)
+    assert result.counts["problems"] == 4
+    assert result.counts["attempts"] == 8
+    assert Mistake.objects.filter(attempt__user=other_user).count() == 8
+    reviews = ReviewItem.objects.filter(user=other_user)
+    assert reviews.count() == 8
+    assert not reviews.filter(related_mistake__isnull=True).exists()
+    assert not reviews.exclude(related_mistake__attempt__user=other_user).exists()
+    assert result.rows_per_second > 0
+    imported = Problem.objects.filter(created_by=other_user).first()
+    assert imported.tags == "a, b"
+    assert sorted(imported.tag_set.values_list("name", flat=True)) == ["a", "b"]
+
+
+def _query_plan(queryset) -> str:
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite syntax")
+@pytest.mark.parametrize(
+    "build_queryset, index_name",
+    [
+        (
+            lambda u: ReviewItem.objects.filter(user=u, due_date__lte=date.today()).order_by("due_date"),
+            "core_review_user_due_idx",
+        ),
+        (
+            lambda u: Attempt.objects.filter(user=u, started_at__gte=timezone.now() - timedelta(days=30)),
+            "core_attempt_user_started_idx",
+        ),
+        (lambda u: Problem.objects.filter(created_by=u), "core_problem_owner_created_idx"),
+    ],
+)
+def test_hot_queries_use_composite_indexes(user, build_queryset, index_name):
+    plan = _query_plan(build_queryset(user))
+    assert index_name in plan
+    assert "SCAN core_" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_due_count_is_cached_and_invalidated(user, django_assert_num_queries, django_capture_on_commit_callbacks):
+    item = ReviewItem.objects.create(user=user, prompt="p", answer_key="a")
+    assert due_review_count(user) == 1
+    with django_assert_num_queries(0):
+        assert due_review_count(user) == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        item.grade(ReviewItem.RATING_GOOD)
+        # Until the grade commits, other connections still see the card as due.
+        assert cache.get(due_count_key(user.pk)) == 1
+    assert due_review_count(user) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        ReviewItem.objects.create(user=user, prompt="q", answer_key="b")
+    assert due_review_count(user) == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        item.delete()
+    assert cache.get(due_count_key(user.pk)) is None
+    assert cache.get(due_count_key(user.pk, date.today() + timedelta(days=1))) is None
+
+
+def _rollup_snapshot(user):
+    return sorted(
+        MistakeRollup.objects.filter(user=user).values_list("topic", "mistake_type_id", "month", "total", "severity_sum")
+    )
+
+
+def test_rollups_follow_mistake_attempt_and_problem_changes(user):
+    _seed_account(user, problems=2)
+    problem = Problem.objects.filter(created_by=user).first()
+    assert sum(r[3] for r in _rollup_snapshot(user)) == 4
+
+    mistake = Mistake.objects.filter(attempt__problem=problem).first()
+    mistake.severity = 5
+    with CaptureQueriesContext(connection) as queries:
+        mistake.save()
+    # A single edit applies a delta to its bucket instead of regrouping the user's mistakes.
+    assert not [q["sql"] for q in queries.captured_queries if "GROUP BY" in q["sql"]]
+    attempt = mistake.attempt
+    attempt.started_at = attempt.started_at - timedelta(days=62)
+    attempt.save()
+    problem.topic = "GEO"
+    problem.save()
+    Mistake.objects.filter(attempt__problem=problem).exclude(pk=mistake.pk).delete()
+
+    incremental = _rollup_snapshot(user)
+    call_command("rebuild_analytics", user="alice", stdout=io.StringIO())
+    assert incremental == _rollup_snapshot(user)
+    assert sum(r[3] for r in incremental) == 3
+    assert ("GEO", mistake.mistake_type_id, attempt.started_at.date().replace(day=1), 1, 5) in incremental
+
+
+def test_mistake_analytics_reads_rollups(client, user):
+    _seed_account(user, problems=2)
+    client.login(username="alice", password="pass1234")
+    resp = client.get(reverse("mistake_analytics"))
+    assert resp.status_code == 200
+    assert resp.context["heatmap"]["Number Theory"][MistakeType.objects.first().name] == 4
+    assert resp.context["repeat_risk"][0]["total"] == 4
+
+
+def test_mistake_analytics_query_count_is_constant(client, user, django_assert_num_queries):
+    client.login(username="alice", password="pass1234")
+    client.get(reverse("mistake_analytics"))  # warm the session and nav counter cache
+    for problems in (1, 10):
+        _seed_account(user, problems=problems, attempts_per_problem=3)
+        due_review_count(user)
+        # session, user, heatmap cells, trend, repeat risk
+        with django_assert_num_queries(5):
+            resp = client.get(reverse("mistake_analytics"))
+        assert resp.status_code == 200
+
+
+def test_problem_list_keyset_pages_with_filter(client, user, monkeypatch):
+    monkeypatch.setattr("core.pagination.PAGE_SIZE", 3)
+    same_time = timezone.now()
+    for i in range(7):
+        Problem.objects.create(title=f"P{i}", topic="NT", statement="S", created_by=user)
+    Problem.objects.update(created_at=same_time)  # force the id tie-breaker
+    Problem.objects.create(title="Geo", topic="GEO", statement="S", created_by=user)
+    client.login(username="alice", password="pass1234")
+
+    resp = client.get(reverse("problem_list"), {"topic": "NT"})
+    seen = [p.title for p in resp.context["problems"]]
+    next_url = resp.context["next_url"]
+    while next_url:
+        assert "topic=NT" in next_url
+        resp = client.get(next_url, HTTP_HX_REQUEST="true")
+        assert b"<table" not in resp.content
+        seen += [p.title for p in resp.context["problems"]]
+        next_url = resp.context["next_url"]
+    assert sorted(seen) == [f"P{i}" for i in range(7)]
+    assert len(set(seen)) == 7
+
+
+def test_attempt_list_annotates_mistake_counts(client, user, django_assert_max_num_queries):
+    _seed_account(user, problems=5)
+    client.login(username="alice", password="pass1234")
+    client.get(reverse("attempt_list"))
+    with django_assert_max_num_queries(4):
+        resp = client.get(reverse("attempt_list"))
+    assert [a.mistake_count for a in resp.context["attempts"]] == [1] * 10
+
+
+def test_tag_filters_exact_prefix_and_modes(user):
+    def make(title, tags):
+        return Problem.objects.create(title=title, topic="GEO", statement="S", tags=tags, created_by=user)
+
+    inversion = make("A", "Inversion, geometry")
+    invariant = make("B", "invariant, nt")
+    both = make("C", "inversion, invariant")
+    make("D", "")
+    qs = Problem.objects.filter(created_by=user)
+
+    def titles(data):
+        return sorted(p.title for p in ProblemFilter(data, queryset=qs).qs)
+
+    assert titles({"tags": "inv"}) == []
+    assert titles({"tags": "inversion"}) == ["A", "C"]
+    assert titles({"tags": "inv*"}) == ["A", "B", "C"]
+    assert titles({"tags": "inversion, nt"}) == ["A", "B", "C"]
+    assert titles({"tags": "inversion, invariant", "tag_mode": "all"}) == ["C"]
+
+    both.tags = "geometry"
+    both.save()
+    assert titles({"tags": "inversion"}) == ["A"]
+    assert inversion.tag_list == ["Inversion", "geometry"]
+    assert sorted(invariant.tag_set.values_list("name", flat=True)) == ["invariant", "nt"]
+
+
+def test_full_text_search_is_ranked_synced_and_isolated(client, user, other_user):
+    circle = Problem.objects.create(
+        title="Circle inversion", topic="GEO", statement="Invert about the circumcircle.", created_by=user
+    )
+    Problem.objects.create(title="Sums", topic="ALG", statement="Mention inversion once.", created_by=user)
+    Problem.objects.create(title="Inversion", topic="GEO", statement="Hidden", created_by=other_user)
+    attempt = Attempt.objects.create(problem=circle, user=user, solution_notes="Used <b>radical</b> axis")
+    Mistake.objects.create(
+        attempt=attempt,
+        mistake_type=MistakeType.objects.first(),
+        short_label="Lost sign",
+        detailed_postmortem="Dropped a sign",
+        fix_plan="Check inversion distances",
+    )
+
+    hits = search(user, "inversion")
+    assert [h.kind for h in hits][:1] == ["problem"] and hits[0].object_id == circle.pk
+    assert {h.kind for h in hits} == {"problem", "mistake", "attempt"}
+    assert all(h.url for h in hits)
+    assert search(user, "radic")[0].snippet == "Used &lt;b&gt;<mark>radical</mark>&lt;/b&gt; axis"
+    assert search(user, 'inversion"*(') != []  # FTS syntax in user input is neutralized
+
+    circle.statement = "Nothing here"
+    circle.title = "Circle"
+    circle.save()
+    assert [h.title for h in search(user, "circumcircle")] == []
+    circle.delete()
+    assert SearchDocument.objects.filter(user=user, kind="problem").count() == 1
+    assert not SearchDocument.objects.filter(kind="mistake").exists()
+
+    client.login(username="alice", password="pass1234")
+    resp = client.get(reverse("search"), {"q": "sums"}, HTTP_HX_REQUEST="true")
+    assert b"Sums" in resp.content and b"<html" not in resp.content
+
+
+def test_markdownify_caches_rendered_html(monkeypatch):
+    markdown_extras._local_cache.clear()
+    text = "Intro\n\n\\begin{itemize}\n\\item one\n\\item two\n\\end{itemize}\n\n**bold**"
+    calls = []
+    real_render = markdown_extras.render_markdown
+    monkeypatch.setattr(markdown_extras, "render_markdown", lambda t: calls.append(t) or real_render(t))
+
+    html = markdown_extras.markdownify(text)
+    assert "<li>one</li>" in html and "<strong>bold</strong>" in html
+    assert markdown_extras.markdownify(text) == html
+    markdown_extras._local_cache.clear()
+    assert markdown_extras.markdownify(text) == html  # served from the shared cache
+    assert len(calls) == 1
+    assert markdown_extras.markdownify(text + " ") != "" and len(calls) == 2
+
+
+def test_batch_scheduler_matches_single_card_rules():
+    rng = random.Random(3)
+    eases = [rng.choice([0, 1.3, 2.5, round(rng.uniform(1.3, 3.5), 2)]) for _ in range(500)]
+    intervals = [rng.choice([0, 1, rng.randint(2, 300)]) for _ in range(500)]
+    ratings = [rng.randint(0, 3) for _ in range(500)]
+    expected = []
+    for ef, iv, q in zip(eases, intervals, ratings):
+        item = ReviewItem(ease_factor=ef, interval_days=iv)
+        expected.append(scheduler.grade_review(item, q))
+
+    fallback = scheduler.grade_batch(eases, intervals, ratings, use_numpy=False)
+    assert fallback.ease_factors == [s.ease_factor for s in expected]
+    assert fallback.interval_days == [s.interval_days for s in expected]
+    assert fallback.due_dates == [s.due_date for s in expected]
+    if scheduler.np is not None:
+        assert scheduler.grade_batch(eases, intervals, ratings, use_numpy=True) == fallback
+
+
+def test_bulk_reschedule_paths(user, django_capture_on_commit_callbacks):
+    today = date.today()
+    for days_overdue in (1, 5, 10, 20):
+        ReviewItem.objects.create(
+            user=user, prompt="p", answer_key="a", interval_days=3, due_date=today - timedelta(days=days_overdue)
+        )
+    assert due_review_count(user) == 4
+    with django_capture_on_commit_callbacks(execute=True):
+        assert spread_overdue(user, days=2) == 4
+        # The counter is dropped only once the outer transaction commits.
+        assert cache.get(due_count_key(user.pk)) == 4
+    tomorrow = today + timedelta(days=1)
+    assert sorted(ReviewItem.objects.values_list("due_date", flat=True)) == [today, today, tomorrow, tomorrow]
+    assert due_review_count(user) == 2
+
+    assert regrade_reviews(ReviewItem.objects.filter(user=user), ReviewItem.RATING_GOOD) == 4
+    item = ReviewItem.objects.first()
+    assert (item.ease_factor, item.interval_days, item.due_date) == (2.5, 8, today + timedelta(days=8))
+
+
+def test_review_forecast_bands_and_endpoint(client, user, monkeypatch, django_capture_on_commit_callbacks):
+    if scheduler.np is None:
+        pytest.skip("numpy is not installed")
+    # Always rating Again keeps every card on a one-day interval once it is due.
+    loads = simulate_load([2.5, 2.5, 2.5], [4, 4, 4], [-2, 0, 3], rating_probs=(1, 0, 0, 0), days=5, runs=3)
+    assert loads.tolist() == [[2, 2, 2, 3, 3]] * 3
+
+    today = date.today()
+    for offset in range(20):
+        ReviewItem.objects.create(
+            user=user, prompt="p", answer_key="a", interval_days=offset % 7, due_date=today + timedelta(days=offset)
+        )
+    forecast = forecast_reviews(user, days=14, runs=50, seed=1)
+    low, mid, high = (forecast.bands[p] for p in (10, 50, 90))
+    assert len(forecast.dates) == len(mid) == 14
+    assert all(a <= b <= c for a, b, c in zip(low, mid, high))
+    assert forecast.bands[50][0] >= 1
+
+    client.login(username="alice", password="pass1234")
+    data = client.get(reverse("review_forecast")).json()
+    assert data["dates"][0] == today.isoformat()
+    assert set(data["percentiles"]) == {"10", "50", "90"}
+
+    # Dashboard loads reuse the simulation until a grade bumps the dashboard version.
+    runs = []
+
+    def counted_simulate_load(*args, **kwargs):
+        runs.append(args)
+        return simulate_load(*args, **kwargs)
+
+    monkeypatch.setattr("core.forecast.simulate_load", counted_simulate_load)
+    assert client.get(reverse("review_forecast")).json() == data and not runs
+    with django_capture_on_commit_callbacks(execute=True):
+        ReviewItem.objects.filter(user=user).first().grade(ReviewItem.RATING_GOOD)
+    client.get(reverse("review_forecast"))
+    assert len(runs) == 1
+
+
+def test_grading_appends_review_log_with_user_parameters(user):
+    today = date.today()
+    item = ReviewItem.objects.create(
+        user=user, prompt="p", answer_key="a", interval_days=1, due_date=today - timedelta(days=2)
+    )
+    SchedulerProfile.objects.create(user=user, second_interval=4)
+    log = item.grade(ReviewItem.RATING_GOOD)
+    assert (log.previous_interval, log.interval_days, log.elapsed_days) == (1, 4, 3)
+    item.refresh_from_db()
+    assert item.due_date == today + timedelta(days=4)
+
+    regrade_reviews(ReviewItem.objects.filter(pk=item.pk), ReviewItem.RATING_AGAIN)
+    assert list(item.logs.order_by("pk").values_list("rating", "elapsed_days")) == [(2, 3), (0, 0)]
+
+
+def test_tune_scheduler_trades_load_for_equal_retention(user):
+    if scheduler.np is None:
+        pytest.skip("numpy is not installed")
+    rng = random.Random(5)
+    now = timezone.now()
+    logs = []
+    # Six-day second reviews are often forgotten while mature cards almost never are.
+    for n in range(200):
+        item = ReviewItem.objects.create(user=user, prompt=f"p{n}", answer_key="a")
+        steps = [(0, 2, 1, 0), (1, 2, 6, 1), (6, 2 if rng.random() < 0.7 else 0, 15, 6)]
+        if steps[-1][1]:
+            steps.append((15, 2 if rng.random() < 0.98 else 0, 38, 15))
+        for day, (previous, rating, interval, elapsed) in enumerate(steps):
+            logs.append(
+                ReviewLog(
+                    user=user,
+                    review_item=item,
+                    rating=rating,
+                    previous_ease=2.5,
+                    previous_interval=previous,
+                    ease_factor=2.5,
+                    interval_days=interval if rating else 1,
+                    elapsed_days=elapsed,
+                    reviewed_at=now - timedelta(days=60 - 3 * day),
+                )
+            )
+    ReviewLog.objects.bulk_create(logs)
+
+    result = fit_user(user)
+    fits = {fit.name: fit for fit in result.segments}
+    assert abs(fits["second"].predicted - fits["second"].actual) < 0.05
+    assert result.parameters.second_interval < 6
+    assert result.parameters.interval_modifier > 1
+    assert result.load_after < result.load_before
+    assert result.retention_after >= result.retention_before
+
+    out = io.StringIO()
+    call_command("tune_scheduler", user="alice", stdout=out)
+    assert "predicted" in out.getvalue()
+    assert SchedulerProfile.objects.get(user=user).second_interval == result.parameters.second_interval
+
+
+def test_review_session_serves_cards_without_card_queries(client, user, django_assert_max_num_queries):
+    today = date.today()
+    cards = [
+        ReviewItem.objects.create(user=user, prompt=f"card {n}", answer_key="a", due_date=today - timedelta(days=n))
+        for n in range(30)
+    ]
+    client.login(username="alice", password="pass1234")
+    page = client.get(reverse("review_session"))
+    assert "card 29" in page.content.decode()
+
+    order = sorted(cards, key=lambda c: (c.due_date, c.pk))
+    htmx = {"HTTP_HX_REQUEST": "true"}
+    # Session and user lookups plus the session write; nothing touches the cards table.
+    with django_assert_max_num_queries(5) as captured:
+        response = client.post(reverse("review_session_grade", args=[order[0].pk]), {"rating": 2}, **htmx)
+    assert "core_reviewitem" not in " ".join(q["sql"] for q in captured.captured_queries)
+    assert "card 28" in response.content.decode()
+    # A stale resubmit is ignored and the current card is served again.
+    stale = client.post(reverse("review_session_grade", args=[order[0].pk]), {"rating": 0}, **htmx)
+    assert "card 28" in stale.content.decode()
+
+    for card in order[1:25]:
+        client.post(reverse("review_session_grade", args=[card.pk]), {"rating": 2}, **htmx)
+    assert ReviewLog.objects.filter(user=user).count() == 25
+    assert ReviewItem.objects.filter(user=user, due_date__lte=today).count() == 5
+
+    client.post(reverse("review_session_grade", args=[order[25].pk]), {"rating": 0}, **htmx)
+    client.post(reverse("review_session_end"))
+    assert ReviewLog.objects.filter(user=user).count() == 26
+    assert ReviewItem.objects.get(pk=order[25].pk).due_date == today + timedelta(days=1)
+
+
+def test_review_session_flush_keeps_grades_and_uses_live_state(user, monkeypatch):
+    today = date.today()
+    first, second = (
+        ReviewItem.objects.create(user=user, prompt=f"card {n}", answer_key="a", due_date=today) for n in range(2)
+    )
+    session = ReviewSession(SimpleNamespace(session={}, user=user))
+    session.load()
+    assert session.grade(first.pk, ReviewItem.RATING_GOOD) and session.pending
+
+    def locked(*args, **kwargs):
+        raise OperationalError("database is locked")
+
+    monkeypatch.setattr(review_sessions, "apply_grades", locked)
+    with pytest.raises(OperationalError):
+        session.flush()
+    assert len(session.pending) == 1
+    monkeypatch.undo()
+
+    # Graded from the review queue after the batch was loaded: the session grade builds on that.
+    ReviewItem.objects.get(pk=first.pk).grade(ReviewItem.RATING_GOOD)
+    graded = ReviewItem.objects.get(pk=first.pk)
+    assert session.flush() == 1 and not session.pending
+    log = ReviewLog.objects.filter(review_item=first).latest("pk")
+    assert (log.previous_ease, log.previous_interval) == (graded.ease_factor, graded.interval_days)
+    assert ReviewLog.objects.filter(review_item=first).count() == 2
+
+
+def test_review_sync_pull_and_idempotent_push(client, user, other_user, monkeypatch):
+    today = date.today()
+    item = ReviewItem.objects.create(user=user, prompt="**Bold** prompt", answer_key="answer", due_date=today)
+    stale = ReviewItem.objects.create(user=user, prompt="stale", answer_key="a", due_date=today)
+    foreign = ReviewItem.objects.create(user=other_user, prompt="theirs", answer_key="a", due_date=today)
+    client.login(username="alice", password="pass1234")
+    url = reverse("sync_reviews")
+
+    payload = client.get(url).json()
+    cards = {c["id"]: c for c in payload["cards"]}
+    assert set(cards) == {item.pk, stale.pk}
+    assert "<strong>Bold</strong>" in cards[item.pk]["prompt_html"]
+    assert payload["scheduler"]["second_interval"] == 6
+
+    # The stale card is graded on the server after the download but before the offline grade.
+    reviewed_at = timezone.now().isoformat()
+    ReviewItem.objects.filter(pk=stale.pk).update(updated_at=timezone.now() + timedelta(seconds=5))
+    def grade(key, card, rating, base):
+        return {"key": key, "card": card.pk, "rating": rating, "reviewed_at": reviewed_at, "base_updated_at": base}
+
+    grades = [
+        grade("k1", item, 3, cards[item.pk]["updated_at"]),
+        grade("k2", stale, 0, cards[stale.pk]["updated_at"]),
+        grade("k3", foreign, 2, reviewed_at),
+    ]
+    body = client.post(url, json.dumps({"grades": grades}), content_type="application/json").json()
+    assert [r["status"] for r in body["results"]] == ["applied", "conflict", "missing"]
+    item.refresh_from_db()
+    assert (item.interval_days, item.due_date) == (3, today + timedelta(days=3))
+
+    replay = client.post(url, json.dumps({"grades": grades[:1]}), content_type="application/json").json()
+    assert replay["results"][0]["status"] == "duplicate"
+    assert ReviewLog.objects.filter(user=user).count() == 1
+
+    # A concurrent push commits "k1" after this one read its keys: the insert conflicts and is replayed.
+    real_seen_keys, reads = sync._seen_keys, []
+
+    def stale_seen_keys(*args):
+        reads.append(args)
+        return real_seen_keys(*args) if len(reads) > 1 else set()
+
+    monkeypatch.setattr(sync, "_seen_keys", stale_seen_keys)
+    racing = [grade("k1", item, 3, item.updated_at.isoformat())]
+    raced = client.post(url, json.dumps({"grades": racing}), content_type="application/json")
+    assert raced.status_code == 200 and raced.json()["results"][0]["status"] == "duplicate"
+    assert len(reads) == 2 and ReviewLog.objects.filter(user=user).count() == 1
+    item.refresh_from_db()
+    assert item.interval_days == 3
+
+    bad = client.post(url, json.dumps({"grades": [grade("x", item, 9, reviewed_at)]}), content_type="application/json")
+    assert bad.status_code == 400
+
+
+def test_request_metrics_middleware_flags_repeated_queries(client, user, caplog, rf, monkeypatch):
+    # The logger writes straight to its own handler; let caplog see it too.
+    monkeypatch.setattr(instrumentation.logger, "propagate", True)
+    instrumentation.registry.reset()
+    _seed_account(user, problems=6, attempts_per_problem=1)
+
+    def n_plus_one_view(request):
+        for problem in Problem.objects.all():
+            list(problem.attempts.all())
+        return HttpResponse("ok")
+
+    request = rf.get("/fake/")
+    with caplog.at_level("INFO", logger="core.requests"):
+        instrumentation.RequestMetricsMiddleware(n_plus_one_view)(request)
+    record = caplog.records[-1]
+    line = json.loads(record.getMessage())
+    assert record.levelname == "WARNING"
+    assert (line["view"], line["queries"], line["bytes"]) == ("<unresolved>", 7, 2)
+    assert line["n_plus_one"][0]["count"] == 6
+
+    hist = instrumentation.LatencyHistogram()
+    for ms in range(1, 101):
+        hist.observe(ms)
+    assert 45 <= hist.percentile(50) <= 55
+    assert 90 <= hist.percentile(95) <= 100
+
+    client.login(username="alice", password="pass1234")
+    client.get(reverse("dashboard"))
+    assert client.get(reverse("request_metrics")).status_code == 302
+    user.is_staff = True
+    user.save()
+    page = client.get(reverse("request_metrics"))
+    assert b"dashboard" in page.content
+
+
+def test_prometheus_metrics_endpoint(client, user, settings):
+    item = ReviewItem.objects.create(user=user, prompt="p", answer_key="a", due_date=date.today())
+    item.grade(2)
+    client.login(username="alice", password="pass1234")
+    client.get(reverse("dashboard"))
+
+    body = client.get(reverse("metrics")).content.decode()
+    assert 'oea_http_requests_total{method="GET",status="200",view="dashboard"}' in body
+    assert 'oea_reviews_graded_total{rating="good",source="single"}' in body
+    assert 'oea_cache_requests_total{cache="due_count",result="miss"}' in body
+
+    settings.METRICS_TOKEN = "s3cret"
+    assert client.get(reverse("metrics")).status_code == 401
+    assert client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret").status_code == 200
+
+    # Outside development, no token means staff only.
+    settings.METRICS_TOKEN, settings.METRICS_PUBLIC = "", False
+    assert client.get(reverse("metrics")).status_code == 401
+    user.is_staff = True
+    user.save()
+    assert client.get(reverse("metrics")).status_code == 200
+
+
+def test_management_commands_create_the_metrics_directory(tmp_path):
+    path = tmp_path / "prometheus"
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(path), DJANGO_SETTINGS_MODULE="config.settings.dev")
+    manage = Path(__file__).resolve().parent.parent / "manage.py"
+    run = subprocess.run([sys.executable, str(manage), "check"], env=env, capture_output=True)
+    assert run.returncode == 0, run.stderr.decode()
+    assert path.is_dir()
+
+
+def test_generate_synthetic_data_command(django_user_model):
+    out = io.StringIO()
+    call_command("generate_synthetic_data", users=2, rows=70, seed=3, stdout=out)
+    assert "Created 2 users" in out.getvalue()
+    user = django_user_model.objects.get(username="synth-0002")
+    assert not user.has_usable_password()
+    # 70 rows at the default shape: 10 problems, 20 attempts, 20 mistakes, 20 reviews.
+    assert Problem.objects.filter(created_by=user).count() == 10
+    assert Mistake.objects.filter(attempt__user=user).count() == 20
+    assert ReviewItem.objects.filter(user=user, related_mistake__isnull=False).count() == 20
+    assert Problem.objects.filter(created_by=user, tag_set__isnull=False).exists()
+    with pytest.raises(CommandError):
+        call_command("generate_synthetic_data", users=1, seed=3, stdout=out)
+
+
+def test_sqlite_pragmas_and_lock_retry(transactional_db, monkeypatch):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == 1  # NORMAL
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] == 5000
+
+    monkeypatch.setattr(sqlite, "SQLITE_RETRY_DELAY", 0)
+    calls = []
+
+    def flaky(name):
+        calls.append(name)
+        MistakeType.objects.create(name=f"{name}-{len(calls)}")
+        if len(calls) < 3:
+            raise OperationalError("database is locked")
+        return len(calls)
+
+    assert sqlite.run_with_retry(flaky, "T") == 3
+    # The first two attempts were rolled back with their transaction.
+    assert list(MistakeType.objects.filter(name__startswith="T-").values_list("name", flat=True)) == ["T-3"]
+    calls.clear()
+    with pytest.raises(OperationalError):
+        sqlite.run_with_retry(flaky, "U", attempts=1)
+
+
+def test_views_retry_only_their_writes(transactional_db, client, user, monkeypatch):
+    monkeypatch.setattr(sqlite, "SQLITE_RETRY_DELAY", 0)
+    client.force_login(user)
+
+    def locked_once(model):
+        save, calls = model.save, []
+
+        def flaky(self, *args, **kwargs):
+            calls.append(self.pk)
+            if len(calls) == 1:
+                raise OperationalError("database is locked")
+            return save(self, *args, **kwargs)
+
+        monkeypatch.setattr(model, "save", flaky)
+        return calls
+
+    # Forms are rendered after the write's transaction, not while holding the lock.
+    atomic = []
+
+    def render(*args, **kwargs):
+        atomic.append(connection.in_atomic_block)
+        return HttpResponse()
+
+    monkeypatch.setattr(views, "render", render)
+    client.get(reverse("import_data"))
+    client.post(reverse("problem_create"), {"title": ""})
+    assert atomic == [False, False]
+
+    # The upload is stored once, so the retried write still queues the whole file.
+    calls = locked_once(Job)
+    body = b'{"problems": [], "attempts": []}'
+    resp = client.post(reverse("import_data"), {"file": SimpleUploadedFile("backup.json", body)})
+    assert resp.url == reverse("job_list") and len(calls) == 2
+    assert Job.objects.get(user=user).input_file.read() == body
+
+    # A retried grade starts from the stored card, not the one graded in memory.
+    item = ReviewItem.objects.create(user=user, prompt="P", answer_key="A", due_date=date.today())
+    calls = locked_once(ReviewItem)
+    client.post(reverse("grade_review", args=[item.pk]), {"rating": ReviewItem.RATING_GOOD})
+    log = ReviewLog.objects.get(review_item=item)
+    item.refresh_from_db()
+    assert len(calls) == 2
+    assert (log.previous_interval, log.interval_days) == (0, item.interval_days)
+
+
+def test_views_over_asgi(user):
+    _seed_account(user)
+
+    async def fetch():
+        anonymous = await AsyncClient().get(reverse("review_queue"))
+        client = AsyncClient()
+        await client.aforce_login(user)
+        queue = await client.get(reverse("review_queue"))
+        export = await client.get(reverse("export_data"))
+        body = b"".join([chunk async for chunk in export.streaming_content])
+        return anonymous, queue, json.loads(body)
+
+    anonymous, queue, payload = async_to_sync(fetch)()
+    assert anonymous.status_code == 302 and anonymous.url.startswith(reverse("login"))
+    assert queue.context["queue_size"] == 6
+    assert len(payload["attempts"]) == 6
+    assert payload["reviews"][0]["related_problem"].startswith("P")
+
+
+def test_asgi_profile_keeps_middleware_async_and_serves_static(settings, tmp_path, caplog):
+    settings.MIDDLEWARE = [name for name in settings.MIDDLEWARE if name != WHITENOISE_MIDDLEWARE]
+    settings.STATIC_ROOT = tmp_path
+    settings.WHITENOISE_USE_FINDERS = True
+    caplog.set_level(logging.DEBUG, logger="django.request")
+    app = StaticFiles(ASGIHandler())
+    assert "adapted" not in caplog.text
+
+    async def get(path, headers=()):
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": b""}
+        scope["headers"] = [(b"host", b"testserver"), *headers]
+        communicator = ApplicationCommunicator(app, scope)
+        await communicator.send_input({"type": "http.request"})
+        start = await communicator.receive_output()
+        body = b""
+        while True:
+            message = await communicator.receive_output()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return start["status"], dict(start["headers"]), body
+
+    status, headers, body = async_to_sync(get)("/static/css/styles.css")
+    assert status == 200 and headers[b"content-type"].startswith(b"text/css") and body
+    assert async_to_sync(get)("/static/css/styles.css", [(b"if-none-match", headers[b"etag"])])[0] == 304
+    assert async_to_sync(get)("/static/missing.css")[0] == 404
+
+
+def test_export_and_import_run_as_background_jobs(client, user, other_user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    _seed_account(user)
+    client.login(username="alice", password="pass1234")
+    assert client.post(reverse("job_submit", args=["export"])).url == reverse("job_list")
+    export = Job.objects.get(user=user)
+    assert export.status == Job.STATUS_QUEUED
+    assert b"hx-trigger" in client.get(reverse("job_status", args=[export.pk])).content
+
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    export.refresh_from_db()
+    assert export.status == Job.STATUS_SUCCEEDED, export.error
+    assert export.percent == 100
+    assert export.result["rows"] == export.progress_total == 3 + 6 * 3 + MistakeType.objects.count()
+    status = client.get(reverse("job_status", args=[export.pk])).content
+    assert b"hx-trigger" not in status and b"Download" in status
+    body = b"".join(client.get(reverse("job_download", args=[export.pk])).streaming_content)
+    assert len(json.loads(body)["attempts"]) == 6
+
+    client.force_login(other_user)
+    assert client.get(reverse("job_download", args=[export.pk])).status_code == 404
+    resp = client.post(reverse("import_data"), {"file": SimpleUploadedFile("backup.json", body)})
+    assert resp.url == reverse("job_list")
+    client.post(reverse("import_data"), {"file": SimpleUploadedFile("broken.json", b"{not json")})
+    # Attempts ahead of their problems could not be matched up; the file is rejected before any write.
+    data = json.loads(body)
+    reordered = json.dumps({"attempts": data["attempts"], **data}).encode()
+    client.post(reverse("import_data"), {"file": SimpleUploadedFile("reordered.json", reordered)})
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    imported, broken, misordered = Job.objects.filter(user=other_user).order_by("pk")
+    assert imported.status == Job.STATUS_SUCCEEDED, imported.error
+    assert imported.result["counts"]["attempts"] == 6 and not imported.input_file
+    assert Attempt.objects.filter(user=other_user).count() == 6
+    assert broken.status == Job.STATUS_FAILED and broken.message.startswith("Invalid JSON file")
+    assert misordered.status == Job.STATUS_FAILED
+    assert misordered.message.startswith("The 'problems' section comes after 'attempts', which refers to it")
+    assert Problem.objects.filter(created_by=other_user).count() == 3
+    with pytest.raises(importing.ImportOrderError):
+        importing.import_rows(other_user, [("attempts", {}), ("problems", {"title": "Late"})])
+    assert not Problem.objects.filter(title="Late").exists()
+
+
+def test_stale_jobs_are_requeued_then_failed(user):
+    job = jobs.submit(user, Job.KIND_REBUILD_SEARCH)
+    assert jobs.claim("w1").pk == job.pk and jobs.claim("w2") is None
+    later = timezone.now() + timedelta(seconds=jobs.JOB_STALE_SECONDS + 1)
+    assert jobs.requeue_stale(later) == 1
+    for _ in range(jobs.JOB_MAX_ATTEMPTS - 1):
+        jobs.claim("w1")
+        jobs.requeue_stale(later)
+    job.refresh_from_db()
+    assert job.status == Job.STATUS_FAILED and job.attempts == jobs.JOB_MAX_ATTEMPTS
+
+
+def test_worker_survives_database_errors(user, monkeypatch, caplog):
+    job = jobs.submit(user, Job.KIND_REBUILD_SEARCH)
+    real_claim, real_save = jobs.claim, Job.save
+    failures = iter([OperationalError("disk I/O error")])
+
+    def flaky_claim(worker):
+        for exc in failures:
+            raise exc
+        return real_claim(worker)
+
+    def failing_save(self, *args, **kwargs):
+        if kwargs.get("update_fields"):
+            raise OperationalError("disk I/O error")
+        return real_save(self, *args, **kwargs)
+
+    monkeypatch.setattr(jobs, "claim", flaky_claim)
+    monkeypatch.setattr(Job, "save", failing_save)
+    assert jobs.work("w1", once=True, poll=0) == 1
+    assert "could not read the job queue" in caplog.text and "could not record the outcome" in caplog.text
+    # The outcome was lost, so the job looks like a dead worker's and is run again later.
+    job.refresh_from_db()
+    assert job.status == Job.STATUS_RUNNING
+
+
+def test_streaming_parser_matches_json_load(user):
+    _seed_account(user)
+    Problem.objects.filter(created_by=user).update(statement="Über \\(x^2\\) — \"quoted\", 12345")
+    body = b"".join(chunk.encode() for chunk in iter_export_json(user))
+    expected = json.loads(body)
+    # Tiny reads split numbers, strings and multi-byte characters across buffer refills.
+    events = list(iter_section_rows(io.BytesIO(body), read_size=7))
+    assert [row for section, row in events if section == "attempts"] == expected["attempts"]
+    assert len(events) == sum(len(rows) for rows in expected.values())
+    assert list(iter_section_rows(io.BytesIO(b'{"version": 2, "problems": []}'))) == []
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_section_rows(io.BytesIO(body[: len(body) // 2])))
+    # A malformed row is rejected once it outgrows the limit, not after buffering the rest of the file.
+    broken = io.BytesIO(b'{"problems": [{"title": "x" "' + b"y" * 100_000 + b'"}]}')
+    with pytest.raises(json.JSONDecodeError, match="No value ends within 4096"):
+        list(iter_section_rows(broken, read_size=1024, max_value_size=4096))
+    assert broken.tell() < 10_000
+
+
+def test_chunked_upload_and_resumable_import(client, user, other_user, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path
+    _seed_account(user)
+    body = b"".join(chunk.encode() for chunk in iter_export_json(user))
+    client.force_login(other_user)
+    start = client.post(
+        reverse("upload_start"), {"filename": "backup.json", "size": len(body)}, content_type="application/json"
+    )
+    assert start.status_code == 201
+    url = reverse("upload_detail", args=[start.json()["id"]])
+
+    def send(offset, data, checksum=None):
+        digest = checksum or hashlib.sha256(data).hexdigest()
+        return client.patch(
+            url,
+            data,
+            content_type="application/octet-stream",
+            headers={"Upload-Offset": str(offset), "Upload-Checksum": f"sha256 {digest}"},
+        )
+
+    half = len(body) // 2
+    assert send(0, body[:half], checksum="0" * 64).status_code == 400
+    assert client.get(url).json()["received"] == 0
+    assert send(0, body[:half]).json()["received"] == half
+    conflict = send(0, body[:half])
+    assert conflict.status_code == 409 and conflict.json()["received"] == half
+    job_id = send(half, body[half:]).json()["job"]
+
+    # Fail part-way through the mistakes; everything before them is already committed.
+    monkeypatch.setattr(importing, "IMPORT_BATCH_SIZE", 2)
+    write_mistakes = importing._Importer._mistakes
+    monkeypatch.setattr(importing._Importer, "_mistakes", lambda self, rows: 1 / 0)
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    job = Job.objects.get(pk=job_id)
+    assert job.status == Job.STATUS_FAILED and job.checkpoint["counts"]["attempts"] == 6
+    assert Attempt.objects.filter(user=other_user).count() == 6
+
+    monkeypatch.setattr(importing._Importer, "_mistakes", write_mistakes)
+    client.post(reverse("job_retry", args=[job.pk]))
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    job.refresh_from_db()
+    assert job.status == Job.STATUS_SUCCEEDED, job.error
+    assert job.result["resumed"] and job.result["counts"]["reviews"] == 6
+    assert Attempt.objects.filter(user=other_user).count() == 6
+    assert Mistake.objects.filter(attempt__user=other_user).count() == 6
+    assert not job.import_keys.exists() and not job.input_file
+
+
+def test_upload_chunks_are_claimed_before_writing_and_pruned(user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    upload = uploads.start_upload(user, "backup.json", 8)
+    digest = hashlib.sha256(b"abcd").hexdigest()
+
+    # Another request holds the chunk at offset 0: nothing is written until its claim lapses.
+    Upload.objects.filter(pk=upload.pk).update(writing_since=timezone.now())
+    with pytest.raises(uploads.OffsetMismatch):
+        uploads.append_chunk(upload, 0, io.BytesIO(b"abcd"), 4, digest)
+    assert upload.file.size == 0
+    lapsed = timezone.now() - timedelta(seconds=uploads.UPLOAD_WRITE_TIMEOUT + 1)
+    Upload.objects.filter(pk=upload.pk).update(writing_since=lapsed)
+    uploads.append_chunk(upload, 0, io.BytesIO(b"abcd"), 4, digest)
+    upload.refresh_from_db()
+    assert (upload.received, upload.writing_since) == (4, None)
+    with pytest.raises(uploads.UploadError):
+        uploads.append_chunk(upload, 4, io.BytesIO(b"efgh"), 4, digest)
+    upload.refresh_from_db()
+    assert (upload.received, upload.writing_since) == (4, None)
+
+    finished = uploads.start_upload(user, "done.json", 4)
+    uploads.append_chunk(finished, 0, io.BytesIO(b"abcd"), 4, digest)
+    job = uploads.finish_upload(finished)
+    out = io.StringIO()
+    call_command("prune_uploads", stdout=out)
+    assert "Pruned 0 uploads" in out.getvalue()
+    Upload.objects.update(updated_at=timezone.now() - timedelta(hours=uploads.UPLOAD_EXPIRY_HOURS + 1))
+    call_command("prune_uploads", stdout=out)
+    assert "Pruned 2 uploads" in out.getvalue() and not Upload.objects.exists()
+    # The abandoned file is gone; the one the import job took over is kept.
+    assert not (tmp_path / upload.file.name).exists()
+    assert (tmp_path / job.input_file.name).exists()
+
+
+def test_delta_export_and_idempotent_apply(client, user, other_user, settings, tmp_path, monkeypatch):
+    settings.MEDIA_ROOT = tmp_path
+    monkeypatch.setattr(delta, "DELTA_OVERLAP_SECONDS", 0)
+    _seed_account(user)
+    client.login(username="alice", password="pass1234")
+    assert client.get(reverse("export_data"), {"since": "not-a-cursor"}).status_code == 400
+
+    resp = client.get(reverse("export_data"), {"since": ""})
+    assert resp["Content-Type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in b"".join(resp.streaming_content).splitlines()]
+    assert lines[0]["format"] == "oea-delta" and lines[0]["cursor"] == resp["X-Delta-Cursor"]
+    assert [line["kind"] for line in lines[1:]] == ["problem"] * 3 + ["attempt"] * 6 + ["mistake"] * 6 + ["review"] * 6
+    for _ in range(2):
+        delta.apply_delta(other_user, lines)
+        assert Problem.objects.filter(created_by=other_user).count() == 3
+        assert Mistake.objects.filter(attempt__user=other_user).count() == 6
+        assert ReviewItem.objects.filter(user=other_user, related_mistake__attempt__user=other_user).count() == 6
+
+    problem = Problem.objects.filter(created_by=user).first()
+    problem.title = "Renamed"
+    problem.save()
+    Mistake.objects.filter(attempt__user=user).first().delete()
+    resp = client.get(reverse("export_data"), {"since": resp["X-Delta-Cursor"]})
+    body = b"".join(resp.streaming_content)
+    changes = [json.loads(line) for line in body.splitlines()[1:]]
+    assert [(line["kind"], line["op"]) for line in changes] == [("problem", "upsert"), ("mistake", "delete")]
+
+    client.force_login(other_user)
+    client.post(reverse("import_data"), {"file": SimpleUploadedFile("delta.ndjson", body)})
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    job = Job.objects.get(user=other_user)
+    assert job.status == Job.STATUS_SUCCEEDED and job.result["delta"], job.error
+    assert Problem.objects.filter(created_by=other_user, title="Renamed").count() == 1
+    assert Mistake.objects.filter(attempt__user=other_user).count() == 5
+    assert MistakeRollup.objects.filter(user=other_user).aggregate(n=Sum("total"))["n"] == 5
+
+
+@pytest.mark.parametrize("compression", columnar.available_compressions())
+def test_columnar_export_round_trips_through_import(
+    client, user, other_user, settings, tmp_path, monkeypatch, compression
+):
+    settings.MEDIA_ROOT = tmp_path
+    monkeypatch.setattr(columnar, "COLUMNAR_BLOCK_ROWS", 2)
+    _seed_account(user)
+    client.login(username="alice", password="pass1234")
+    resp = client.get(reverse("export_data"), {"format": "columnar", "compression": compression})
+    assert resp["Content-Type"] == columnar.COMPRESSIONS[compression][0]
+    body = b"".join(resp.streaming_content)
+    assert client.get(reverse("export_data"), {"format": "columnar", "compression": "lz4"}).status_code == 400
+
+    rows = list(columnar.iter_columnar_rows(io.BytesIO(body)))
+    expected = list(iter_section_rows(io.BytesIO(b"".join(c.encode() for c in iter_export_json(user)))))
+    assert [section for section, _ in rows] == [section for section, _ in expected]
+    assert rows[0][1]["topic"] == "NT" and rows[0][1]["created_at"][:19] == expected[0][1]["created_at"][:19]
+
+    client.force_login(other_user)
+    # A truncated file is rejected before any of its rows are committed.
+    client.post(reverse("import_data"), {"file": SimpleUploadedFile("broken.oea", body[: len(body) * 7 // 10])})
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    broken = Job.objects.get(user=other_user)
+    assert broken.status == Job.STATUS_FAILED and "truncated" in broken.message
+    assert not Problem.objects.filter(created_by=other_user).exists()
+
+    client.post(reverse("import_data"), {"file": SimpleUploadedFile("backup.oea", body)})
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    imported = Job.objects.filter(user=other_user).latest("pk")
+    assert imported.status == Job.STATUS_SUCCEEDED, imported.error
+    assert Mistake.objects.filter(attempt__user=other_user).count() == 6
+
+
+def test_columnar_export_job_downloads_compressed_file(client, user, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    _seed_account(user)
+    client.login(username="alice", password="pass1234")
+    client.post(reverse("job_submit", args=["export"]), {"format": "columnar"})
+    call_command("run_workers", processes=1, once=True, stdout=io.StringIO())
+    job = Job.objects.get(user=user)
+    assert job.status == Job.STATUS_SUCCEEDED, job.error
+    resp = client.get(reverse("job_download", args=[job.pk]))
+    content_type, extension = columnar.COMPRESSIONS[columnar.EXPORT_COMPRESSION]
+    assert resp["Content-Type"] == content_type
+    assert f'filename="olympiad_error_atlas.oea.{extension}"' in resp["Content-Disposition"]
+    rows = list(columnar.iter_columnar_rows(io.BytesIO(b"".join(resp.streaming_content))))
+    assert sum(section == "attempts" for section, _ in rows) == 6
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import ReviewLog, SchedulerProfile
+from .scheduler import SchedulerParameters, np
+
+TUNING_WINDOW_DAYS = 365
+MIN_SEGMENT_REVIEWS = 20
+# Interval rules whose outcome is measured; lapses always relearn after one day.
+SEGMENTS = ("first_good", "first_easy", "second", "mature")
+FIRST_GOOD, FIRST_EASY, SECOND, MATURE = range(len(SEGMENTS))
+# Integer intervals may move between half and three times their current value.
+MIN_SCALE, MAX_SCALE = 0.5, 3.0
+MODIFIER_STEP = 0.05
+
+
+@dataclass
+class SegmentFit:
+    name: str
+    reviews: int
+    retention: float
+    predicted: float
+    actual: float
+    scale: float = 1.0
+
+
+@dataclass
+class TuningResult:
+    parameters: SchedulerParameters
+    reviews: int
+    days: int
+    segments: list[SegmentFit]
+    retention_before: float
+    retention_after: float
+    load_before: float
+    load_after: float
+
+
+def _log_arrays(user_id: int, since):
+    rows = list(
+        ReviewLog.objects.filter(user_id=user_id, reviewed_at__gte=since, review_item__isnull=False)
+        .order_by("reviewed_at", "pk")
+        .values_list("review_item_id", "rating", "previous_interval", "interval_days", "elapsed_days", "reviewed_at")
+    )
+    if not rows:
+        return None, 0
+    days = max(1, (rows[-1][5] - rows[0][5]).days + 1)
+    data = np.array([row[:5] for row in rows], dtype=np.int64)
+    # Group each card's grades together while keeping them in time order.
+    data = data[np.argsort(data[:, 0], kind="stable")]
+    return data, days
+
+
+def _transitions(data):
+    """
+    Pair every grade with the card's next grade.
+
+    Returns ``(segment, delay, recalled)`` where ``segment`` is the interval
+    rule that scheduled the next grade, ``delay`` is elapsed / scheduled days
+    and ``recalled`` says whether that next grade was anything but Again.
+    """
+    item, rating, previous, scheduled, elapsed = data.T
+    same = item[1:] == item[:-1]
+    segment = np.full(len(item) - 1, -1, dtype=np.int64)
+    first = previous[:-1] <= 0
+    segment[first & (rating[:-1] == 2)] = FIRST_GOOD
+    segment[first & (rating[:-1] == 3)] = FIRST_EASY
+    segment[previous[:-1] == 1] = SECOND
+    segment[previous[:-1] > 1] = MATURE
+    segment[rating[:-1] < 2] = -1
+    keep = same & (segment >= 0) & (scheduled[:-1] > 0)
+    delay = np.maximum(elapsed[1:][keep] / scheduled[:-1][keep], 0.05)
+    return segment[keep], delay, rating[1:][keep] >= 1
+
+
+def _fit_retention(segment, delay, recalled):
+    """
+    Maximum-likelihood on-time recall per segment under ``p = theta ** delay``.
+
+    Recalled grades contribute ``delay * log(theta)``, so only the lapses
+    need a (grid x lapses) matrix.
+    """
+    grid = np.linspace(0.5, 0.995, 100)
+    log_grid = np.log(grid)
+    fitted = np.full(len(SEGMENTS), np.nan)
+    for k in range(len(SEGMENTS)):
+        mine = segment == k
+        if not mine.any():
+            continue
+        held = delay[mine & recalled].sum()
+        lapsed = delay[mine & ~recalled]
+        forgot = np.log1p(-np.minimum(grid[:, None] ** lapsed[None, :], 1 - 1e-9)).sum(axis=1)
+        fitted[k] = grid[np.argmax(log_grid * held + forgot)]
+    return fitted
+
+
+def _candidate_scales(k: int, params: SchedulerParameters):
+    if k == MATURE:
+        current = params.interval_modifier
+        modifiers = np.round(np.arange(MIN_SCALE, MAX_SCALE + 1e-9, MODIFIER_STEP) * current, 2)
+        return modifiers / current
+    current = (params.first_good_interval, params.first_easy_interval, params.second_interval)[k]
+    days = np.arange(max(1, int(np.ceil(current * MIN_SCALE))), int(round(current * MAX_SCALE)) + 1)
+    return days / current
+
+
+def _optimise(segment, delay, retention, counts, params):
+    """
+    Pick one interval scale per segment that minimises review load.
+
+    Load is the review rate (a segment stretched by ``m`` is reviewed ``1/m``
+    as often) and the scales must predict at least today's retention. Both
+    add up over segments, so instead of scoring the product of all candidate
+    scales the segments are folded in one at a time, keeping only the
+    combinations no other one beats on both load and retention.
+    """
+    options = []
+    for k in range(len(SEGMENTS)):
+        mine = delay[segment == k]
+        if counts[k] < MIN_SEGMENT_REVIEWS:
+            # Too little evidence to move this rule; it keeps its current interval.
+            options.append((np.ones(1), np.array([(retention[k] ** mine).mean() if mine.size else 0.0])))
+            continue
+        scales = _candidate_scales(k, params)
+        predicted = (retention[k] ** (scales[:, None] * mine[None, :])).mean(axis=1)
+        options.append((scales, predicted))
+
+    # Retention is averaged per card passing through a segment, not per
+    # review, so stretching a weak segment cannot hide its lapses.
+    current = [int(np.argmin(np.abs(scales - 1.0))) for scales, _ in options]
+    load_before = sum(counts[k] / options[k][0][c] for k, c in enumerate(current))
+    kept_before = sum(counts[k] * options[k][1][c] for k, c in enumerate(current)) / counts.sum()
+
+    load, kept, picks = np.zeros(1), np.zeros(1), np.zeros((1, 0), dtype=np.int64)
+    for k, (scales, predicted) in enumerate(options):
+        load = (load[:, None] + counts[k] / scales[None, :]).ravel()
+        kept = (kept[:, None] + counts[k] * predicted[None, :] / counts.sum()).ravel()
+        picks = np.hstack([np.repeat(picks, len(scales), axis=0), np.tile(np.arange(len(scales)), len(picks))[:, None]])
+        # By load, ties to the higher retention; keep rows that retain more than every cheaper one.
+        order = np.lexsort((-kept, load))
+        load, kept, picks = load[order], kept[order], picks[order]
+        front = np.concatenate(([True], kept[1:] > np.maximum.accumulate(kept)[:-1]))
+        load, kept, picks = load[front], kept[front], picks[front]
+    # The front is cheapest first, so the first row that keeps today's retention wins.
+    best = int(np.argmax(kept >= kept_before - 1e-9))
+    scale = np.array([options[k][0][c] for k, c in enumerate(picks[best])])
+    return scale, float(kept_before), float(kept[best]), float(load_before), float(load[best])
+
+
+def fit_user(user, days: int = TUNING_WINDOW_DAYS, params: SchedulerParameters | None = None) -> TuningResult | None:
+    """Fit ``user``'s interval rules to the last ``days`` days of grades, or ``None`` without history."""
+    if np is None:
+        raise RuntimeError("Scheduler tuning requires numpy.")
+    params = params or SchedulerProfile.parameters_for(user.pk)
+    data, span = _log_arrays(user.pk, timezone.now() - timedelta(days=days))
+    if data is None or len(data) < 2:
+        return None
+    segment, delay, recalled = _transitions(data)
+    if not segment.size:
+        return None
+    counts = np.bincount(segment, minlength=len(SEGMENTS)).astype(np.float64)
+    retention = _fit_retention(segment, delay, recalled)
+    scales, before, after, load_before, load_after = _optimise(segment, delay, retention, counts, params)
+
+    fits = []
+    for k, name in enumerate(SEGMENTS):
+        mine = segment == k
+        if not mine.any():
+            fits.append(SegmentFit(name, 0, float("nan"), float("nan"), float("nan")))
+            continue
+        fits.append(
+            SegmentFit(
+                name=name,
+                reviews=int(mine.sum()),
+                retention=float(retention[k]),
+                predicted=float((retention[k] ** delay[mine]).mean()),
+                actual=float(recalled[mine].mean()),
+                scale=float(scales[k]),
+            )
+        )
+
+    tuned = SchedulerParameters(
+        first_good_interval=int(round(params.first_good_interval * scales[FIRST_GOOD])),
+        first_easy_interval=int(round(params.first_easy_interval * scales[FIRST_EASY])),
+        second_interval=int(round(params.second_interval * scales[SECOND])),
+        interval_modifier=round(params.interval_modifier * float(scales[MATURE]), 2),
+    )
+    # Grades outside the tuned segments (new cards, lapses) keep their cadence.
+    untouched = len(data) - counts.sum()
+    return TuningResult(
+        parameters=tuned,
+        reviews=len(data),
+        days=span,
+        segments=fits,
+        retention_before=before,
+        retention_after=after,
+        load_before=(untouched + load_before) / span,
+        load_after=(untouched + load_after) / span,
+    )
+
+
+def save_profile(user, result: TuningResult) -> SchedulerProfile:
+    params = result.parameters
+    profile, _ = SchedulerProfile.objects.update_or_create(
+        user=user,
+        defaults={
+            "first_good_interval": params.first_good_interval,
+            "first_easy_interval": params.first_easy_interval,
+            "second_interval": params.second_interval,
+            "interval_modifier": params.interval_modifier,
+            "target_retention": round(result.retention_before, 4),
+            "reviews_fitted": result.reviews,
+        },
+    )
+    return profile
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job, Upload
+from .sqlite import run_with_retry
+
+# Clients are told to send chunks of this size; anything up to UPLOAD_MAX_CHUNK_BYTES is accepted.
+UPLOAD_CHUNK_SIZE = getattr(settings, "UPLOAD_CHUNK_SIZE", 2 * 1024 * 1024)
+UPLOAD_MAX_CHUNK_BYTES = getattr(settings, "UPLOAD_MAX_CHUNK_BYTES", 16 * 1024 * 1024)
+UPLOAD_MAX_BYTES = getattr(settings, "UPLOAD_MAX_BYTES", 2 * 1024**3)
+# A chunk write that has not finished in this long is assumed dead and its claim lapses.
+UPLOAD_WRITE_TIMEOUT = getattr(settings, "UPLOAD_WRITE_TIMEOUT", 10 * 60)
+# Uploads idle for this long are deleted by ``prune_uploads``, with their file unless a job took it over.
+UPLOAD_EXPIRY_HOURS = getattr(settings, "UPLOAD_EXPIRY_HOURS", 48)
+_COPY_SIZE = 64 * 1024
+
+
+class UploadError(ValueError):
+    """A chunk or upload request that cannot be accepted."""
+
+
+class OffsetMismatch(UploadError):
+    """The chunk does not start where the stored data ends; the client should resume from ``received``."""
+
+
+def _sha256(value: str) -> str:
+    value = (value or "").strip().lower()
+    if value.startswith("sha256 "):
+        value = value[len("sha256 ") :].strip()
+    if value and (len(value) != 64 or any(c not in "0123456789abcdef" for c in value)):
+        raise UploadError("Checksums must be hex SHA-256 digests.")
+    return value
+
+
+def start_upload(user, filename: str, size, sha256: str = "") -> Upload:
+    """Reserve an empty file that chunks are appended to; ``sha256`` of the whole file is optional."""
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("size must be an integer.") from None
+    if not 0 < size <= UPLOAD_MAX_BYTES:
+        raise UploadError(f"size must be between 1 and {UPLOAD_MAX_BYTES} bytes.")
+    upload = Upload(user=user, filename=str(filename or "upload.json")[:255], size=size, sha256=_sha256(sha256))
+    # The client's file name is only shown back to it; the stored name is ours.
+    upload.file.save("import.json", ContentFile(b""), save=False)
+    run_with_retry(upload.save)
+    return upload
+
+
+def append_chunk(upload: Upload, offset, stream, length, checksum: str) -> Upload:
+    """
+    Write ``length`` bytes read from ``stream`` at ``offset`` and advance ``received``.
+
+    The chunk is copied in small pieces while it is hashed, so memory does
+    not grow with the chunk size. When the digest differs from ``checksum``
+    (or the body is cut short) the file is truncated back to the last good
+    byte and the client can send the same chunk again. Before any byte is
+    written the request claims the upload at ``offset`` (``writing_since``),
+    so two requests for the same chunk never write the file at once.
+    """
+    try:
+        offset, length = int(offset), int(length)
+    except (TypeError, ValueError):
+        raise UploadError("Upload-Offset and Content-Length must be integers.") from None
+    checksum = _sha256(checksum)
+    if not checksum:
+        raise UploadError("Every chunk needs an Upload-Checksum: sha256 <hex digest> header.")
+    if upload.job_id is not None or offset != upload.received:
+        raise OffsetMismatch(f"Expected offset {upload.received}.")
+    if not 0 < length <= UPLOAD_MAX_CHUNK_BYTES or offset + length > upload.size:
+        raise UploadError(f"Chunks must be 1 to {UPLOAD_MAX_CHUNK_BYTES} bytes and end within the file.")
+
+    # Only one request may write from ``offset``; a claim left by a dead request lapses.
+    now = timezone.now()
+    lapsed = Q(writing_since=None) | Q(writing_since__lt=now - timedelta(seconds=UPLOAD_WRITE_TIMEOUT))
+    claim = Upload.objects.filter(pk=upload.pk, received=offset, job=None)
+    if not run_with_retry(lambda: claim.filter(lapsed).update(writing_since=now, updated_at=now)):
+        raise OffsetMismatch("Another request is writing or already wrote this chunk.")
+
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(upload.file.path, "r+b") as out:
+            out.seek(offset)
+            while written < length:
+                data = stream.read(min(_COPY_SIZE, length - written))
+                if not data:
+                    break
+                out.write(data)
+                digest.update(data)
+                written += len(data)
+            if written != length or digest.hexdigest() != checksum:
+                out.truncate(offset)
+                raise UploadError("Chunk checksum mismatch; send it again.")
+    except BaseException:
+        run_with_retry(lambda: claim.filter(writing_since=now).update(writing_since=None))
+        raise
+
+    advanced = run_with_retry(
+        lambda: claim.filter(writing_since=now).update(
+            received=offset + length, writing_since=None, updated_at=timezone.now()
+        )
+    )
+    if not advanced:
+        # The claim lapsed mid-write and another request took over this chunk.
+        raise OffsetMismatch("The chunk took too long to write; send it again.")
+    upload.received = offset + length
+    return upload
+
+
+def finish_upload(upload: Upload) -> Job:
+    """Check the whole-file digest, if one was given, and queue the import job."""
+    if not upload.is_complete:
+        raise UploadError(f"Only {upload.received} of {upload.size} bytes have been received.")
+    if upload.sha256:
+        digest = hashlib.sha256()
+        with open(upload.file.path, "rb") as data:
+            for block in iter(lambda: data.read(_COPY_SIZE), b""):
+                digest.update(block)
+        if digest.hexdigest() != upload.sha256:
+            Upload.objects.filter(pk=upload.pk).update(received=0)
+            with open(upload.file.path, "r+b") as out:
+                out.truncate(0)
+            raise UploadError("File checksum mismatch; the upload has been reset.")
+
+    def queue() -> Job:
+        job = Job(user=upload.user, kind=Job.KIND_IMPORT, params={"upload": upload.pk})
+        # The job takes over the uploaded file instead of copying it.
+        job.input_file.name = upload.file.name
+        job.save()
+        Upload.objects.filter(pk=upload.pk).update(job=job)
+        return job
+
+    upload.job = run_with_retry(queue)
+    return upload.job
+
+
+def prune_uploads(hours: int | None = None) -> int:
+    """Delete uploads idle for ``hours``; files not taken over by an import job go with them."""
+    cutoff = timezone.now() - timedelta(hours=UPLOAD_EXPIRY_HOURS if hours is None else hours)
+    stale = Upload.objects.filter(updated_at__lt=cutoff)
+    for upload in stale.filter(job=None).exclude(file=""):
+        upload.file.delete(save=False)
+    deleted, _ = stale.delete()
+    return deleted
+
+
+def upload_state(upload: Upload) -> dict:
+    return {
+        "id": upload.pk,
+        "filename": upload.filename,
+        "size": upload.size,
+        "received": upload.received,
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+        "job": upload.job_id,
+    }
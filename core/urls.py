@@ -19,8 +19,24 @@ urlpatterns = [
         name="add_mistake",
     ),
     path("mistakes/analytics/", views.mistake_analytics, name="mistake_analytics"),
+    path("search/", views.search, name="search"),
     path("reviews/", views.review_queue, name="review_queue"),
+    path("reviews/session/", views.review_session, name="review_session"),
+    path("reviews/session/<int:pk>/grade/", views.review_session_grade, name="review_session_grade"),
+    path("reviews/session/end/", views.review_session_end, name="review_session_end"),
+    path("reviews/offline/", views.review_offline, name="review_offline"),
+    path("api/reviews/sync/", views.sync_reviews, name="sync_reviews"),
+    path("reviews/forecast/", views.review_forecast, name="review_forecast"),
     path("reviews/<int:pk>/grade/", views.grade_review, name="grade_review"),
+    path("ops/requests/", views.request_metrics, name="request_metrics"),
+    path("metrics", views.metrics, name="metrics"),
     path("export/", views.export_data, name="export_data"),
     path("import/", views.import_data, name="import_data"),
+    path("import/uploads/", views.upload_start, name="upload_start"),
+    path("import/uploads/<int:pk>/", views.upload_detail, name="upload_detail"),
+    path("jobs/", views.job_list, name="job_list"),
+    path("jobs/submit/<str:kind>/", views.job_submit, name="job_submit"),
+    path("jobs/<int:pk>/", views.job_status, name="job_status"),
+    path("jobs/<int:pk>/retry/", views.job_retry, name="job_retry"),
+    path("jobs/<int:pk>/download/", views.job_download, name="job_download"),
 ]
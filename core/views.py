@@ -1,28 +1,56 @@
 from __future__ import annotations
 
 import json
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
+from hmac import compare_digest
+from itertools import islice
 
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.db import models
-from django.db.models import Count
-from django.http import HttpResponse, HttpResponseBadRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Q, Sum
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from . import jobs, uploads
+from . import metrics as prometheus
+from .caching import DASHBOARD_FRAGMENT_TIMEOUT, dashboard_version, due_review_count
+from .columnar import COMPRESSIONS, EXPORT_COMPRESSION, available_compressions, iter_export_columnar
+from .delta import DeltaError, delta_export
+from .exporting import iter_export_json
 from .filters import ProblemFilter
+from .forecast import dashboard_forecast
 from .forms import (
     AttemptForm,
     ImportForm,
     MistakeForm,
     ProblemForm,
     RegisterForm,
+    RescheduleForm,
     ReviewGradeForm,
 )
-from .models import Attempt, Mistake, MistakeType, Problem, ReviewItem, TOPIC_CHOICES
+from .instrumentation import registry as request_stats
+from .models import Attempt, Job, MistakeRollup, Problem, ReviewItem, TOPIC_LABELS, Upload
+from .pagination import keyset_page, next_page_url
+from .review_sessions import ReviewSession
+from .search import search as search_documents
+from .sqlite import run_with_retry
+from .sync import SyncError, pull, push
+
 
 
 def landing(request):
@@ -36,7 +64,7 @@ def register(request):
         return redirect("dashboard")
     form = RegisterForm(request.POST or None)
     if request.method == "POST" and form.is_valid():
-        user = form.save()
+        user = run_with_retry(form.save)
         login(request, user)
         messages.success(request, "Welcome to Olympiad Error Atlas!")
         return redirect("dashboard")
@@ -45,34 +73,47 @@ def register(request):
 
 @login_required
 def dashboard(request):
+    user = request.user
     today = date.today()
-    last_30 = timezone.now() - timedelta(days=30)
-    last_7 = timezone.now() - timedelta(days=7)
-    attempts = Attempt.objects.filter(user=request.user, started_at__gte=last_30)
-    due_reviews = ReviewItem.objects.filter(user=request.user, due_date__lte=today)
-
-    top_mistakes = (
-        Mistake.objects.filter(attempt__user=request.user)
-        .values("mistake_type__name")
-        .annotate(total=Count("id"))
-        .order_by("-total")[:5]
+    now = timezone.now()
+    counts = Attempt.objects.filter(user=user).aggregate(
+        last7=Count("pk", filter=Q(started_at__gte=now - timedelta(days=7))),
+        last30=Count("pk", filter=Q(started_at__gte=now - timedelta(days=30))),
     )
-
-    topic_counts = (
-        Attempt.objects.filter(user=request.user)
-        .values("problem__topic")
-        .annotate(total=Count("id"))
-        .order_by()
+    recent_attempts = list(
+        Attempt.objects.filter(user=user, started_at__gte=now - timedelta(days=30)).select_related("problem")[:5]
     )
 
+    # The panels below are only queried on a fragment cache miss.
+    def due_preview():
+        return ReviewItem.objects.filter(user=user, due_date__lte=today)[:6]
+
+    def top_mistakes():
+        return list(
+            MistakeRollup.objects.filter(user=user)
+            .values("mistake_type__name")
+            .annotate(total=Sum("total"))
+            .order_by("-total")[:5]
+        )
+
+    def topic_chart():
+        topic_counts = Attempt.objects.filter(user=user).values("problem__topic").annotate(total=Count("id")).order_by()
+        return {
+            "labels": [TOPIC_LABELS.get(i["problem__topic"], i["problem__topic"]) for i in topic_counts],
+            "data": [i["total"] for i in topic_counts],
+        }
+
     context = {
-        "due_reviews": due_reviews,
-        "attempts_last7": attempts.filter(started_at__gte=last_7).count(),
-        "attempts_last30": attempts.count(),
+        "due_count": due_review_count(user),
+        "attempts_last7": counts["last7"],
+        "attempts_last30": counts["last30"],
+        "recent_attempts": recent_attempts,
+        "due_preview": due_preview,
         "top_mistakes": top_mistakes,
-        "topic_labels": [dict(TOPIC_CHOICES).get(i["problem__topic"], i["problem__topic"]) for i in topic_counts],
-        "topic_data": [i["total"] for i in topic_counts],
-        "recent_attempts": attempts.select_related("problem")[:5],
+        "topic_chart": topic_chart,
+        "today": today,
+        "dashboard_version": dashboard_version(user.pk),
+        "fragment_timeout": DASHBOARD_FRAGMENT_TIMEOUT,
     }
     return render(request, "dashboard.html", context)
 
@@ -81,12 +122,15 @@ def dashboard(request):
 def problem_list(request):
     qs = Problem.objects.filter(created_by=request.user)
     problem_filter = ProblemFilter(request.GET, queryset=qs)
+    page = keyset_page(problem_filter.qs, "created_at", request.GET.get("cursor"))
+    template = "problems/_rows.html" if request.headers.get("HX-Request") else "problems/list.html"
     return render(
         request,
-        "problems/list.html",
+        template,
         {
             "filter": problem_filter,
-            "problems": problem_filter.qs,
+            "problems": page.rows,
+            "next_url": next_page_url(request, page),
             "selected_topics": request.GET.getlist("topic"),
         },
     )
@@ -98,7 +142,7 @@ def problem_create(request):
     if request.method == "POST" and form.is_valid():
         problem = form.save(commit=False)
         problem.created_by = request.user
-        problem.save()
+        run_with_retry(problem.save)
         messages.success(request, "Problem created.")
         return redirect("problem_detail", pk=problem.pk)
     return render(request, "problems/form.html", {"form": form, "title": "Create Problem"})
@@ -116,7 +160,7 @@ def problem_edit(request, pk):
     problem = get_object_or_404(Problem, pk=pk, created_by=request.user)
     form = ProblemForm(request.POST or None, instance=problem)
     if request.method == "POST" and form.is_valid():
-        form.save()
+        run_with_retry(form.save)
         messages.success(request, "Problem updated.")
         return redirect("problem_detail", pk=pk)
     return render(request, "problems/form.html", {"form": form, "title": "Edit Problem"})
@@ -124,14 +168,20 @@ def problem_edit(request, pk):
 
 @login_required
 def attempt_list(request):
-    attempts = Attempt.objects.filter(user=request.user).select_related("problem")
-    return render(request, "attempts/list.html", {"attempts": attempts})
+    attempts = (
+        Attempt.objects.filter(user=request.user)
+        .select_related("problem")
+        .annotate(mistake_count=Count("mistakes"))
+    )
+    page = keyset_page(attempts, "started_at", request.GET.get("cursor"))
+    template = "attempts/_rows.html" if request.headers.get("HX-Request") else "attempts/list.html"
+    return render(request, template, {"attempts": page.rows, "next_url": next_page_url(request, page)})
 
 
 @login_required
 def start_attempt(request, problem_id):
     problem = get_object_or_404(Problem, pk=problem_id, created_by=request.user)
-    attempt = Attempt.objects.create(problem=problem, user=request.user, started_at=timezone.now())
+    attempt = run_with_retry(Attempt.objects.create, problem=problem, user=request.user, started_at=timezone.now())
     messages.info(request, "Attempt started. Finish when you are done.")
     return redirect("finish_attempt", pk=attempt.pk)
 
@@ -143,7 +193,7 @@ def finish_attempt(request, pk):
     if request.method == "POST" and form.is_valid():
         attempt = form.save(commit=False)
         attempt.ended_at = timezone.now()
-        attempt.save()
+        run_with_retry(attempt.save)
         messages.success(request, "Attempt saved.")
         return redirect("attempt_list")
     return render(request, "attempts/finish.html", {"form": form, "attempt": attempt})
@@ -156,14 +206,18 @@ def add_mistake(request, attempt_id):
     if request.method == "POST" and form.is_valid():
         mistake = form.save(commit=False)
         mistake.attempt = attempt
-        mistake.save()
-        ReviewItem.objects.create(
-            user=request.user,
-            related_mistake=mistake,
-            prompt=mistake.short_label,
-            answer_key=mistake.detailed_postmortem,
-            due_date=mistake.next_review_date or date.today(),
-        )
+
+        def record():
+            mistake.save()
+            ReviewItem.objects.create(
+                user=request.user,
+                related_mistake=mistake,
+                prompt=mistake.short_label,
+                answer_key=mistake.detailed_postmortem,
+                due_date=mistake.next_review_date or date.today(),
+            )
+
+        run_with_retry(record)
         messages.success(request, "Mistake recorded and review scheduled.")
         return redirect("finish_attempt", pk=attempt_id)
     return render(request, "mistakes/form.html", {"form": form, "attempt": attempt})
@@ -171,35 +225,38 @@ def add_mistake(request, attempt_id):
 
 @login_required
 def mistake_analytics(request):
-    mistakes = Mistake.objects.filter(attempt__user=request.user).select_related("mistake_type", "attempt")
+    rollups = MistakeRollup.objects.filter(user=request.user)
+    cells = rollups.values("topic", "mistake_type__name").annotate(total=Sum("total")).order_by()
     heatmap = {}
-    for m in mistakes:
-        topic = dict(TOPIC_CHOICES).get(m.attempt.problem.topic, m.attempt.problem.topic)
-        mtype = m.mistake_type.name
-        heatmap.setdefault(topic, {}).setdefault(mtype, 0)
-        heatmap[topic][mtype] += 1
-
-    trend = (
-        mistakes.annotate(month=models.functions.TruncMonth("attempt__started_at"))
-        .values("month")
-        .annotate(total=Count("id"))
-        .order_by("month")
-    )
+    type_headers = set()
+    for cell in cells:
+        topic = TOPIC_LABELS.get(cell["topic"], cell["topic"])
+        heatmap.setdefault(topic, {})[cell["mistake_type__name"]] = cell["total"]
+        type_headers.add(cell["mistake_type__name"])
+
+    trend = rollups.values("month").annotate(total=Sum("total")).order_by("month")
 
     repeat_risk = (
-        mistakes.values("mistake_type__name")
-        .annotate(total=Count("id"))
+        rollups.values("mistake_type__name")
+        .annotate(total=Sum("total"))
         .filter(total__gte=2)
         .order_by("-total")
     )
-    type_headers = sorted({t for types in heatmap.values() for t in types.keys()})
     return render(
         request,
         "mistakes/analytics.html",
-        {"heatmap": heatmap, "trend": list(trend), "repeat_risk": repeat_risk, "type_headers": type_headers},
+        {"heatmap": heatmap, "trend": list(trend), "repeat_risk": repeat_risk, "type_headers": sorted(type_headers)},
     )
 
 
+@login_required
+def search(request):
+    query = request.GET.get("q", "").strip()
+    hits = search_documents(request.user, query)
+    template = "search/_results.html" if request.headers.get("HX-Request") else "search/results.html"
+    return render(request, template, {"query": query, "hits": hits})
+
+
 @login_required
 def review_queue(request):
     due_items = ReviewItem.objects.filter(user=request.user, due_date__lte=date.today()).order_by("due_date")
@@ -212,6 +269,73 @@ def review_queue(request):
     )
 
 
+@login_required
+def review_session(request):
+    session = ReviewSession(request)
+    if session.current is None:
+        session.load()
+    session.save()
+    return render(request, "reviews/session.html", {"session": session, "card": session.current})
+
+
+@login_required
+@require_POST
+def review_session_grade(request, pk):
+    session = ReviewSession(request)
+    form = ReviewGradeForm(request.POST)
+    if not form.is_valid():
+        return HttpResponseBadRequest("Invalid rating")
+    # A repeated or stale submit just re-renders the card at the head of the queue.
+    session.grade(pk, int(form.cleaned_data["rating"]))
+    session.save()
+    if not request.headers.get("HX-Request"):
+        return redirect("review_session")
+    return render(request, "reviews/_card.html", {"session": session, "card": session.current})
+
+
+@login_required
+@require_POST
+def review_session_end(request):
+    written = ReviewSession(request).end()
+    if written:
+        messages.success(request, f"Saved {written} reviews.")
+    return redirect("review_queue")
+
+
+@login_required
+def review_offline(request):
+    return render(request, "reviews/offline.html")
+
+
+@login_required
+def sync_reviews(request):
+    if request.method == "GET":
+        try:
+            days_ahead = int(request.GET.get("days", 0))
+        except ValueError:
+            return JsonResponse({"error": "days must be an integer."}, status=400)
+        return JsonResponse(pull(request.user, days_ahead=days_ahead))
+    if request.method != "POST":
+        return JsonResponse({"error": "Use GET to pull or POST to push."}, status=405)
+    try:
+        body = json.loads(request.body or b"{}")
+        results, cards = run_with_retry(push, request.user, body.get("grades") if isinstance(body, dict) else None)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    except SyncError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({"results": results, "cards": cards})
+
+
+@login_required
+def review_forecast(request):
+    try:
+        forecast = dashboard_forecast(request.user)
+    except RuntimeError as exc:
+        return JsonResponse({"error": str(exc)}, status=503)
+    return JsonResponse(forecast)
+
+
 @login_required
 @require_POST
 def grade_review(request, pk):
@@ -220,182 +344,187 @@ def grade_review(request, pk):
     if not form.is_valid():
         return HttpResponseBadRequest("Invalid rating")
     rating = int(form.cleaned_data["rating"])
-    item.grade(rating)
+    # grade() moves the card in memory before saving, so a retry starts again from the stored row.
+    run_with_retry(lambda: ReviewItem.objects.get(pk=item.pk).grade(rating))
     messages.success(request, "Review graded.")
     return redirect("review_queue")
 
 
+@staff_member_required
+def request_metrics(request):
+    if request.method == "POST":
+        request_stats.reset()
+        return redirect("request_metrics")
+    return render(request, "ops/requests.html", {"rows": request_stats.rows()})
+
+
+def metrics(request):
+    """
+    Prometheus scrape endpoint for staff sessions and ``Authorization: Bearer <METRICS_TOKEN>``;
+    open to everyone only with ``METRICS_PUBLIC`` (development).
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = settings.METRICS_PUBLIC
+    if not (allowed or request.user.is_staff):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+    body, content_type = prometheus.render_latest()
+    return HttpResponse(body, content_type=content_type)
+
+
+async def _aiter_sync(lines, batch: int = 500):
+    """
+    Stream a sync iterator that queries the database under ASGI, ``batch`` items per thread hop
+    (Django would otherwise hop once per item, and warn).
+    """
+    lines = iter(lines)
+    take = sync_to_async(lambda: list(islice(lines, batch)))
+    while chunk := await take():
+        for line in chunk:
+            yield line
+
+
 @login_required
 def export_data(request):
-    problems = list(Problem.objects.filter(created_by=request.user))
-    attempts = list(Attempt.objects.filter(user=request.user))
-    mistakes = list(Mistake.objects.filter(attempt__user=request.user))
-    reviews = list(ReviewItem.objects.filter(user=request.user))
-    mistake_types = list(MistakeType.objects.all())
-
-    data = {
-        "problems": [
-            {
-                "id": p.id,
-                "title": p.title,
-                "source": p.source,
-                "topic": p.topic,
-                "difficulty": p.difficulty,
-                "tags": p.tags,
-                "statement": p.statement,
-                "created_at": p.created_at.isoformat(),
-            }
-            for p in problems
-        ],
-        "attempts": [
-            {
-                "id": a.id,
-                "problem": a.problem.id,
-                "started_at": a.started_at.isoformat() if a.started_at else None,
-                "ended_at": a.ended_at.isoformat() if a.ended_at else None,
-                "outcome": a.outcome,
-                "final_answer": a.final_answer,
-                "solution_notes": a.solution_notes,
-                "confidence": a.confidence,
-            }
-            for a in attempts
-        ],
-        "mistake_types": [
-            {"name": mt.name, "description": mt.description} for mt in mistake_types
-        ],
-        "mistakes": [
-            {
-                "attempt": m.attempt.id,
-                "mistake_type": m.mistake_type.name,
-                "severity": m.severity,
-                "short_label": m.short_label,
-                "detailed_postmortem": m.detailed_postmortem,
-                "conceptual_gap": m.conceptual_gap,
-                "execution_error": m.execution_error,
-                "strategy_error": m.strategy_error,
-                "fix_plan": m.fix_plan,
-                "next_review_date": m.next_review_date.isoformat() if m.next_review_date else None,
-            }
-            for m in mistakes
-        ],
-        "reviews": [
-            {
-                "related_mistake": r.related_mistake.short_label if r.related_mistake else None,
-                "related_problem": r.related_problem.title if r.related_problem else None,
-                "prompt": r.prompt,
-                "answer_key": r.answer_key,
-                "ease_factor": r.ease_factor,
-                "interval_days": r.interval_days,
-                "due_date": r.due_date.isoformat(),
-            }
-            for r in reviews
-        ],
-    }
-    response = HttpResponse(json.dumps(data, indent=2), content_type="application/json")
+    """
+    The full JSON export, ``?format=columnar`` for the compressed one (``core.columnar``),
+    or ``?since=<cursor>`` for an NDJSON delta (``core.delta``).
+    """
+    asgi = isinstance(request, ASGIRequest)
+    if "since" in request.GET:
+        try:
+            cursor, lines = delta_export(request.user, request.GET["since"])
+        except DeltaError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        response = StreamingHttpResponse(_aiter_sync(lines) if asgi else lines, content_type="application/x-ndjson")
+        response["Content-Disposition"] = 'attachment; filename="olympiad_error_atlas-delta.ndjson"'
+        response["X-Delta-Cursor"] = cursor
+        return response
+    if request.GET.get("format") == "columnar":
+        compression = request.GET.get("compression") or EXPORT_COMPRESSION
+        if compression not in available_compressions():
+            return JsonResponse({"error": f"compression must be one of {available_compressions()}."}, status=400)
+        content_type, extension = COMPRESSIONS[compression]
+        body = iter_export_columnar(request.user, compression)
+        response = StreamingHttpResponse(_aiter_sync(body) if asgi else body, content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="olympiad_error_atlas.oea.{extension}"'
+        return response
+    rows = iter_export_json(request.user)
+    response = StreamingHttpResponse(_aiter_sync(rows) if asgi else rows, content_type="application/json")
     response["Content-Disposition"] = 'attachment; filename="olympiad_error_atlas.json"'
     return response
 
 
-def _parse_datetime(value: str | None):
-    if not value:
-        return None
-    try:
-        return datetime.fromisoformat(value)
-    except ValueError:
-        return None
+@login_required
+def import_data(request):
+    form = ImportForm(request.POST or None, request.FILES or None)
+    if request.method == "POST" and form.is_valid():
+        # Parsing and inserting a large backup can outlast the worker timeout; a job worker does it.
+        jobs.submit(request.user, Job.KIND_IMPORT, upload=form.cleaned_data["file"])
+        messages.success(request, "Import queued. It will show up here when it finishes.")
+        return redirect("job_list")
+    return render(request, "import_export/import.html", {"form": form})
 
 
-def _parse_date(value: str | None):
-    dt = _parse_datetime(value)
-    if dt:
-        return dt.date()
-    return None
+@login_required
+@require_POST
+def upload_start(request):
+    """Begin a chunked import upload: ``{"filename", "size", "sha256"?}`` in, upload state out."""
+    try:
+        body = json.loads(request.body or b"{}")
+        upload = uploads.start_upload(request.user, body.get("filename"), body.get("size"), body.get("sha256", ""))
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({"error": "Invalid JSON."}, status=400)
+    except uploads.UploadError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(uploads.upload_state(upload), status=201)
 
 
 @login_required
-def import_data(request):
-    form = ImportForm(request.POST or None, request.FILES or None)
-    if request.method == "POST" and form.is_valid():
-        uploaded = form.cleaned_data["file"]
+def upload_detail(request, pk):
+    """
+    GET reports how many bytes are stored; PATCH appends one chunk.
+
+    A chunk carries ``Upload-Offset`` and ``Upload-Checksum: sha256 <hex>``
+    headers. The last chunk queues the import job.
+    """
+    upload = get_object_or_404(Upload, pk=pk, user=request.user)
+    if request.method == "PATCH":
         try:
-            payload = json.load(uploaded)
-        except json.JSONDecodeError:
-            messages.error(request, "Invalid JSON file.")
-            return render(request, "import_export/import.html", {"form": form})
-        mistake_type_map = {}
-        for mt in payload.get("mistake_types", []):
-            obj, _ = MistakeType.objects.get_or_create(
-                name=mt.get("name"), defaults={"description": mt.get("description", "")}
-            )
-            mistake_type_map[obj.name] = obj
-
-        problem_map = {}
-        for p in payload.get("problems", []):
-            obj = Problem.objects.create(
-                title=p.get("title", "Untitled"),
-                source=p.get("source", ""),
-                topic=p.get("topic", "OTHER"),
-                difficulty=p.get("difficulty", 5),
-                tags=p.get("tags", ""),
-                statement=p.get("statement", ""),
-                created_by=request.user,
-            )
-            problem_map[p.get("id")] = obj
-
-        attempt_map = {}
-        for a in payload.get("attempts", []):
-            problem = problem_map.get(a.get("problem"))
-            if not problem:
-                continue
-            att = Attempt.objects.create(
-                problem=problem,
-                user=request.user,
-                started_at=_parse_datetime(a.get("started_at")) or timezone.now(),
-                ended_at=_parse_datetime(a.get("ended_at")),
-                outcome=a.get("outcome", "stuck"),
-                final_answer=a.get("final_answer", ""),
-                solution_notes=a.get("solution_notes", ""),
-                confidence=a.get("confidence", 3),
-            )
-            attempt_map[a.get("id")] = att
-        for m in payload.get("mistakes", []):
-            attempt = attempt_map.get(m.get("attempt"))
-            mtype = mistake_type_map.get(m.get("mistake_type"))
-            if not attempt or not mtype:
-                continue
-            Mistake.objects.create(
-                attempt=attempt,
-                mistake_type=mtype,
-                severity=m.get("severity", 3),
-                short_label=m.get("short_label", "Mistake"),
-                detailed_postmortem=m.get("detailed_postmortem", ""),
-                conceptual_gap=m.get("conceptual_gap", False),
-                execution_error=m.get("execution_error", False),
-                strategy_error=m.get("strategy_error", False),
-                fix_plan=m.get("fix_plan", ""),
-                next_review_date=_parse_date(m.get("next_review_date")),
+            uploads.append_chunk(
+                upload,
+                request.headers.get("Upload-Offset"),
+                request,
+                request.headers.get("Content-Length"),
+                request.headers.get("Upload-Checksum", ""),
             )
-        for r in payload.get("reviews", []):
-            related_mistake = None
-            related_problem = None
-            if r.get("related_mistake"):
-                related_mistake = Mistake.objects.filter(
-                    short_label=r.get("related_mistake"), attempt__user=request.user
-                ).first()
-            if r.get("related_problem"):
-                related_problem = Problem.objects.filter(
-                    title=r.get("related_problem"), created_by=request.user
-                ).first()
-            ReviewItem.objects.create(
-                user=request.user,
-                related_mistake=related_mistake,
-                related_problem=related_problem,
-                prompt=r.get("prompt", ""),
-                answer_key=r.get("answer_key", ""),
-                ease_factor=r.get("ease_factor", 2.5),
-                interval_days=r.get("interval_days", 0),
-                due_date=_parse_date(r.get("due_date")) or date.today(),
-            )
-        messages.success(request, "Data imported.")
-        return redirect("dashboard")
-    return render(request, "import_export/import.html", {"form": form})
+            if upload.is_complete:
+                uploads.finish_upload(upload)
+        except uploads.OffsetMismatch as exc:
+            upload.refresh_from_db()
+            return JsonResponse({"error": str(exc), **uploads.upload_state(upload)}, status=409)
+        except uploads.UploadError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+    elif request.method != "GET":
+        return JsonResponse({"error": "Use GET for the state or PATCH to send a chunk."}, status=405)
+    return JsonResponse(uploads.upload_state(upload))
+
+
+@login_required
+def job_list(request):
+    context = {"jobs": request.user.jobs.all()[:50], "reschedule_form": RescheduleForm()}
+    return render(request, "jobs/list.html", context)
+
+
+@login_required
+@require_POST
+def job_submit(request, kind):
+    if kind == Job.KIND_RESCHEDULE:
+        form = RescheduleForm(request.POST)
+        if not form.is_valid():
+            return HttpResponseBadRequest("Invalid reschedule options")
+        params = form.params()
+    elif kind == Job.KIND_EXPORT:
+        params = {"format": "columnar"} if request.POST.get("format") == "columnar" else {}
+    elif kind in (Job.KIND_REBUILD_ANALYTICS, Job.KIND_REBUILD_SEARCH):
+        params = {}
+    else:
+        return HttpResponseBadRequest("Unknown job kind")
+    job = jobs.submit(request.user, kind, params)
+    messages.success(request, f"{job.get_kind_display()} queued.")
+    return redirect("job_list")
+
+
+@login_required
+def job_status(request, pk):
+    """HTMX partial for one job; it keeps polling itself while the job is queued or running."""
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    return render(request, "jobs/_job.html", {"job": job})
+
+
+@login_required
+@require_POST
+def job_retry(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    if jobs.retry(job):
+        messages.success(request, f"{job.get_kind_display()} queued again; it resumes where it stopped.")
+    return redirect("job_list")
+
+
+@login_required
+def job_download(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user, kind=Job.KIND_EXPORT, status=Job.STATUS_SUCCEEDED)
+    if not job.output_file:
+        raise Http404("The export file is gone.")
+    content_type, extension = "application/json", "json"
+    for compressed_type, compressed_extension in COMPRESSIONS.values():
+        if job.output_file.name.endswith(f".oea.{compressed_extension}"):
+            content_type, extension = compressed_type, f"oea.{compressed_extension}"
+    return FileResponse(
+        job.output_file.open("rb"),
+        as_attachment=True,
+        filename=f"olympiad_error_atlas.{extension}",
+        content_type=content_type,
+    )
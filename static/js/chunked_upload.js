@@ -0,0 +1,95 @@
+// Chunked, resumable import upload: sends the file in checksummed chunks and,
+// after a dropped connection or a page reload, continues from the last byte
+// the server stored. Without fetch or crypto.subtle the form posts normally.
+(() => {
+  const form = document.getElementById("import-form");
+  if (!form || !window.fetch || !(window.crypto && crypto.subtle)) return;
+
+  const csrfToken = form.querySelector("input[name=csrfmiddlewaretoken]").value;
+  const bar = form.querySelector("[data-upload-progress]");
+  const status = form.querySelector("[data-upload-status]");
+  const storeKey = (file) => `oea:upload:${file.name}:${file.size}:${file.lastModified}`;
+  const hex = (buffer) => Array.from(new Uint8Array(buffer), (b) => b.toString(16).padStart(2, "0")).join("");
+  const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+  const show = (received, size, text) => {
+    bar.classList.remove("d-none");
+    bar.firstElementChild.style.width = `${Math.floor((received * 100) / size)}%`;
+    status.textContent = text;
+  };
+
+  const call = async (url, options = {}) => {
+    const response = await fetch(url, {
+      credentials: "same-origin",
+      ...options,
+      headers: { "X-CSRFToken": csrfToken, ...(options.headers || {}) },
+    });
+    const body = await response.json().catch(() => ({}));
+    return { ok: response.ok, status: response.status, body };
+  };
+
+  const start = async (file) => {
+    const saved = localStorage.getItem(storeKey(file));
+    if (saved) {
+      const existing = await call(saved);
+      if (existing.ok && !existing.body.job) return { url: saved, state: existing.body };
+    }
+    const created = await call(form.dataset.uploadUrl, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    if (!created.ok) throw new Error(created.body.error || "Could not start the upload.");
+    const url = `${form.dataset.uploadUrl}${created.body.id}/`;
+    localStorage.setItem(storeKey(file), url);
+    return { url, state: created.body };
+  };
+
+  const send = async (file) => {
+    let { url, state } = await start(file);
+    let failures = 0;
+    while (!state.job) {
+      const chunk = file.slice(state.received, state.received + state.chunk_size);
+      const data = await chunk.arrayBuffer();
+      show(state.received, file.size, `Uploading… ${Math.floor((state.received * 100) / file.size)}%`);
+      let result;
+      try {
+        result = await call(url, {
+          method: "PATCH",
+          headers: {
+            "Content-Type": "application/octet-stream",
+            "Upload-Offset": String(state.received),
+            "Upload-Checksum": `sha256 ${hex(await crypto.subtle.digest("SHA-256", data))}`,
+          },
+          body: data,
+        });
+      } catch (err) {
+        result = { ok: false, status: 0, body: {} };
+      }
+      if (result.ok || result.status === 409) {
+        // On 409 the server says where its copy ends; carry on from there.
+        state = { ...state, ...result.body };
+        failures = 0;
+        continue;
+      }
+      if (++failures > 5) throw new Error(result.body.error || "Upload failed; submit again to resume.");
+      show(state.received, file.size, "Connection lost, retrying…");
+      await sleep(1000 * 2 ** failures);
+      const current = await call(url).catch(() => null);
+      if (current && current.ok) state = current.body;
+    }
+    localStorage.removeItem(storeKey(file));
+    window.location.href = form.dataset.jobsUrl;
+  };
+
+  form.addEventListener("submit", (event) => {
+    const file = form.querySelector("input[type=file]").files[0];
+    if (!file) return;
+    event.preventDefault();
+    form.querySelector("button[type=submit]").disabled = true;
+    send(file).catch((err) => {
+      status.textContent = err.message;
+      form.querySelector("button[type=submit]").disabled = false;
+    });
+  });
+})();
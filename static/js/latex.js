@@ -77,4 +77,9 @@
   document.addEventListener("DOMContentLoaded", () => {
     document.querySelectorAll("textarea.latex-input").forEach(attachPreview);
   });
+
+  // Typeset math in fragments swapped in by HTMX (review cards, search results).
+  document.addEventListener("htmx:load", (event) => {
+    if (event.detail.elt !== document.body) typeset(event.detail.elt);
+  });
 })();
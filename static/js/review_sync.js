@@ -0,0 +1,129 @@
+// Offline review client: pulls due cards, grades them locally with the same
+// SM-2 rules as core.scheduler, and pushes queued grades whenever online.
+(() => {
+  const root = document.getElementById("offline-review");
+  if (!root) return;
+
+  const syncUrl = root.dataset.syncUrl;
+  const csrfToken = root.querySelector("input[name=csrfmiddlewaretoken]").value;
+  const store = {
+    get: (key, fallback) => JSON.parse(localStorage.getItem(`oea:${key}`) || "null") ?? fallback,
+    set: (key, value) => localStorage.setItem(`oea:${key}`, JSON.stringify(value)),
+  };
+  const isoDay = (d) =>
+    `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
+  const today = () => isoDay(new Date());
+  const newKey = () =>
+    window.crypto && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+
+  // Mirrors core.scheduler.next_state; the server recomputes the final state.
+  const nextState = (rules, ease, interval, quality) => {
+    const ef = Math.max(rules.min_ease, Math.round(((ease || rules.default_ease) + rules.ease_deltas[quality]) * 100) / 100);
+    if (quality < 2) return [ef, 1];
+    if (interval <= 0) return [ef, quality === 2 ? rules.first_good_interval : rules.first_easy_interval];
+    if (interval === 1) return [ef, rules.second_interval];
+    return [ef, Math.max(1, Math.round(interval * ef * rules.interval_modifier))];
+  };
+
+  const addDays = (days) => {
+    const d = new Date();
+    d.setDate(d.getDate() + days);
+    return isoDay(d);
+  };
+
+  const status = (text) => {
+    root.querySelector("[data-status]").textContent = text;
+  };
+
+  const render = () => {
+    const cards = store.get("cards", []).filter((c) => c.due_date <= today());
+    const outbox = store.get("outbox", []);
+    const card = cards[0];
+    root.querySelector("[data-remaining]").textContent = `${cards.length} due · ${outbox.length} waiting to sync`;
+    const body = root.querySelector("[data-card]");
+    if (!card) {
+      body.innerHTML = '<div class="alert alert-success mb-0">No reviews due. Great job!</div>';
+      return;
+    }
+    body.innerHTML = `
+      <div class="card-title h4 markdown-body">${card.prompt_html}</div>
+      <details class="mt-3 p-3 bg-dark-subtle rounded">
+        <summary class="fw-semibold">Show answer</summary>
+        <div class="mt-2 markdown-body">${card.answer_html}</div>
+      </details>`;
+    body.dataset.cardId = card.id;
+    if (window.MathJax && MathJax.typesetPromise) MathJax.typesetPromise([body]).catch(() => {});
+  };
+
+  const grade = (quality) => {
+    const cards = store.get("cards", []);
+    const card = cards.find((c) => String(c.id) === root.querySelector("[data-card]").dataset.cardId);
+    if (!card) return;
+    const [ef, interval] = nextState(store.get("rules", {}), card.ease_factor, card.interval_days, quality);
+    const outbox = store.get("outbox", []);
+    outbox.push({
+      key: newKey(),
+      card: card.id,
+      rating: quality,
+      reviewed_at: new Date().toISOString(),
+      base_updated_at: card.updated_at,
+    });
+    Object.assign(card, {ease_factor: ef, interval_days: interval, due_date: addDays(interval)});
+    store.set("outbox", outbox);
+    store.set("cards", cards);
+    render();
+    push();
+  };
+
+  let pushing = false;
+  const push = async () => {
+    const outbox = store.get("outbox", []);
+    if (pushing || !outbox.length || !navigator.onLine) return;
+    pushing = true;
+    try {
+      const response = await fetch(syncUrl, {
+        method: "POST",
+        headers: {"Content-Type": "application/json", "X-CSRFToken": csrfToken},
+        body: JSON.stringify({grades: outbox}),
+      });
+      if (!response.ok) throw new Error(`sync failed (${response.status})`);
+      const data = await response.json();
+      // Every answered key is final (applied, duplicate, conflict or missing).
+      const answered = new Set(data.results.map((r) => r.key));
+      store.set("outbox", store.get("outbox", []).filter((g) => !answered.has(g.key)));
+      const server = new Map(data.cards.map((c) => [c.id, c]));
+      store.set("cards", store.get("cards", []).map((c) => (server.has(c.id) ? {...c, ...server.get(c.id)} : c)));
+      status(`Synced ${answered.size} grades`);
+    } catch (error) {
+      status("Offline: grades are queued on this device");
+    } finally {
+      pushing = false;
+      render();
+    }
+  };
+
+  const pull = async () => {
+    await push();
+    if (store.get("outbox", []).length || !navigator.onLine) return render();
+    try {
+      const response = await fetch(`${syncUrl}?days=${root.dataset.daysAhead || 0}`, {headers: {Accept: "application/json"}});
+      if (!response.ok) throw new Error(`download failed (${response.status})`);
+      const data = await response.json();
+      store.set("rules", data.scheduler);
+      store.set("cards", data.cards);
+      status(`Downloaded ${data.cards.length} cards`);
+    } catch (error) {
+      status("Offline: using the cards saved on this device");
+    }
+    render();
+  };
+
+  root.querySelectorAll("[data-rating]").forEach((button) =>
+    button.addEventListener("click", () => grade(Number(button.dataset.rating)))
+  );
+  root.querySelector("[data-refresh]").addEventListener("click", pull);
+  window.addEventListener("online", push);
+  setInterval(push, 30000);
+  render();
+  pull();
+})();